@@ -3,31 +3,70 @@
 """
 
 import os
-from typing import Optional
+import json
+import math
+import asyncio
+from typing import Literal, Optional
 from dotenv import load_dotenv
 from contextlib import asynccontextmanager
 from fastapi.responses import JSONResponse
-from fastapi import Body, FastAPI, BackgroundTasks
+from fastapi import Body, FastAPI, BackgroundTasks, Header, Query, Request
 
-from src.agent.client import setup_client
-from src.agent.agents import CombinationAnalyst, NumerologyAnalyst, StoryTell
-from utils.woodpecker import DBConnectionError, StartUpCrash, setup_logger
-from src.schemas import StatsRequest, TarotInsights, TarotReading, User
+from src.agent.client import aclose_client, close_client, create_async_client, setup_client, warm_prefixes, watch_health
+from src.agent.cache import inflight, prompt_cache, response_cache
+from src.agent.gateway import gateway
+from src.agent.scheduler import Ticket
+from src.astrology.chart import chart_cache
+from src.astrology.ephemeris import ephemeris_table
+from src.astrology.pool import chart_pool
+from src.astrology.transits import transit_cache
+from src.agent.agents import CombinationAnalyst, ElementsAnalyst, NumerologyAnalyst, StoryTell, TarotReader, taro
+from utils import geocode
+from utils.cache import make_key
+from utils.flight import IdempotencyStore
+from utils.settings import setting
+from utils.woodpecker import DBConnectionError, GatewayRejected, IdempotencyKeyMismatch, MalformedPrediction, StartUpCrash, setup_logger
+from src.schemas import HistoryStatsRequest, StatsRequest, StoryRequest, TarotInsights, TarotReading, User
+from src.tarot.stats import history_stats
 
+from src.api import client_host
 from src.api.astrology import astrology_router
+from src.api.jobs import jobs_router
+from src.jobs.worker import WorkerPool, job_queue
+from src.api.stream import sse_response
 
 load_dotenv()
 logger = setup_logger(__name__)
 
+idempotency = IdempotencyStore(ttl=setting.cache.idempotency_ttl)
+
 ### Helper functions
 @asynccontextmanager
 async def startup(app: FastAPI):
+    health = warmup = None
     try:
-        if not hasattr(app.state, "agent"):
+        if not hasattr(app.state, "ollama"):
             # TODO: Add Checks for Firebase auth
-            # Checks that ollama is running
-            setup_client()
-            logger.info("App state initialized; Ollama client ready: %s", bool(client))
+            # One pooled client for the app's lifetime; checks that ollama is running with our model pulled
+            app.state.ollama = setup_client()
+            app.state.aollama = create_async_client()
+            app.state.ollama_ready = True
+            actions = list(taro.templates.values())
+            if setting.server.warm_prefixes:
+                # Fill Ollama's prompt cache with the static system prompts without delaying startup
+                warmup = asyncio.create_task(warm_prefixes(app.state.aollama, actions))
+            health = asyncio.create_task(watch_health(app.state, actions=actions))
+            # Warm chart workers (immanuel + ephemeris loaded) before serving astrology requests
+            await chart_pool.start()
+            # Sun/moon table for the signs-only mode (built and saved on the first start)
+            await asyncio.to_thread(ephemeris_table)
+            # Long readings submitted as jobs; workers share the gateway with the HTTP endpoints
+            app.state.jobs = WorkerPool(
+                job_queue(), setting.jobs.workers, setting.jobs.poll_interval,
+                client=app.state.ollama, aclient=app.state.aollama,
+            )
+            await app.state.jobs.start()
+            logger.info("App state initialized; Ollama client ready: %s", app.state.ollama_ready)
         yield
         #if app.state:
         #    app.state.__dict__.pop("agent", None)
@@ -36,9 +75,39 @@ async def startup(app: FastAPI):
         logger.exception("Startup failure")
         raise StartUpCrash(e)
     finally:
-        if app.state:
-            app.state.__dict__.pop("agent", None)
-            logger.debug('Removed Agents state.')
+        for task in (warmup, health):
+            if task:
+                task.cancel()
+        if jobs := getattr(app.state, "jobs", None):
+            # Jobs being run are put back in the queue for the next start
+            await jobs.stop()
+            jobs.queue.close()
+            del app.state.jobs
+        chart_pool.shutdown()
+        if client := getattr(app.state, "ollama", None):
+            close_client(client)
+            del app.state.ollama
+            logger.debug('Closed Ollama client pool.')
+        if aclient := getattr(app.state, "aollama", None):
+            await aclose_client(aclient)
+            del app.state.aollama
+
+async def run_once(idempotency_key: str | None, route: str, factory, request: Request | None = None, owner: str | None = None):
+    """
+    Awaits `factory()` once per client `Idempotency-Key`, scoped to the route and the caller (`owner`); retries share
+    or replay the result. Reusing a key with a different body or query is rejected (422) instead of replayed.
+    """
+    if not idempotency_key:
+        return await factory()
+    fingerprint = None
+    if request is not None:
+        body = await request.body()
+        try:
+            body = json.loads(body) if body else None
+        except ValueError:
+            body = body.decode('utf-8', 'replace')
+        fingerprint = make_key(sorted(request.query_params.multi_items()), body)
+    return await idempotency.run(make_key(route, owner, idempotency_key), factory, fingerprint)
 
 app = FastAPI(
     title="Taro's API",
@@ -53,18 +122,52 @@ app = FastAPI(
     }
 )
 
-app.include_route(astrology_router)
+app.include_router(astrology_router)
+app.include_router(jobs_router)
+
+@app.exception_handler(IdempotencyKeyMismatch)
+async def idempotency_key_mismatch(request: Request, exc: IdempotencyKeyMismatch):
+    return JSONResponse(content={"error": exc.message}, status_code=exc.status_code)
+
+@app.exception_handler(GatewayRejected)
+async def gateway_rejected(request: Request, exc: GatewayRejected):
+    """ Load shed by the LLM gateway: 429 / 503 with a Retry-After hint. """
+    return JSONResponse(
+        content={"error": exc.message},
+        status_code=exc.status_code,
+        headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))}
+    )
 
 @app.get('/')
 def root():
     return JSONResponse(content=f"Taro Active. Debug mode: {DEBUG_MODE}", status_code=200)
 
+@app.get('/health/')
+def health():
+    ready = getattr(app.state, "ollama_ready", False)
+    return JSONResponse(
+        content={
+            "ollama_ready": ready,
+            "response_cache": response_cache.stats(),
+            "inflight": inflight.stats(),
+            "gateway": gateway.stats(),
+            "prompt_cache": prompt_cache.stats(),
+            "geocode": geocode.stats(),
+            "charts": chart_cache.stats(),
+            "chart_pool": chart_pool.stats(),
+            "transits": transit_cache.stats(),
+            "jobs": app.state.jobs.stats() if hasattr(app.state, "jobs") else None,
+        },
+        status_code=200 if ready else 503
+    )
+
 @app.post(
     '/insight_combination/',
     response_class=JSONResponse,
     response_model_exclude_none=True,
 )
 async def tarot_insight_combination(
+    request: Request,
     background_tasks: BackgroundTasks,
     inputs: TarotReading = Body(
         ...,
@@ -78,13 +181,24 @@ async def tarot_insight_combination(
                 "Ten of Swords"
             ]
         }
-    )
+    ),
+    stream: bool = Query(False, description="Stream tokens as Server-Sent Events."),
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key"),
+    request_timeout: float | None = Header(None, alias="X-Request-Timeout", description="Seconds the client will wait."),
 ):
     try:
-        comb = CombinationAnalyst()
-        response = comb.run(inputs=inputs)
+        ticket = Ticket.for_reading(inputs.user_id, inputs.reading_mode.drawn_num, client=client_host(request))
+        comb = CombinationAnalyst(client=app.state.ollama, aclient=app.state.aollama, timeout=request_timeout, ticket=ticket)
+        if stream:
+            gateway.check(request_timeout, ticket)
+            return sse_response(comb.astream(inputs=inputs))
+        response = await run_once(
+            idempotency_key, '/insight_combination/', lambda: comb.arun(inputs=inputs), request, ticket.owner
+        )
         return JSONResponse(content=response, status_code=200)
-    except Exception:
+    except (GatewayRejected, IdempotencyKeyMismatch):
+        raise
+    except Exception as e:
         logger.exception("Error in combination insight")
         return JSONResponse(content={"error": str(e)}, status_code=500)
 
@@ -94,6 +208,7 @@ async def tarot_insight_combination(
     response_model_exclude_none=True,
 )
 async def tarot_insight_numerology(
+    request: Request,
     inputs: TarotReading = Body(
         ...,
         example={
@@ -106,24 +221,81 @@ async def tarot_insight_numerology(
                 "Ten of Swords"
             ]
         }
-    )
+    ),
+    stream: bool = Query(False, description="Stream tokens as Server-Sent Events."),
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key"),
+    request_timeout: float | None = Header(None, alias="X-Request-Timeout", description="Seconds the client will wait."),
 ):
     try:
-        num = NumerologyAnalyst()
-        response = num.run(inputs=inputs)
+        ticket = Ticket.for_reading(inputs.user_id, inputs.reading_mode.drawn_num, client=client_host(request))
+        num = NumerologyAnalyst(client=app.state.ollama, aclient=app.state.aollama, timeout=request_timeout, ticket=ticket)
+        if stream:
+            gateway.check(request_timeout, ticket)
+            return sse_response(num.astream(inputs=inputs))
+        response = await run_once(
+            idempotency_key, '/insight_numerology/', lambda: num.arun(inputs=inputs), request, ticket.owner
+        )
         return JSONResponse(content=response, status_code=200)
-    except Exception:
+    except (GatewayRejected, IdempotencyKeyMismatch):
+        raise
+    except Exception as e:
         logger.exception("Error in numerology insight")
         return JSONResponse(content={"error": str(e)}, status_code=500)
 
 
+@app.post(
+    '/insight_elements/',
+    response_class=JSONResponse,
+    response_model_exclude_none=True,
+)
+async def tarot_insight_elements(
+    request: Request,
+    inputs: TarotReading = Body(
+        ...,
+        example={
+            "timestamp": "2025-06-22T02:30:00",
+            "question": "What does my reading reveal about my life path?",
+            "reading_mode": "three_card",
+            "drawn_cards": [
+                "Ace of Cups",
+                "Three of Wands",
+                "Ten of Swords"
+            ]
+        }
+    ),
+    mode: Literal['fast', 'llm'] = Query('fast', description="`fast` renders the reading without a model call; `llm` generates it"),
+    stream: bool = Query(False, description="Stream tokens as Server-Sent Events."),
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key"),
+    request_timeout: float | None = Header(None, alias="X-Request-Timeout", description="Seconds the client will wait."),
+):
+    try:
+        ticket = Ticket.for_reading(inputs.user_id, inputs.reading_mode.drawn_num, client=client_host(request))
+        elements = ElementsAnalyst(client=app.state.ollama, aclient=app.state.aollama, timeout=request_timeout, ticket=ticket, mode=mode)
+        if stream:
+            if mode == 'llm':
+                gateway.check(request_timeout, ticket)
+            return sse_response(elements.astream(inputs=inputs))
+        if mode == 'fast':
+            return JSONResponse(content=elements.render(inputs=inputs), status_code=200)
+        response = await run_once(
+            idempotency_key, '/insight_elements/', lambda: elements.arun(inputs=inputs), request, ticket.owner
+        )
+        return JSONResponse(content=response, status_code=200)
+    except (GatewayRejected, IdempotencyKeyMismatch):
+        raise
+    except Exception as e:
+        logger.exception("Error in elements insight")
+        return JSONResponse(content={"error": str(e)}, status_code=500)
+
+
 @app.post(
     "/story_tell/",
     response_class=JSONResponse,
     response_model_exclude_none=True
 )
 async def tarot_story_tell(
-    inputs: StatsRequest = Body(
+    request: Request,
+    inputs: StoryRequest = Body(
         ...,
         example={
             'user': {
@@ -140,16 +312,83 @@ async def tarot_story_tell(
                 'drawn_cards': ['two of cups', 'wheel of fortune', 'Death']
             }
         }
-    )
+    ),
+    stream: bool = Query(False, description="Stream tokens as Server-Sent Events."),
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key"),
+    request_timeout: float | None = Header(None, alias="X-Request-Timeout", description="Seconds the client will wait."),
 ):
     try:
-        story = StoryTell()
-        response = story.run(inputs=inputs)
+        ticket = Ticket.for_reading(inputs.user.id, inputs.tarot.reading_mode.drawn_num, client=client_host(request))
+        story = StoryTell(client=app.state.ollama, aclient=app.state.aollama, timeout=request_timeout, ticket=ticket)
+        if stream:
+            gateway.check(request_timeout, ticket)
+            return sse_response(story.astream(inputs={'user': inputs.user, 'tarot': inputs.tarot}))
+        response = await run_once(
+            idempotency_key, '/story_tell/', lambda: story.arun(inputs={'user': inputs.user, 'tarot': inputs.tarot}),
+            request, ticket.owner
+        )
         return JSONResponse(content=response, status_code=200)
-    except Exception:
+    except (GatewayRejected, IdempotencyKeyMismatch):
+        raise
+    except Exception as e:
         logger.exception("Error while summarising prediction")
         return JSONResponse(content={"error": str(e)}, status_code=500)
 
+@app.post(
+    "/reading/",
+    response_class=JSONResponse,
+    response_model_exclude_none=True
+)
+async def tarot_full_reading(
+    request: Request,
+    inputs: StoryRequest = Body(
+        ...,
+        example={
+            'user': {
+                'id': '12345',
+                'username': 'julie.lenova',
+                'first_name': 'Julie',
+                'last_name': 'Lenova',
+                'birth_date': '21-03-1999'
+            },
+            'tarot': {
+                'timestamp': "2025-06-22T02:30:00",
+                'question': 'When will I see Pookie?',
+                'reading_mode': 'three_card',
+                'drawn_cards': ['two of cups', 'wheel of fortune', 'Death']
+            }
+        }
+    ),
+    stream: bool = Query(False, description="Stream the JSON tokens as Server-Sent Events."),
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key"),
+    request_timeout: float | None = Header(None, alias="X-Request-Timeout", description="Seconds the client will wait."),
+):
+    """
+        Combination, numerology and story of a reading from a single model call, as one JSON object
+        (`combination`, `numerology`, `story_tell`).
+    """
+    try:
+        ticket = Ticket.for_reading(inputs.user.id, inputs.tarot.reading_mode.drawn_num, client=client_host(request))
+        reader = TarotReader(client=app.state.ollama, aclient=app.state.aollama, timeout=request_timeout, ticket=ticket)
+        if stream:
+            gateway.check(request_timeout, ticket)
+            return sse_response(reader.astream(inputs={'user': inputs.user, 'tarot': inputs.tarot}))
+        async def predict() -> dict:
+            # Plain dict: replayed results are stored as JSON
+            prediction = await reader.apredict(inputs={'user': inputs.user, 'tarot': inputs.tarot})
+            return prediction.model_dump()
+
+        response = await run_once(idempotency_key, '/reading/', predict, request, ticket.owner)
+        return JSONResponse(content=response, status_code=200)
+    except (GatewayRejected, IdempotencyKeyMismatch):
+        raise
+    except MalformedPrediction as e:
+        logger.warning(e.message)
+        return JSONResponse(content={"error": e.message}, status_code=e.status_code)
+    except Exception as e:
+        logger.exception("Error while generating full reading")
+        return JSONResponse(content={"error": str(e)}, status_code=500)
+
 @app.post(
     "/insight_stats/",
     response_class=JSONResponse,
@@ -169,6 +408,30 @@ async def tarot_insight_stats(
     insights = TarotInsights.insight(inputs.reading_mode.drawn_num, inputs.drawn_cards) # type: ignore
     return JSONResponse(content=insights.model_dump(), status_code=200)
 
+@app.post(
+    "/insight_stats/history/",
+    response_class=JSONResponse,
+)
+async def tarot_history_stats(
+    inputs: HistoryStatsRequest = Body(
+        ...,
+        example={
+            "window": "month",
+            "top": 3,
+            "readings": [
+                {"timestamp": "2025-06-22T02:30:00", "reading_mode": "three_card", "drawn_cards": ["ace of wands", "nine of cups", "two of swords"]},
+                {"timestamp": "2025-07-01T21:00:00", "reading_mode": "three_card", "drawn_cards": ["the tower", "queen of cups (reversed)", "two of swords"]},
+            ]
+        }
+    )
+):
+    """
+        Suit, court, arcana, element and reversal distributions over a user's reading history, their trend per
+        time window, and the most frequent cards overall and per spread position.
+    """
+    logger.info("History stats requested for %d readings", len(inputs.readings))
+    return JSONResponse(content=history_stats(inputs.encode(), inputs.window, inputs.top), status_code=200)
+
 
 if __name__ == "__main__":
     import uvicorn
@@ -4,21 +4,40 @@ src/agent/agents.py
 Contains the Helper Agent for the Tarot Reading Agent.
 """
 
+from datetime import date, datetime
+from typing import Literal
+
+from pydantic import ValidationError
+
 from .base import SandCrawler
+from .sections import Section
 
-from src.schemas import TarotReading
+from src.schemas import DailyTransits, TarotPrediction, TarotReading, User
+from src.tarot.elements import elemental_reading, elemental_summary
+from src.tarot.numerology import numerology, numerology_facts
 from utils.handler import TaroAction, TaroProfile
-from utils.woodpecker import ErrorSettingUpModelChain
+from utils.woodpecker import ErrorSettingUpModelChain, MalformedPrediction, setup_logger
+
+logger = setup_logger(__name__)
 
 taro = TaroProfile.load_agent()
 
+def as_reading(inputs):
+    """ Accepts a TarotReading or a chain payload carrying one under `tarot` (e.g. StoryTell's inputs). """
+    if isinstance(inputs, dict):
+        return inputs.get('tarot')
+    return inputs
+
 class CombinationAnalyst(SandCrawler, task=taro.templates.get('insight_combination', None)):
+    # StoryTell only reads the highlights, which the template generates first
+    excerpt = Section('Combination Highlights', 'Possible insights')
+
     def feature_augment(self, **kwargs):
-        if inputs := kwargs.get('inputs', None):
+        if inputs := as_reading(kwargs.get('inputs', None)):
             if isinstance(inputs, TarotReading):
                 return {
                     'question': inputs.question,
-                    'tarot_draw_input': inputs.pos_draw
+                    'tarot_draw_input': inputs.pos_draw + inputs.spread_facts
                 }
         else:
             raise ValueError
@@ -26,7 +45,30 @@ class CombinationAnalyst(SandCrawler, task=taro.templates.get('insight_combinati
 class NumerologyAnalyst(SandCrawler, task=taro.templates.get('insight_numerology', None)):
     def feature_augment(self, **kwargs):
         """ Reads the tarots inputs"""
-        if inputs := kwargs.get('inputs', None):
+        if inputs := as_reading(kwargs.get('inputs', None)):
+            if isinstance(inputs, TarotReading):
+                # The patterns are computed here, so the model only writes the interpretation
+                self.decode_kwargs = {'num_predict': 150}
+                return {
+                    'question': inputs.question,
+                    'tarot_draw_input': inputs.pos_draw + inputs.spread_facts,
+                    'numerology_facts': numerology_facts(numerology(inputs.drawn_cards, inputs.reading_mode.position)),
+                }
+        else:
+            raise ValueError
+
+class ElementsAnalyst(SandCrawler, task=taro.templates.get('insight_elements_beta', None)):
+    """
+    Elemental balance of the spread. `fast` (default) renders it from the card registry and a phrase bank with
+    no model call; `llm` generates it with the `insight_elements_beta` template.
+    """
+
+    def __init__(self, *args, mode: Literal['fast', 'llm'] = 'fast', **kwargs):
+        super().__init__(*args, **kwargs)
+        self.mode = mode
+
+    def feature_augment(self, **kwargs):
+        if inputs := as_reading(kwargs.get('inputs', None)):
             if isinstance(inputs, TarotReading):
                 return {
                     'question': inputs.question,
@@ -35,7 +77,37 @@ class NumerologyAnalyst(SandCrawler, task=taro.templates.get('insight_numerology
         else:
             raise ValueError
 
-class StoryTell(SandCrawler, task=taro.templates.get('story_tell', None)):
+    def render(self, **kwargs) -> str:
+        """ The `fast` reading. """
+        self._check_inputs(kwargs)
+        reading = as_reading(kwargs['inputs'])
+        if not isinstance(reading, TarotReading):
+            raise ValueError
+        return elemental_reading(reading.drawn_cards, reading.reading_mode.position, reading.question)
+
+    def run(self, **kwargs) -> str:
+        return self.render(**kwargs) if self.mode == 'fast' else super().run(**kwargs)
+
+    async def arun(self, **kwargs) -> str:
+        return self.render(**kwargs) if self.mode == 'fast' else await super().arun(**kwargs)
+
+    async def astream(self, **kwargs):
+        if self.mode != 'fast':
+            async for event in super().astream(**kwargs):
+                yield event
+            return
+        content = self.render(**kwargs)
+        yield {'event': 'token', 'content': content}
+        yield {'event': 'done', 'content': content, 'metrics': {}, 'prompt': None, 'cached': False}
+
+class StoryTell(
+    SandCrawler,
+    task=taro.templates.get('story_tell', None),
+    upstream=(CombinationAnalyst, NumerologyAnalyst)
+):
+    # Upstream insights given up first when the prompt exceeds the token budget
+    trimmable = ('insight_numerology', 'insight_combination')
+
     def feature_augment(self, **kwargs):
 
         if inputs := kwargs.get('inputs', None):
@@ -43,39 +115,121 @@ class StoryTell(SandCrawler, task=taro.templates.get('story_tell', None)):
                 (user := inputs.get('user')) and isinstance(user, User) and
                 (tarot := inputs.get('tarot')) and isinstance(tarot, TarotReading)
             ):
-                comb_model = CombinationAnalyst()
-                numb_model = NumerologyAnalyst()
+                # Outputs of the upstream agents; None when that node failed
+                upstream = kwargs.get('upstream', {})
+                comb_output = upstream.get(CombinationAnalyst.task.label)
+                numb_output = upstream.get(NumerologyAnalyst.task.label)
+
+                # Chain runs hand over the highlights only (see `CombinationAnalyst.excerpt`)
+                comb_response = comb_output or "No combination highlights found."
+                logger.debug("Combination highlights. Length: %d", len(comb_response))
+                self.decode_kwargs = {'num_predict': 500}
+                return {
+                    'current_timestamp': tarot.timestamp,
+                    'question': tarot.question,
+                    # Rendered from the registry, no extra generation
+                    'tarot_draw_input': f"{tarot.pos_draw}\n{elemental_summary(tarot.drawn_cards)}",
+                    'insight_combination': comb_response,
+                    'insight_numerology': numb_output or "",
+                    'user_info': kwargs.get('user_info') or user_info(user, tarot)
+                }
+        else:
+            raise ValueError
 
-                comb_output = comb_model.run(inputs=tarot)
-                numb_output = numb_model.run(inputs=tarot)
+    async def afeature_augment(self, **kwargs):
+        return self.feature_augment(**await prefetch_user_info(kwargs))
 
-                txt = f"""**User Info**\nFull Name: {user.first_name.lower().title()} {user.last_name.lower().title()}\nBirth Date: {user.birth_date}""" # type: ignore
+class TarotReader(
+    SandCrawler,
+    task=taro.templates.get('full_reading', None),
+):
+    """
+    Combination, numerology and story of a reading in one generation: the model fills one JSON object constrained
+    to `TarotPrediction`'s schema (Ollama `format`), so the system prompt is evaluated once and the sections need
+    no text scraping.
+    """
+    response_format = TarotPrediction.response_schema()
 
-                comb_response = extract_combination_highlights(comb_output)
-                logger.debug("Extracted combination highlights. Length: %d", len(comb_response or ""))
-                self.decode_kwargs = {'num_predict': 500}
+    def feature_augment(self, **kwargs):
+        if inputs := kwargs.get('inputs', None):
+            if (
+                (user := inputs.get('user')) and isinstance(user, User) and
+                (tarot := inputs.get('tarot')) and isinstance(tarot, TarotReading)
+            ):
+                # Room for all three sections (300 + 150 + 500 when generated separately)
+                self.decode_kwargs = {'num_predict': 900}
                 return {
                     'current_timestamp': tarot.timestamp,
                     'question': tarot.question,
-                    'tarot_draw_input': tarot.pos_draw,
-                    'insight_combination': comb_response,
-                    'insight_numerology': numb_output,
-                    'user_info': txt
+                    'tarot_draw_input': f"{tarot.pos_draw}{tarot.spread_facts}\n{elemental_summary(tarot.drawn_cards)}",
+                    'numerology_facts': numerology_facts(numerology(tarot.drawn_cards, tarot.reading_mode.position)),
+                    'user_info': kwargs.get('user_info') or user_info(user, tarot),
                 }
         else:
             raise ValueError
 
+    async def afeature_augment(self, **kwargs):
+        return self.feature_augment(**await prefetch_user_info(kwargs))
+
+    def predict(self, **kwargs) -> TarotPrediction:
+        return parse_prediction(self.run(**kwargs))
+
+    async def apredict(self, **kwargs) -> TarotPrediction:
+        return parse_prediction(await self.arun(**kwargs))
+
+    async def astream(self, **kwargs):
+        """ Streams the JSON as it is generated; the `done` event also carries the parsed sections. """
+        async for event in super().astream(**kwargs):
+            if event['event'] == 'done':
+                event['prediction'] = parse_prediction(event['content']).model_dump()
+            yield event
+
+def parse_prediction(content: str | None) -> TarotPrediction:
+    try:
+        return TarotPrediction.model_validate_json(content or "")
+    except ValidationError as e:
+        raise MalformedPrediction(e) from e
+
+def user_info(user: User, tarot: TarotReading, transits: DailyTransits | None = None) -> str:
+    """ The user block of StoryTell-style prompts. """
+    txt = f"""**User Info**\nFull Name: {user.first_name.lower().title()} {user.last_name.lower().title()}\nBirth Date: {user.birth_date}""" # type: ignore
+    if user.include_astrology:
+        # Only computed when the request asks for it
+        txt += f"\nSun Sign: {user.sun_sign}\nMoon Sign: {user.moon_sign}\nRising Sign: {user.rising_sign}"
+        # Shared by every user of the same day and timezone bucket: a cache hit after the first reading
+        transits = transits or DailyTransits.for_day(reading_day(tarot.timestamp), user.birth_place)
+        txt += f"\nToday's Transits: {transits.horoscope(user.sun_sign)}"
+    return txt
+
+async def auser_info(user: User, tarot: TarotReading) -> str:
+    """ Awaitable `user_info`: the natal chart runs in the chart pool and missing transits in a thread. """
+    transits = None
+    if user.include_astrology:
+        await user.aload_astrology()
+        transits = await DailyTransits.afor_day(reading_day(tarot.timestamp), user.birth_place)
+    return user_info(user, tarot, transits)
+
+async def prefetch_user_info(kwargs: dict) -> dict:
+    """ `feature_augment` kwargs with the user block computed without blocking the event loop. """
+    inputs = kwargs.get('inputs', None)
+    if isinstance(inputs, dict):
+        user, tarot = inputs.get('user'), inputs.get('tarot')
+        if isinstance(user, User) and isinstance(tarot, TarotReading):
+            return {**kwargs, 'user_info': await auser_info(user, tarot)}
+    return kwargs
+
+def reading_day(timestamp) -> date | None:
+    """ Calendar day of a reading's timestamp; None (today) when it cannot be parsed. """
+    try:
+        return datetime.fromisoformat(str(timestamp)).date()
+    except ValueError:
+        return None
+
 def extract_combination_highlights(text: str) -> str:
-    pattern = r"\*\*Combination Highlights\*\*(.*?)\*\*Possible insights"
-    match = re.search(pattern, text, re.DOTALL)
-    if match:
-        return match.group(1).strip()
-    return "No combination highlights found."
+    """ The highlights section of a complete CombinationAnalyst output. """
+    return CombinationAnalyst.excerpt.extract(text) or "No combination highlights found."
 
 if __name__ == "__main__":
-    from src.schemas import User
-    from datetime import datetime
-
     sample_user = User(
         id='12345',
         username='julie.lenova',
@@ -93,6 +247,5 @@ if __name__ == "__main__":
 
     stry = StoryTell()
     output = stry.run(inputs={'user': sample_user, 'tarot': sample_tarot})
-    logger = setup_logger(__name__)
     logger.info("StoryTell sample output length: %d", len(output or ""))
     # Example output
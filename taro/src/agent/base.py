@@ -4,39 +4,354 @@ src/agent/base.py
 Base Class builders for Tarot Reading Agent.
 """
 
+import asyncio
 import re
+import time
 from abc import abstractmethod, ABC
+from dataclasses import replace
 
-from utils.woodpecker import ErrorSettingUpModelChain
-from src.agent.client import setup_client, LLM_MODEL_ID, OPTIONS
+import ollama
+
+from utils.cache import make_key
+from utils.handler import TaroAction
+from utils.settings import setting
+from utils.woodpecker import ErrorSettingUpModelChain, setup_logger
+from src.agent.budget import BudgetReport, fit_prompt, prompt_budget
+from src.agent.cache import inflight, is_cacheable, prompt_cache, prompt_key, response_cache
+from src.agent.chain import ChainRunner, NodeResult, outputs, upstream_closure
+from src.agent.gateway import gateway
+from src.agent.sections import Section, SectionParser
+from src.agent.scheduler import Ticket
+from src.agent.client import get_async_client, get_client, timing_metrics, KEEP_ALIVE, LLM_MODEL_ID, OPTIONS
+
+logger = setup_logger(__name__)
 
 class SandCrawler(ABC):
+    # Prompt inputs that may be shortened (in this order) to fit the token budget
+    trimmable: tuple[str, ...] = ()
+    # JSON schema the output is constrained to (Ollama `format`); free text when None
+    response_format: dict | None = None
+    # The part of the output downstream agents read: as a chain node, generation stops once it is complete
+    excerpt: Section | None = None
+
+    def __init__(
+        self,
+        client: ollama.Client | None = None,
+        aclient: ollama.AsyncClient | None = None,
+        timeout: float | None = None,
+        ticket: Ticket | None = None,
+    ):
+        # Pooled clients owned by the app lifespan; fall back to the process-wide ones.
+        self.client = client or get_client()
+        self.aclient = aclient or get_async_client()
+        # Request deadline for getting a generation slot from the gateway (shared with upstream agents)
+        self.deadline = time.monotonic() + (timeout or setting.gateway.timeout)
+        # Who the generation is for (fair scheduling lane and quota)
+        self.ticket = ticket or Ticket()
+        # Per-node timings / errors of the last upstream chain run
+        self.trace: dict[str, NodeResult] = {}
+        # Token accounting of the last prompt sent
+        self.budget: BudgetReport | None = None
+        # Ollama's timing counters of the last generation
+        self.metrics: dict = {}
+
     @abstractmethod
     def feature_augment(self, **kwargs) -> dict | None:
         """ Subclasses must implement this to preprocess or validate input. Must return dict type. """
         pass
 
+    async def afeature_augment(self, **kwargs) -> dict | None:
+        """ Awaitable `feature_augment` used by `arun`. Defaults to the synchronous hook. """
+        return self.feature_augment(**kwargs)
+
     def run(self, **kwargs) -> str: # type: ignore
         """ Main entrypoint to run the data pipeline and return model output."""
 
-        if 'inputs' not in kwargs:
-            raise ValueError(f'Expected `inputs` to be one of the passing keys of kwargs but received: {kwargs}')
+        self._check_inputs(kwargs)
+
+        if self.upstream and 'upstream' not in kwargs:
+            self.trace = ChainRunner(self).run(**kwargs)
+            kwargs['upstream'] = outputs(self.trace, self.upstream)
 
         if inputs := self.feature_augment(**kwargs):
             # Avoid logging full user inputs to prevent PII leakage
-            message = list(self.task.prepare_prompt(**inputs))
-            # Fetch Client and validate connection / ollana active
-            client = setup_client()
+            message = self.prepare(inputs)
+
+            key = self.cache_key(message)
+            return inflight.do_sync(key, lambda: self._generate(key, message))
+
+    def _generate(self, key: str, message: list[dict]) -> str | None:
+        if (cached := self._cached(key)) is not None:
+            return cached
+
+        # Client output
+        with gateway.slot_sync(self.remaining(), self.scheduled()):
+            output = self.client.chat(
+                model=LLM_MODEL_ID,
+                messages=message,
+                stream=False,
+                options=self._decode_options,
+                format=self.response_format,
+                keep_alive=KEEP_ALIVE
+            )
+
+        self._measure(output)
+        return self._remember(key, output.message.get('content', None))
+
+    async def arun(self, **kwargs) -> str: # type: ignore
+        """ Awaitable `run` on the async Ollama client; keeps the event loop free while the model generates. """
 
-            # Client output
-            output = client.chat(
+        if message := await self._amessages(kwargs):
+            key = self.cache_key(message)
+            # Concurrent identical readings share one in-flight generation
+            return await inflight.do(key, lambda: self._agenerate(key, message))
+
+    async def _agenerate(self, key: str, message: list[dict]) -> str | None:
+        if (cached := await self._acached(key)) is not None:
+            return cached
+
+        async with gateway.slot(self.remaining(), self.scheduled()):
+            output = await self.aclient.chat(
                 model=LLM_MODEL_ID,
                 messages=message,
                 stream=False,
-                options=self._decode_options
+                options=self._decode_options,
+                format=self.response_format,
+                keep_alive=KEEP_ALIVE
             )
 
-            return output.message.get('content', None)
+        self._measure(output)
+        return await self._aremember(key, output.message.get('content', None))
+
+    def run_section(self, **kwargs) -> str | None:
+        """ `run` for chain nodes: returns only `excerpt`, stopping the generation as soon as it is complete. """
+
+        self._check_inputs(kwargs)
+
+        if inputs := self.feature_augment(**kwargs):
+            message = self.prepare(inputs)
+            key = self.cache_key(message)
+            return inflight.do_sync(make_key(key, 'section'), lambda: self._generate_section(key, message))
+
+    def _generate_section(self, key: str, message: list[dict]) -> str | None:
+        if (cached := self._cached_section(key)) is not None:
+            return cached
+
+        parser = self.excerpt.parser()
+        with gateway.slot_sync(self.remaining(), self.scheduled()):
+            stream = self.client.chat(
+                model=LLM_MODEL_ID,
+                messages=message,
+                stream=True,
+                options=self._decode_options,
+                format=self.response_format,
+                keep_alive=KEEP_ALIVE
+            )
+            try:
+                for chunk in stream:
+                    if parser.feed(chunk.message.get('content', None)):
+                        break
+                    if chunk.done:
+                        self._measure(chunk)
+            finally:
+                # Closing the response makes Ollama stop generating
+                stream.close()
+
+        return self._remember_section(key, parser)
+
+    async def arun_section(self, **kwargs) -> str | None:
+        """ Awaitable `run_section`. """
+
+        if message := await self._amessages(kwargs):
+            key = self.cache_key(message)
+            return await inflight.do(make_key(key, 'section'), lambda: self._agenerate_section(key, message))
+
+    async def _agenerate_section(self, key: str, message: list[dict]) -> str | None:
+        if (cached := await self._acached_section(key)) is not None:
+            return cached
+
+        parser = self.excerpt.parser()
+        async with gateway.slot(self.remaining(), self.scheduled()):
+            stream = await self.aclient.chat(
+                model=LLM_MODEL_ID,
+                messages=message,
+                stream=True,
+                options=self._decode_options,
+                format=self.response_format,
+                keep_alive=KEEP_ALIVE
+            )
+            try:
+                async for chunk in stream:
+                    if parser.feed(chunk.message.get('content', None)):
+                        break
+                    if chunk.done:
+                        self._measure(chunk)
+            finally:
+                await stream.aclose()
+
+        return await self._aremember_section(key, parser)
+
+    def _cached_section(self, key: str) -> str | None:
+        """ The excerpt from a cached full output, or a cached excerpt. """
+        if (cached := self._cached(key)) is not None:
+            return self.excerpt.extract(cached)
+        return self._cached(make_key(key, 'section'))
+
+    async def _acached_section(self, key: str) -> str | None:
+        if (cached := await self._acached(key)) is not None:
+            return self.excerpt.extract(cached)
+        return await self._acached(make_key(key, 'section'))
+
+    def _remember_section(self, key: str, parser: SectionParser) -> str | None:
+        section, entries = self._section_entries(key, parser)
+        for entry_key, content in entries:
+            self._remember(entry_key, content)
+        return section
+
+    async def _aremember_section(self, key: str, parser: SectionParser) -> str | None:
+        section, entries = self._section_entries(key, parser)
+        for entry_key, content in entries:
+            await self._aremember(entry_key, content)
+        return section
+
+    def _section_entries(self, key: str, parser: SectionParser) -> tuple[str | None, list[tuple[str, str]]]:
+        """ The excerpt and the cache entries a section run leaves: the full output if it got there, and the excerpt. """
+        entries = []
+        if parser.done:
+            logger.debug("%s stopped after its excerpt (%d chars generated)", self.task.label, len(parser.text))
+        else:
+            # Generated to the end: that is the full output
+            entries.append((key, parser.text))
+        section = parser.close()
+        if section is not None:
+            # The seeded generation is deterministic, so its prefix is as reusable as the full text
+            entries.append((make_key(key, 'section'), section))
+        return section, entries
+
+    async def astream(self, **kwargs):
+        """
+        Streams the generation as events: one `token` event per chunk, then a `done` event carrying
+        the complete text, Ollama's timing counters and the prompt's token accounting. Agents with an
+        upstream chain first send a `progress` event at once and one more as each upstream node finishes,
+        since no token can be generated before the chain is done.
+        """
+
+        self._check_inputs(kwargs)
+        if self.upstream and 'upstream' not in kwargs:
+            async for event in self._astream_chain(kwargs):
+                yield event
+
+        if message := await self._amessages(kwargs):
+            key = self.cache_key(message)
+            if (cached := await self._acached(key)) is not None:
+                yield {'event': 'token', 'content': cached}
+                yield {'event': 'done', 'content': cached, 'metrics': {}, 'prompt': self.budget.as_dict(), 'cached': True}
+                return
+
+            parts, metrics = [], {}
+            async with gateway.slot(self.remaining(), self.scheduled()):
+                async for chunk in await self.aclient.chat(
+                    model=LLM_MODEL_ID,
+                    messages=message,
+                    stream=True,
+                    options=self._decode_options,
+                    format=self.response_format,
+                    keep_alive=KEEP_ALIVE
+                ):
+                    if text := chunk.message.get('content', None):
+                        parts.append(text)
+                        yield {'event': 'token', 'content': text}
+                    if chunk.done:
+                        metrics = self._measure(chunk)
+
+            content = await self._aremember(key, ''.join(parts))
+            yield {'event': 'done', 'content': content, 'metrics': metrics, 'prompt': self.budget.as_dict(), 'cached': False}
+
+    async def _astream_chain(self, kwargs: dict):
+        """ Runs the upstream chain into `kwargs['upstream']`, yielding a `progress` event per finished node. """
+        total = len(upstream_closure(self))
+        finished: asyncio.Queue = asyncio.Queue()
+
+        async def run_chain():
+            try:
+                self.trace = await ChainRunner(self).arun(on_node=finished.put_nowait, **kwargs)
+            finally:
+                finished.put_nowait(None)
+
+        yield {'event': 'progress', 'completed': 0, 'total': total}
+        chain = asyncio.create_task(run_chain())
+        try:
+            completed = 0
+            while (node := await finished.get()) is not None:
+                completed += 1
+                yield {
+                    'event': 'progress', 'completed': completed, 'total': total,
+                    'node': node.label, 'ok': node.ok, 'elapsed': round(node.elapsed, 3),
+                }
+            await chain
+        finally:
+            # Client went away mid-chain: stop the upstream generations too
+            chain.cancel()
+        kwargs['upstream'] = outputs(self.trace, self.upstream)
+
+    async def _amessages(self, kwargs: dict) -> list[dict] | None:
+        """ Runs the upstream chain and `afeature_augment`, returning the chat messages for this agent. """
+
+        self._check_inputs(kwargs)
+
+        if self.upstream and 'upstream' not in kwargs:
+            self.trace = await ChainRunner(self).arun(**kwargs)
+            kwargs['upstream'] = outputs(self.trace, self.upstream)
+
+        if inputs := await self.afeature_augment(**kwargs):
+            return self.prepare(inputs)
+
+    def prepare(self, inputs: dict) -> list[dict]:
+        """ Renders the chat messages, shrunk to fit the context left after `num_predict`. """
+        message, self.budget = fit_prompt(self.task, inputs, prompt_budget(self._decode_options), self.trimmable)
+        return message
+
+    def _measure(self, response) -> dict:
+        """ Keeps the response's timing counters, adding an estimate of the prompt tokens served from Ollama's KV cache. """
+        self.metrics = timing_metrics(response)
+        self.metrics['prompt_cached_estimate'] = prompt_cache.record(self.budget.total, self.metrics)
+        return self.metrics
+
+    def remaining(self) -> float:
+        """ Seconds left before this request's deadline. """
+        return max(self.deadline - time.monotonic(), 0.001)
+
+    def scheduled(self) -> Ticket:
+        """ This agent's ticket, costed by its generation length relative to the default `num_predict`. """
+        return replace(self.ticket, cost=(self._decode_options.num_predict or OPTIONS.num_predict) / OPTIONS.num_predict)
+
+    def cache_key(self, message: list[dict]) -> str:
+        """ Prompt identity used by the response cache and single-flight: label + messages + model + decode options. """
+        return prompt_key(self.task.label, message, LLM_MODEL_ID, self._decode_options)
+
+    def _cached(self, key: str) -> str | None:
+        if is_cacheable(self._decode_options):
+            return response_cache.get(key)
+
+    def _remember(self, key: str, content: str | None) -> str | None:
+        if content and is_cacheable(self._decode_options):
+            response_cache.set(key, content)
+        return content
+
+    async def _acached(self, key: str) -> str | None:
+        """ `_cached` for the async paths: a disk-tier lookup runs off the event loop. """
+        if is_cacheable(self._decode_options):
+            return await response_cache.aget(key)
+
+    async def _aremember(self, key: str, content: str | None) -> str | None:
+        if content and is_cacheable(self._decode_options):
+            await response_cache.aset(key, content)
+        return content
+
+    @staticmethod
+    def _check_inputs(kwargs: dict):
+        if 'inputs' not in kwargs:
+            raise ValueError(f'Expected `inputs` to be one of the passing keys of kwargs but received: {kwargs}')
 
     @property
     def decode_kwargs(self):
@@ -54,12 +369,14 @@ class SandCrawler(ABC):
         else:
             raise TypeError("decode_kwargs must be set with a dictionary.")
 
-    def __init_subclass__(cls, task: TaroAction | str | None, **kwargs):
+    def __init_subclass__(cls, task: TaroAction | str | None, upstream: tuple[type['SandCrawler'], ...] = (), **kwargs):
         super().__init_subclass__(**kwargs)
 
         if isinstance(task, str) or not task:
             raise ErrorSettingUpModelChain(task)
 
         cls.task = task
+        # Agents whose outputs feed this one's prompt (keyed by their task label in `feature_augment(upstream=...)`)
+        cls.upstream = tuple(upstream)
         cls._decode_options = OPTIONS.copy()
-        print(f"Succesfully registered new Jawa member, {cls.__qualname__}(id: {cls.task.label if isinstance(cls.task, TaroAction) else ''})to our SandCrawler!", exc_info=True)
+        logger.debug(f"Succesfully registered new Jawa member, {cls.__qualname__}(id: {cls.task.label if isinstance(cls.task, TaroAction) else ''})to our SandCrawler!")
@@ -0,0 +1,168 @@
+"""
+src/agent/budget.py
+
+Prompt token budgeting. Counts the prompt's tokens before dispatch and shrinks it to fit the model
+context (`num_ctx` minus the tokens reserved for the generation), so Ollama never silently truncates it.
+
+Reductions are applied in this order until the prompt fits:
+    1. shorten the example response in the system prompt
+    2. drop the example from the system prompt
+    3. trim the agent's `trimmable` inputs (upstream insights), in their declared order
+"""
+
+import re
+from dataclasses import dataclass, field
+
+from utils.handler import EXAMPLE_LEVELS, TaroAction
+from utils.settings import setting
+from utils.woodpecker import setup_logger
+
+logger = setup_logger(__name__)
+
+# Chat-template tokens added per message (role header + end of turn)
+MESSAGE_OVERHEAD = 5
+# Tokens kept free under the budget to absorb counting error
+SAFETY_MARGIN = 32
+
+# Rough BPE pre-tokenization: words, up to 3 digits, single symbols, newline runs, spaces
+_PIECES = re.compile(r"[^\W\d_]+|\d{1,3}|[^\w\s]|\n+| +", re.UNICODE)
+
+def _load_tokenizer():
+    """ Exact counts when a HF `tokenizer.json` for the served model is configured and `tokenizers` is installed. """
+    if not setting.budget.tokenizer_path:
+        return None
+    try:
+        from tokenizers import Tokenizer
+        return Tokenizer.from_file(setting.budget.tokenizer_path)
+    except Exception:
+        logger.warning("Tokenizer unavailable at %s; estimating prompt tokens.", setting.budget.tokenizer_path, exc_info=True)
+        return None
+
+_tokenizer = _load_tokenizer()
+
+# Example level `fit_prompt` last settled on per action: the system prompt worth keeping in Ollama's prompt cache
+picked_levels: dict[str, str] = {}
+
+def estimate_tokens(text: str) -> int:
+    """ Llama-style BPE token estimate (slightly conservative for English prose). """
+    tokens = 0
+    for piece in _PIECES.findall(text):
+        if piece[0] == ' ':
+            continue  # leading spaces merge into the following word
+        if piece[0] == '\n' or not piece.isalpha():
+            tokens += 1
+        elif piece.isascii():
+            tokens += 1 + (len(piece) - 1) // 6
+        else:
+            tokens += max(1, len(piece.encode('utf-8')) // 3)
+    return tokens
+
+def count_tokens(text: str) -> int:
+    if _tokenizer is not None:
+        return len(_tokenizer.encode(text, add_special_tokens=False).ids)
+    return estimate_tokens(text)
+
+def prompt_budget(options) -> int:
+    """ Prompt tokens allowed: PROMPT_TOKEN_BUDGET, or whatever `num_ctx` leaves after `num_predict`. """
+    budget = setting.budget.tokens or (options.num_ctx or 2048) - (options.num_predict or 0)
+    return max(budget - SAFETY_MARGIN, 0)
+
+def system_level(task: TaroAction, budget: int) -> str:
+    """ The example level `fit_prompt` last picked for `task`, or the first whose system prompt fits `budget` on its own. """
+    if level := picked_levels.get(task.label):
+        return level
+    for level in EXAMPLE_LEVELS:
+        if count_tokens(task.system_prompt_for(level)) + 2 * MESSAGE_OVERHEAD <= budget:
+            return level
+    return EXAMPLE_LEVELS[-1]
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """ Keeps whole lines (then words) of `text` within `max_tokens`. """
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+
+    kept, used = [], 1  # reserve the ellipsis
+    for line in text.splitlines():
+        cost = count_tokens(line) + 1
+        if used + cost > max_tokens:
+            words = []
+            for word in line.split():
+                if used + count_tokens(word) > max_tokens:
+                    break
+                words.append(word)
+                used += count_tokens(word)
+            if words:
+                kept.append(" ".join(words))
+            break
+        kept.append(line)
+        used += cost
+    return "\n".join(kept + ["..."])
+
+
+@dataclass(slots=True)
+class BudgetReport:
+    budget: int
+    system_tokens: int
+    user_tokens: int
+    example: str = 'full'
+    steps: list[str] = field(default_factory=list)
+
+    @property
+    def total(self) -> int:
+        return self.system_tokens + self.user_tokens + 2 * MESSAGE_OVERHEAD
+
+    @property
+    def fits(self) -> bool:
+        return self.total <= self.budget
+
+    def as_dict(self) -> dict:
+        return {
+            'budget': self.budget,
+            'total': self.total,
+            'system_tokens': self.system_tokens,
+            'user_tokens': self.user_tokens,
+            'example': self.example,
+            'steps': list(self.steps),
+        }
+
+
+def fit_prompt(task: TaroAction, inputs: dict, budget: int, trimmable: tuple[str, ...] = ()) -> tuple[list[dict], BudgetReport]:
+    """ Renders the chat messages for `task`, applying the reductions above until they fit `budget`. """
+    inputs = dict(inputs)
+    user = task.user_prompt(**inputs)
+    report = BudgetReport(budget=budget, system_tokens=0, user_tokens=count_tokens(user))
+
+    for level in EXAMPLE_LEVELS:
+        system = task.system_prompt_for(level)
+        report.system_tokens = count_tokens(system)
+        report.example = level
+        if level != 'full':
+            report.steps.append(f"example:{level}")
+        if report.fits:
+            break
+    picked_levels[task.label] = report.example
+
+    for key in trimmable:
+        if report.fits:
+            break
+        report.steps.append(f"trim:{key}")
+        # Template overhead around the input makes the first cut approximate; repeat until it fits or is empty
+        while not report.fits and (text := inputs.get(key)):
+            size = count_tokens(text)
+            trimmed = truncate_tokens(text, size - (report.total - budget))
+            inputs[key] = trimmed if count_tokens(trimmed) < size else ""
+            user = task.user_prompt(**inputs)
+            report.user_tokens = count_tokens(user)
+
+    if not report.fits:
+        logger.warning(
+            "Prompt for %s is over budget after all reductions: %d > %d tokens.", task.label, report.total, budget
+        )
+    elif report.steps:
+        logger.info(
+            "Prompt for %s shrunk to %d/%d tokens (%s).", task.label, report.total, budget, ", ".join(report.steps)
+        )
+
+    return [{"role": "system", "content": system}, {"role": "user", "content": user}], report
@@ -0,0 +1,82 @@
+"""
+src/agent/cache.py
+
+Response cache for agent outputs. With a pinned `seed` the same prompt + decode options
+always generate the same text, so identical readings are served without calling Ollama.
+
+Also estimates how much of each prompt Ollama served from its own KV (prompt) cache.
+"""
+
+import threading
+
+from utils.cache import TieredCache, make_key
+from utils.flight import SingleFlight
+from utils.settings import resolve_path, setting
+
+response_cache = TieredCache(
+    'responses',
+    max_entries=setting.cache.max_entries,
+    max_bytes=setting.cache.max_bytes,
+    ttl=setting.cache.ttl,
+    path=resolve_path(setting.cache.path),
+    max_disk_entries=setting.cache.disk_max_entries,
+    max_disk_bytes=setting.cache.disk_max_bytes,
+)
+
+# Identical generations already running are awaited instead of re-sent to Ollama
+inflight = SingleFlight()
+
+def options_dict(options) -> dict:
+    """ Plain dict of the decode options that are set. """
+    if hasattr(options, 'model_dump'):
+        return options.model_dump(exclude_none=True)
+    return {key: val for key, val in dict(options).items() if val is not None}
+
+def prompt_key(label: str, messages: list[dict], model: str, options) -> str:
+    """ Identity of a generation: action label + rendered messages + model + decode options. """
+    return make_key(label, messages, model, options_dict(options))
+
+def is_cacheable(options) -> bool:
+    """ Outputs are only reusable when the decode options pin a seed. """
+    return setting.cache.enabled and options_dict(options).get('seed') is not None
+
+
+class PromptCacheStats:
+    """
+    Prompt tokens evaluated vs reused from Ollama's KV cache. Ollama's `prompt_eval_count` only counts the
+    tokens it had to evaluate; the prompt's size comes from the budgeter's count (a heuristic unless a
+    tokenizer is configured, plus an estimated chat-template overhead), so the reuse figures are estimates.
+    Only `evaluated` and `eval_seconds` are Ollama's own counters.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.evaluated = 0
+        self.eval_seconds = 0.0
+
+    def record(self, prompt_tokens: int, metrics: dict) -> int:
+        """ Records one generation's counters; returns the estimated prompt tokens served from cache. """
+        if (evaluated := metrics.get('prompt_eval_count')) is None:
+            return 0
+        reused = max(prompt_tokens - evaluated, 0)
+        with self._lock:
+            self.requests += 1
+            self.prompt_tokens += max(prompt_tokens, evaluated)
+            self.evaluated += evaluated
+            self.eval_seconds += (metrics.get('prompt_eval_duration') or 0) / 1e9
+        return reused
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'evaluated': self.evaluated,
+                'eval_seconds': round(self.eval_seconds, 3),
+                'prompt_tokens_estimate': self.prompt_tokens,
+                'reused_estimate': self.prompt_tokens - self.evaluated,
+                'reuse_ratio_estimate': round(1 - self.evaluated / self.prompt_tokens, 3) if self.prompt_tokens else 0.0,
+            }
+
+prompt_cache = PromptCacheStats()
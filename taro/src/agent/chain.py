@@ -0,0 +1,123 @@
+"""
+src/agent/chain.py
+
+Executes the upstream agents a SandCrawler declares (its prompt chain DAG).
+
+Independent nodes run concurrently on the async path; each node is timed and a failing node
+only blanks its own output for the nodes downstream of it. Nodes that declare an `excerpt` only
+generate up to the end of that section, which is all their downstream agents are handed.
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+from utils.woodpecker import setup_logger
+
+logger = setup_logger(__name__)
+
+@dataclass(slots=True)
+class NodeResult:
+    label: str
+    output: str | None = None
+    elapsed: float = 0.0
+    error: Exception | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def upstream_closure(root) -> list[type]:
+    """ Returns every agent class the root depends on (transitively), in dependency order. """
+    ordered: list[type] = []
+
+    def visit(cls):
+        for up in cls.upstream:
+            visit(up)
+        if cls not in ordered:
+            ordered.append(cls)
+
+    for up in root.upstream:
+        visit(up)
+    return ordered
+
+
+def outputs(results: dict[str, NodeResult], classes) -> dict[str, str | None]:
+    """ Maps upstream results to the `upstream` kwarg handed to `feature_augment` (None for failed nodes). """
+    return {cls.task.label: results[cls.task.label].output for cls in classes}
+
+
+class ChainRunner:
+    """ Runs the upstream DAG of `root`, reusing its Ollama clients. """
+
+    def __init__(self, root):
+        self.root = root
+
+    def _agent(self, cls):
+        return cls(
+            client=self.root.client,
+            aclient=self.root.aclient,
+            timeout=self.root.remaining(),
+            ticket=self.root.ticket,
+        )
+
+    def run(self, **kwargs) -> dict[str, NodeResult]:
+        """ Sequential execution in dependency order (sync path). """
+        results: dict[str, NodeResult] = {}
+
+        for cls in upstream_closure(self.root):
+            label = cls.task.label
+            start = time.perf_counter()
+            try:
+                agent = self._agent(cls)
+                run = agent.run_section if cls.excerpt else agent.run
+                output = run(upstream=outputs(results, cls.upstream), **kwargs)
+                results[label] = NodeResult(label, output, time.perf_counter() - start)
+            except Exception as e:
+                results[label] = NodeResult(label, None, time.perf_counter() - start, e)
+            self._log(results[label])
+
+        return results
+
+    async def arun(self, on_node: Callable[[NodeResult], None] | None = None, **kwargs) -> dict[str, NodeResult]:
+        """
+        Concurrent execution: every node starts as soon as its own upstream nodes are done.
+        `on_node` is called with each node's result as it finishes (e.g. to report streaming progress).
+        """
+        tasks: dict[type, asyncio.Task] = {}
+
+        def schedule(cls) -> asyncio.Task:
+            if cls not in tasks:
+                deps = [schedule(up) for up in cls.upstream]
+                tasks[cls] = asyncio.create_task(self._anode(cls, deps, kwargs, on_node))
+            return tasks[cls]
+
+        for cls in self.root.upstream:
+            schedule(cls)
+
+        done = await asyncio.gather(*tasks.values())
+        return {result.label: result for result in done}
+
+    async def _anode(self, cls, deps: list[asyncio.Task], kwargs: dict, on_node=None) -> NodeResult:
+        upstream = {result.label: result.output for result in await asyncio.gather(*deps)}
+        label = cls.task.label
+        start = time.perf_counter()
+        try:
+            agent = self._agent(cls)
+            arun = agent.arun_section if cls.excerpt else agent.arun
+            output = await arun(upstream=upstream, **kwargs)
+            result = NodeResult(label, output, time.perf_counter() - start)
+        except Exception as e:
+            result = NodeResult(label, None, time.perf_counter() - start, e)
+        self._log(result)
+        if on_node is not None:
+            on_node(result)
+        return result
+
+    def _log(self, result: NodeResult):
+        if result.ok:
+            logger.info("Chain node %s finished in %.2fs", result.label, result.elapsed)
+        else:
+            logger.warning("Chain node %s failed after %.2fs: %r", result.label, result.elapsed, result.error)
@@ -3,11 +3,16 @@ src/agent/client.py
 
 """
 
-import os
+import asyncio
+
+import httpx
 import ollama
 
-from ...utils.woodpecker import BadOllamaSetup, setup_logger
-from ...utils.settings import setting
+from utils.woodpecker import BadOllamaSetup, setup_logger
+from utils.settings import setting
+from src.agent.budget import prompt_budget, system_level
+from src.agent.gateway import gateway
+from src.agent.scheduler import Priority, Ticket
 
 logger = setup_logger(__name__)
 
@@ -29,15 +34,122 @@ OPTIONS = ollama._types.Options( # type: ignore
 )
 
 LLM_MODEL_ID = setting.llm_id
+KEEP_ALIVE = setting.server.keep_alive
+
+# Timing counters reported on Ollama's final (done) response
+TIMING_METRICS = (
+    'total_duration',
+    'load_duration',
+    'prompt_eval_count',
+    'prompt_eval_duration',
+    'eval_count',
+    'eval_duration',
+)
+
+_client: ollama.Client | None = None
+_async_client: ollama.AsyncClient | None = None
+
+def _pool_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=setting.server.max_connections,
+        max_keepalive_connections=setting.server.max_keepalive,
+        keepalive_expiry=setting.server.keepalive_expiry,
+    )
+
+def create_client(host_url: str = setting.server.ollama) -> ollama.Client:
+    """ Builds a connection-pooled (keep-alive) Ollama client meant to be shared across requests. """
+    return ollama.Client(host_url, timeout=setting.server.timeout, limits=_pool_limits())
+
+def create_async_client(host_url: str = setting.server.ollama) -> ollama.AsyncClient:
+    """ Async counterpart of `create_client` used by the FastAPI handlers so generations never block the event loop. """
+    return ollama.AsyncClient(host_url, timeout=setting.server.timeout, limits=_pool_limits())
 
-def setup_client(host_url: str = setting.server.ollama):
+def timing_metrics(response) -> dict:
+    """ Extracts Ollama's timing counters (durations in ns) from a chat response. """
+    return {key: getattr(response, key, None) for key in TIMING_METRICS}
+
+def verify_model(client: ollama.Client) -> None:
+    """ Checks that Ollama is reachable and has our model pulled. Makes a single `list()` round trip. """
+    models = tuple(m.model for m in client.list().models)
+
+    if LLM_MODEL_ID not in models:
+        raise BadOllamaSetup
+
+async def averify_model(client: ollama.AsyncClient) -> None:
+    """ Awaitable `verify_model`. """
+    models = tuple(m.model for m in (await client.list()).models)
+
+    if LLM_MODEL_ID not in models:
+        raise BadOllamaSetup
+
+def setup_client(host_url: str = setting.server.ollama) -> ollama.Client:
     """ Check and setups client connection to Ollama container from docker-compose. """
+    client = create_client(host_url)
+    verify_model(client)
+    return client
+
+def get_client() -> ollama.Client:
+    """ Returns the process-wide pooled client, created on first use (e.g. scripts running outside the app lifespan). """
+    global _client
+    if _client is None:
+        _client = create_client()
+    return _client
+
+def get_async_client() -> ollama.AsyncClient:
+    """ Returns the process-wide pooled async client, created on first use. """
+    global _async_client
+    if _async_client is None:
+        _async_client = create_async_client()
+    return _async_client
 
-    client = ollama.Client(host_url)
+def close_client(client: ollama.Client) -> None:
+    """ Releases the pooled connections held by the client. """
+    client._client.close()
 
-    N = len(client.list().models)
+async def aclose_client(client: ollama.AsyncClient) -> None:
+    """ Releases the pooled connections held by the async client. """
+    await client._client.aclose()
 
-    if N > 0 and LLM_MODEL_ID in tuple(m.model for m in client.list().models):
-        return client
+async def warm_prefixes(client: ollama.AsyncClient, actions) -> None:
+    """
+    Evaluates each action's static system prompt once so Ollama keeps its KV in the prompt cache.
+    Requests with a byte-identical system message then only evaluate the user turn, so the prompt warmed
+    is the example level the budgeter picks for that action. Uses the same `num_ctx` as real requests
+    (a different one would reload the model) and the batch lane.
+    """
+    options = OPTIONS.copy()
+    options.num_predict = 1
+    budget = prompt_budget(OPTIONS)
+    for action in actions:
+        level = system_level(action, budget)
+        try:
+            async with gateway.slot(ticket=Ticket(priority=Priority.BATCH, metered=False)):
+                response = await client.chat(
+                    model=LLM_MODEL_ID,
+                    messages=[{"role": "system", "content": action.system_prompt_for(level)}],
+                    stream=False,
+                    options=options,
+                    keep_alive=KEEP_ALIVE,
+                )
+            logger.info("Warmed %s prompt prefix (%s example, %s tokens).", action.label, level, response.prompt_eval_count)
+        except Exception:
+            logger.warning("Could not warm %s prompt prefix.", action.label, exc_info=True)
 
-    raise BadOllamaSetup
+async def watch_health(state, interval: float = setting.server.health_interval, actions=()):
+    """
+    Background loop re-checking the model presence every `interval` seconds; flags `state.ollama_ready`.
+    Re-warms the `actions` prompt prefixes when the model comes back (e.g. after an Ollama restart).
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await averify_model(state.aollama)
+            if not state.ollama_ready:
+                logger.info("Ollama model %s available again.", LLM_MODEL_ID)
+                state.ollama_ready = True
+                if setting.server.warm_prefixes:
+                    await warm_prefixes(state.aollama, actions)
+        except Exception:
+            if state.ollama_ready:
+                logger.warning("Ollama health check failed; model %s unavailable.", LLM_MODEL_ID, exc_info=True)
+            state.ollama_ready = False
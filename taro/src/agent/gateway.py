@@ -0,0 +1,226 @@
+"""
+src/agent/gateway.py
+
+Concurrency-limited gateway every SandCrawler generation goes through.
+
+At most `max_parallel` generations are in flight (matching Ollama's OLLAMA_NUM_PARALLEL); the rest wait in a
+bounded, per-user fair queue (see `scheduler.py`). Requests are shed up front (429 when the queue is full or the
+user is over quota, 503 when the expected wait already exceeds their deadline) instead of spending GPU time on
+readings whose clients have given up.
+"""
+
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, field
+from typing import Callable
+
+from src.agent.scheduler import FairQueue, QuotaBook, Ticket
+from utils.settings import setting
+from utils.woodpecker import GatewayOverloaded, GatewayQueueFull, UserQuotaExceeded, setup_logger
+
+logger = setup_logger(__name__)
+
+# Weight of the latest sample in the moving averages
+EWMA_ALPHA = 0.2
+
+@dataclass(slots=True)
+class _Waiter:
+    deadline: float
+    wake: Callable[[], None]
+    ticket: Ticket
+    enqueued: float = field(default_factory=time.monotonic)
+    granted: bool = False
+    # Maintained by FairQueue
+    tag: float = 0.0
+    queued: bool = False
+
+
+class LLMGateway:
+    def __init__(
+        self,
+        max_parallel: int,
+        max_queue: int,
+        timeout: float,
+        service_estimate: float = 10.0,
+        user_rate: float = 0.0,
+        user_burst: float = 1.0,
+    ):
+        self.max_parallel = max_parallel
+        self.max_queue = max_queue
+        self.timeout = timeout
+
+        self._lock = threading.Lock()
+        self._active = 0
+        self._queue = FairQueue()
+        self._quota = QuotaBook(rate=user_rate, burst=user_burst)
+
+        # Metrics
+        self.service_time = service_estimate
+        self.wait_time = 0.0
+        self.max_wait = 0.0
+        self.admitted = 0
+        self.rejected_full = 0
+        self.rejected_deadline = 0
+        self.rejected_quota = 0
+        self.expired = 0
+
+    def expected_wait(self, ahead: int | None = None) -> float:
+        """ Estimated seconds before a new request gets a slot, given `ahead` requests that would be served first. """
+        ahead = len(self._queue) if ahead is None else ahead
+        if self._active < self.max_parallel and ahead == 0:
+            return 0.0
+        return (ahead + 1) / self.max_parallel * self.service_time
+
+    def check(self, timeout: float | None = None, ticket: Ticket | None = None) -> None:
+        """ Raises the rejection a request would get right now, without queueing it (e.g. before streaming). """
+        with self._lock:
+            self._reject(timeout or self.timeout, ticket or Ticket())
+
+    @asynccontextmanager
+    async def slot(self, timeout: float | None = None, ticket: Ticket | None = None):
+        """ Holds one generation slot for the duration of the block. """
+        await self.acquire(timeout, ticket)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - start)
+
+    @contextmanager
+    def slot_sync(self, timeout: float | None = None, ticket: Ticket | None = None):
+        """ Thread-blocking `slot` for the synchronous pipeline. """
+        self.acquire_sync(timeout, ticket)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - start)
+
+    async def acquire(self, timeout: float | None = None, ticket: Ticket | None = None) -> None:
+        timeout = timeout or self.timeout
+        loop = asyncio.get_running_loop()
+        granted = loop.create_future()
+
+        def wake():
+            loop.call_soon_threadsafe(lambda: granted.done() or granted.set_result(None))
+
+        if (waiter := self._enqueue(timeout, wake, ticket or Ticket())) is None:
+            return
+
+        try:
+            await asyncio.wait_for(asyncio.shield(granted), timeout)
+        except asyncio.TimeoutError:
+            self._expire(waiter)
+        except asyncio.CancelledError:
+            self._abandon(waiter)
+            raise
+
+    def acquire_sync(self, timeout: float | None = None, ticket: Ticket | None = None) -> None:
+        timeout = timeout or self.timeout
+        granted = threading.Event()
+
+        if (waiter := self._enqueue(timeout, granted.set, ticket or Ticket())) is None:
+            return
+
+        if not granted.wait(timeout):
+            self._expire(waiter)
+
+    def release(self, held: float | None) -> None:
+        """ Frees a slot, handing it straight to the next live waiter. `held` feeds the service-time estimate. """
+        now = time.monotonic()
+        with self._lock:
+            if held is not None:
+                self.service_time += EWMA_ALPHA * (held - self.service_time)
+            while (waiter := self._queue.pop()) is not None:
+                if waiter.deadline <= now:
+                    continue  # its own timeout path rejects it
+                waiter.granted = True
+                self._record_wait(now - waiter.enqueued)
+                waiter.wake()
+                return
+            self._active -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'max_parallel': self.max_parallel,
+                'in_flight': self._active,
+                'queue_depth': len(self._queue),
+                'expected_wait': round(self.expected_wait(), 3),
+                'service_time': round(self.service_time, 3),
+                'wait_time': round(self.wait_time, 3),
+                'max_wait': round(self.max_wait, 3),
+                'admitted': self.admitted,
+                'rejected_full': self.rejected_full,
+                'rejected_deadline': self.rejected_deadline,
+                'rejected_quota': self.rejected_quota,
+                'expired': self.expired,
+            }
+
+    def _enqueue(self, timeout: float, wake: Callable[[], None], ticket: Ticket) -> _Waiter | None:
+        """ Takes a free slot (returns None) or queues a waiter; rejects when it cannot be served in time. """
+        with self._lock:
+            free = self._active < self.max_parallel and not self._queue
+            if not free:
+                self._reject(timeout, ticket)
+
+            if (retry_after := self._quota.take(ticket)) > 0:
+                self.rejected_quota += 1
+                raise UserQuotaExceeded(retry_after=retry_after)
+
+            if free:
+                self._active += 1
+                self._record_wait(0.0)
+                return None
+
+            waiter = _Waiter(deadline=time.monotonic() + timeout, wake=wake, ticket=ticket)
+            self._queue.push(waiter, ticket)
+            return waiter
+
+    def _reject(self, timeout: float, ticket: Ticket):
+        """ Must hold the lock. """
+        if len(self._queue) >= self.max_queue:
+            self.rejected_full += 1
+            raise GatewayQueueFull(retry_after=self.expected_wait())
+        if (wait := self.expected_wait(self._queue.ahead(ticket.priority))) > timeout:
+            self.rejected_deadline += 1
+            raise GatewayOverloaded(retry_after=wait)
+
+    def _expire(self, waiter: _Waiter):
+        """ The waiter's deadline passed; keep the slot if it was granted meanwhile, otherwise reject. """
+        with self._lock:
+            if waiter.granted:
+                return
+            self._discard(waiter)
+            self.expired += 1
+            retry_after = self.expected_wait()
+        logger.warning("LLM request expired in the gateway queue (retry after %.1fs)", retry_after)
+        raise GatewayOverloaded(retry_after=retry_after)
+
+    def _abandon(self, waiter: _Waiter):
+        with self._lock:
+            granted = waiter.granted
+            if not granted:
+                self._discard(waiter)
+        if granted:
+            self.release(None)
+
+    def _discard(self, waiter: _Waiter):
+        self._queue.remove(waiter, waiter.ticket)
+
+    def _record_wait(self, wait: float):
+        self.admitted += 1
+        self.wait_time += EWMA_ALPHA * (wait - self.wait_time)
+        self.max_wait = max(self.max_wait, wait)
+
+
+gateway = LLMGateway(
+    max_parallel=setting.gateway.max_parallel,
+    max_queue=setting.gateway.max_queue,
+    timeout=setting.gateway.timeout,
+    service_estimate=setting.gateway.service_estimate,
+    user_rate=setting.gateway.user_rate,
+    user_burst=setting.gateway.user_burst,
+)
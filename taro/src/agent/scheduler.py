@@ -0,0 +1,159 @@
+"""
+src/agent/scheduler.py
+
+Per-user fair scheduling for the LLM gateway queue.
+
+Waiting requests are ordered by priority class first (interactive readings ahead of long spreads and
+background jobs), then by start-time fair queueing across users inside a class, so a user firing
+StoryTells in a loop only ever competes for their own share. Token buckets cap each user's rate;
+requests without a user id are charged to their client address, or to one shared anonymous bucket.
+"""
+
+import heapq
+import itertools
+import time
+from dataclasses import dataclass, field
+from enum import IntEnum
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0  # short readings a user is actively waiting on
+    STANDARD = 1     # long spreads (e.g. celtic cross StoryTell)
+    BATCH = 2        # background jobs
+
+
+# Spreads up to this many cards are served on the interactive lane
+INTERACTIVE_MAX_CARDS = 3
+
+@dataclass(frozen=True, slots=True)
+class Ticket:
+    """ Who a generation is for and how it should be scheduled. """
+    user_id: str | None = None
+    priority: Priority = Priority.STANDARD
+    cost: float = 1.0     # relative size of the generation (1.0 = default num_predict)
+    weight: float = 1.0   # user's share of the class
+    client: str | None = None  # caller's address, standing in for the user when there is no user id
+    metered: bool = True  # False for the service's own work (prompt warm-up), which no quota applies to
+
+    @property
+    def owner(self) -> str:
+        if self.user_id:
+            return self.user_id
+        return f'client:{self.client}' if self.client else 'anonymous'
+
+    @staticmethod
+    def for_reading(user_id: str | None, num_cards: int, batch: bool = False, client: str | None = None) -> 'Ticket':
+        """ Interactive lane for short spreads, standard for long ones, batch for background work. """
+        if batch:
+            priority = Priority.BATCH
+        elif num_cards <= INTERACTIVE_MAX_CARDS:
+            priority = Priority.INTERACTIVE
+        else:
+            priority = Priority.STANDARD
+        return Ticket(user_id=user_id, priority=priority, client=client)
+
+
+class FairQueue:
+    """ Priority classes with start-time fair queueing (virtual finish tags) per user inside each class. """
+
+    def __init__(self):
+        self._heap: list[tuple[int, float, int, object]] = []
+        self._seq = itertools.count()
+        self._vtime: dict[Priority, float] = {}
+        self._finish: dict[tuple[Priority, str], float] = {}
+        self._counts: dict[Priority, int] = {cls: 0 for cls in Priority}
+        self._live = 0
+
+    def __len__(self) -> int:
+        return self._live
+
+    def __bool__(self) -> bool:
+        return self._live > 0
+
+    def ahead(self, priority: Priority) -> int:
+        """ Number of queued items that would be served before a new item of this priority (same class or higher). """
+        return sum(count for cls, count in self._counts.items() if cls <= priority)
+
+    def push(self, item, ticket: Ticket) -> None:
+        cls = ticket.priority
+        start = max(self._vtime.get(cls, 0.0), self._finish.get((cls, ticket.owner), 0.0))
+        finish = start + ticket.cost / ticket.weight
+        self._finish[(cls, ticket.owner)] = finish
+        item.tag = start
+        item.queued = True
+        heapq.heappush(self._heap, (int(cls), finish, next(self._seq), item))
+        self._counts[cls] += 1
+        self._live += 1
+
+    def pop(self):
+        while self._heap:
+            cls, _, _, item = heapq.heappop(self._heap)
+            if item.queued:
+                cls = Priority(cls)
+                item.queued = False
+                self._counts[cls] -= 1
+                self._live -= 1
+                self._vtime[cls] = max(self._vtime.get(cls, 0.0), item.tag)
+                if not self._live:
+                    self._forget()
+                return item
+        return None
+
+    def remove(self, item, ticket: Ticket) -> None:
+        """ Lazy removal; the heap entry is skipped when popped. """
+        if item.queued:
+            item.queued = False
+            self._counts[ticket.priority] -= 1
+            self._live -= 1
+            if not self._live:
+                self._forget()
+
+    def _forget(self):
+        # Idle queue: reset tags so finish times stay bounded
+        self._heap.clear()
+        self._vtime.clear()
+        self._finish.clear()
+
+
+@dataclass(slots=True)
+class _Bucket:
+    tokens: float
+    updated: float = field(default_factory=time.monotonic)
+
+
+class QuotaBook:
+    """ Token bucket per ticket owner: `rate` cost units refilled per second up to `burst`. """
+
+    # Buckets kept before idle (full) ones are dropped
+    MAX_BUCKETS = 10_000
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self._buckets: dict[str, _Bucket] = {}
+
+    def take(self, ticket: Ticket) -> float:
+        """ Consumes the ticket's cost; returns 0 on success or the seconds until it would fit. """
+        if not ticket.metered or self.rate <= 0:
+            return 0.0
+
+        now = time.monotonic()
+        bucket = self._buckets.get(ticket.owner)
+        if bucket is None:
+            if len(self._buckets) >= self.MAX_BUCKETS:
+                self._prune(now)
+            bucket = self._buckets[ticket.owner] = _Bucket(tokens=self.burst, updated=now)
+
+        bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * self.rate)
+        bucket.updated = now
+
+        cost = min(ticket.cost, self.burst)
+        if bucket.tokens >= cost:
+            bucket.tokens -= cost
+            return 0.0
+        return (cost - bucket.tokens) / self.rate
+
+    def _prune(self, now: float):
+        for owner, bucket in list(self._buckets.items()):
+            if bucket.tokens + (now - bucket.updated) * self.rate >= self.burst:
+                del self._buckets[owner]
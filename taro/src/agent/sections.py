@@ -0,0 +1,79 @@
+"""
+src/agent/sections.py
+
+Incremental section parser over a streamed generation. Templates answer in bold-header sections
+(`**Combination Highlights**: ...`, `**Possible insights ...**: ...`); when a downstream agent only reads
+one of them, the parser picks it out chunk by chunk and reports when the next header starts, so the
+upstream generation can be stopped there instead of run to `num_predict` and thrown away.
+"""
+
+import re
+from dataclasses import dataclass
+
+# Enough to catch an end header split across chunks (leading spaces included)
+LOOKBACK = 32
+
+
+@dataclass(frozen=True, slots=True)
+class Section:
+    """ The text between the `start` header and the `end` header (matched by prefix, case-insensitive). """
+    start: str
+    end: str
+
+    @property
+    def start_pattern(self) -> re.Pattern:
+        # `**Name**:`, `**Name:**` or `** Name **`
+        return re.compile(rf"\*\*\s*{re.escape(self.start)}[^*\n]*\*\*:?", re.IGNORECASE)
+
+    @property
+    def end_pattern(self) -> re.Pattern:
+        # The opening of the header is enough to stop
+        return re.compile(rf"\*\*\s*{re.escape(self.end)}", re.IGNORECASE)
+
+    def parser(self) -> 'SectionParser':
+        return SectionParser(self)
+
+    def extract(self, text: str) -> str | None:
+        """ The section of a complete output; None when its header is missing. """
+        parser = self.parser()
+        parser.feed(text)
+        return parser.close()
+
+
+class SectionParser:
+    """ Feed streamed chunks; `feed` returns True once the section is complete (the end header appeared). """
+
+    def __init__(self, section: Section):
+        self.section = section
+        self.text = ""
+        self.done = False
+        self._start_re = section.start_pattern
+        self._end_re = section.end_pattern
+        # Offsets in `text`: where the section body begins, and where it ends once `done`
+        self._body: int | None = None
+        self._stop: int | None = None
+
+    def feed(self, chunk: str) -> bool:
+        if self.done or not chunk:
+            return self.done
+        scanned = len(self.text)
+        self.text += chunk
+
+        if self._body is None:
+            # Headers come early in the output: re-scanning the short prefix is cheap
+            if not (match := self._start_re.search(self.text)):
+                return False
+            self._body = match.end()
+            scanned = self._body
+
+        if match := self._end_re.search(self.text, max(self._body, scanned - LOOKBACK)):
+            self._stop = match.start()
+            self.done = True
+        return self.done
+
+    def close(self) -> str | None:
+        """ The section text; runs to the end of the output when the end header never came. """
+        if self._body is None:
+            return None
+        # A colon after the header may have arrived in the next chunk
+        return self.text[self._body:self._stop].lstrip(':').strip() or None
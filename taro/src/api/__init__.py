@@ -0,0 +1,7 @@
+""" taro/api """
+
+from fastapi import Request
+
+def client_host(request: Request) -> str | None:
+    """ Caller's address (the proxy's unless uvicorn runs with `--proxy-headers`); meters requests without a user id. """
+    return request.client.host if request.client else None
@@ -1,11 +1,20 @@
 """ taro/api/astrology.py """
 
-from fastapi import APIRouter, Body
+from datetime import date
+from typing import Literal
+
+from fastapi import APIRouter, Body, HTTPException, Query, Request
 from fastapi.responses import JSONResponse
 
-from ..schemas.user import User
+from src.api.stream import ndjson_response
+from src.astrology.batch import iter_items, iter_ndjson, resolve_batch
+from src.astrology.ephemeris import SIGNS
+from src.schemas.astrology import DailyTransits
+from src.schemas.user import User
+
+NDJSON_TYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl')
 
-astrology_router = ApiRouter()
+astrology_router = APIRouter()
 
 @astrology_router.post(
     '/user_astrology/',
@@ -26,10 +35,57 @@ async def user_astrology(
             "birth_place": "Australia/Sydney",
             "gender": "male"
         }
-    )
+    ),
+    mode: Literal['full', 'signs'] = Query('full', description="`signs` returns only sun, moon and rising sign (fast path)"),
 ):
     """
         Fetches user's astrology readings.
     """
-    user.get_astrology()
+    if mode == 'signs':
+        await user.aget_signs()
+    else:
+        await user.aget_astrology()
     return JSONResponse(content=user.model_dump(), status_code=200)
+
+
+@astrology_router.post('/user_astrology/batch/')
+async def user_astrology_batch(
+    request: Request,
+    mode: Literal['full', 'signs'] = Query('full', description="`signs` returns only sun, moon and rising sign (fast path)"),
+):
+    """
+        Astrology for many users at once. Send a JSON array of user profiles, or NDJSON (one profile per line,
+        `Content-Type: application/x-ndjson`). Results are streamed back as NDJSON in input order:
+        `{"index": 0, "result": {...}}` or `{"index": 1, "error": ...}` for profiles that failed.
+    """
+    if request.headers.get('content-type', '').split(';')[0].strip() in NDJSON_TYPES:
+        # Read the body before responding: the streaming response listens on the same ASGI channel for disconnects
+        profiles = iter_ndjson(iter_items([await request.body()]))
+    else:
+        try:
+            body = await request.json()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Body must be a JSON array of user profiles or NDJSON.")
+        if not isinstance(body, list):
+            raise HTTPException(status_code=422, detail="Expected a JSON array of user profiles.")
+        profiles = iter_items(body)
+
+    return ndjson_response(resolve_batch(profiles, mode))
+
+
+@astrology_router.get('/astrology/transits/', response_model=DailyTransits)
+async def daily_transits(
+    day: date | None = Query(None, description="Calendar day (YYYY-MM-DD); today in `tz` by default"),
+    tz: str | None = Query(None, description="IANA timezone, e.g. `Australia/Sydney`; bucketed to its whole-hour UTC offset"),
+    sign: str | None = Query(None, description="Only the aspects to this sun sign"),
+):
+    """
+        The day's planetary positions and their aspects to each sun sign. Computed once per day and timezone
+        bucket and shared by every user.
+    """
+    if sign and sign.strip().title() not in SIGNS:
+        raise HTTPException(status_code=422, detail=f"Unknown sign {sign!r}; expected one of {', '.join(SIGNS)}.")
+    transits = await DailyTransits.afor_day(day, tz)
+    if sign:
+        transits = transits.for_sign(sign)
+    return JSONResponse(content=transits.model_dump(mode='json'), status_code=200)
@@ -0,0 +1,101 @@
+""" taro/api/jobs.py """
+
+import asyncio
+
+from fastapi import APIRouter, Body, Header, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse
+from pydantic import ValidationError
+
+from src.api import client_host
+from src.api.stream import sse_response
+from src.jobs.actions import get_action
+from src.jobs.worker import WorkerPool
+from utils.settings import setting
+from utils.woodpecker import UnknownJob, WoodPecker
+
+jobs_router = APIRouter()
+
+def _pool(request: Request) -> WorkerPool:
+    return request.app.state.jobs
+
+@jobs_router.post('/jobs/{action}')
+async def submit_job(
+    action: str,
+    request: Request,
+    payload: dict = Body(
+        ...,
+        example={
+            'user': {
+                'id': '12345',
+                'username': 'julie.lenova',
+                'first_name': 'Julie',
+                'last_name': 'Lenova',
+                'birth_date': '21-03-1999'
+            },
+            'tarot': {
+                'timestamp': "2025-06-22T02:30:00",
+                'question': 'When will I see Pookie?',
+                'reading_mode': 'three_card',
+                'drawn_cards': ['two of cups', 'wheel of fortune', 'Death']
+            }
+        }
+    ),
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key"),
+):
+    """
+        Queues `story_tell`, `reading`, `insight_combination` or `insight_numerology` (same body as the endpoint
+        of that name) and returns the job id at once. Poll `GET /jobs/{id}` or watch `GET /jobs/{id}/watch`.
+        The id is random: share it only with whoever may read the result.
+    """
+    pool = _pool(request)
+    try:
+        job_action = get_action(action)
+        address = client_host(request)
+        owner = job_action.ticket(job_action.validate(payload), address).owner
+        job = await pool.queue.asubmit(action, payload, idempotency_key, owner, address)
+    except WoodPecker as e:
+        return JSONResponse(content={"error": e.message}, status_code=e.status_code)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors(include_url=False), body=payload)
+    pool.notify()
+    return JSONResponse(
+        content={'id': job.id, 'status': job.status, 'status_url': f"/jobs/{job.id}", 'watch_url': f"/jobs/{job.id}/watch"},
+        status_code=202,
+        headers={'Location': f"/jobs/{job.id}"},
+    )
+
+@jobs_router.get('/jobs/{job_id}')
+async def get_job(job_id: str, request: Request):
+    """ Status of a job, with its result once done (or the last error). """
+    if (job := await _pool(request).queue.aget(job_id)) is None:
+        error = UnknownJob(job_id)
+        return JSONResponse(content={"error": error.message}, status_code=error.status_code)
+    return JSONResponse(content=job.as_dict(), status_code=200)
+
+@jobs_router.get('/jobs/{job_id}/watch')
+async def watch_job(job_id: str, request: Request):
+    """
+        Server-Sent Events: a `status` event whenever the job changes, then one `done` or `failed` event
+        carrying the result or error.
+    """
+    queue = _pool(request).queue
+    if (job := await queue.aget(job_id)) is None:
+        error = UnknownJob(job_id)
+        return JSONResponse(content={"error": error.message}, status_code=error.status_code)
+
+    async def events():
+        seen = None
+        current = job
+        while current is not None:
+            if current.finished:
+                yield {'event': current.status, **current.as_dict()}
+                return
+            if (current.status, current.attempts) != seen:
+                seen = (current.status, current.attempts)
+                yield {'event': 'status', **current.as_dict()}
+            await asyncio.sleep(setting.jobs.poll_interval)
+            current = await queue.aget(job_id)
+        yield {'event': 'error', 'error': UnknownJob(job_id).message}
+
+    return sse_response(events())
@@ -0,0 +1,47 @@
+""" taro/api/stream.py """
+
+import json
+
+from fastapi.responses import StreamingResponse
+
+from utils.woodpecker import setup_logger
+
+logger = setup_logger(__name__)
+
+def format_sse(event: str, data: dict) -> str:
+    """ Encodes one Server-Sent-Events message. """
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def _sse_events(events):
+    try:
+        async for event in events:
+            name = event.pop('event')
+            yield format_sse(name, event)
+    except Exception as e:
+        # Headers are already sent, so failures are reported in-stream
+        logger.exception("Error while streaming generation")
+        yield format_sse('error', {'error': str(e)})
+
+def sse_response(events) -> StreamingResponse:
+    """ Wraps a SandCrawler `astream` generator into a `text/event-stream` response. """
+    return StreamingResponse(
+        _sse_events(events),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+async def _ndjson_lines(items):
+    try:
+        async for item in items:
+            yield json.dumps(item) + "\n"
+    except Exception as e:
+        logger.exception("Error while streaming NDJSON")
+        yield json.dumps({'error': str(e)}) + "\n"
+
+def ndjson_response(items) -> StreamingResponse:
+    """ Streams dicts from an async iterator as newline-delimited JSON. """
+    return StreamingResponse(
+        _ndjson_lines(items),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
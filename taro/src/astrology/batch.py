@@ -0,0 +1,101 @@
+"""
+src/astrology/batch.py
+
+Bulk astrology for user imports and backfills.
+
+Profiles are validated and resolved concurrently within a sliding window, and results come back in input
+order with per-item errors. Users sharing a birth place and instant only cost one geocode (the gazetteer
+LRU) and one chart: duplicates in flight join the same chart pool job and later ones hit the chart cache.
+"""
+
+import asyncio
+import json
+from typing import AsyncIterable, AsyncIterator, Literal
+
+from pydantic import ValidationError
+
+from src.schemas.user import User
+from utils.settings import setting
+from utils.woodpecker import setup_logger
+
+logger = setup_logger(__name__)
+
+Mode = Literal['full', 'signs']
+
+async def resolve(index: int, profile, mode: Mode = 'full') -> dict:
+    """ One batch line: `{"index", "result"}` with the serialized user, or `{"index", "error"}`. """
+    try:
+        if isinstance(profile, Exception):
+            raise profile
+        if not isinstance(profile, dict):
+            raise ValueError(f"Expected a user profile object, received {type(profile).__name__}")
+        user = User.model_validate(profile)
+        if mode == 'signs':
+            await user.aget_signs()
+        else:
+            await user.aget_astrology()
+        return {'index': index, 'result': user.model_dump(mode='json')}
+    except ValidationError as e:
+        return {'index': index, 'error': json.loads(e.json(include_url=False))}
+    except Exception as e:
+        logger.debug("Batch item %d failed", index, exc_info=True)
+        return {'index': index, 'error': str(e) or type(e).__name__}
+
+async def resolve_batch(profiles: AsyncIterable, mode: Mode = 'full', window: int | None = None) -> AsyncIterator[dict]:
+    """
+    Yields one result per profile, in input order. Up to `window` profiles are in flight while earlier
+    results are being sent, so input is read no faster than the client consumes output.
+    """
+    window = window or setting.astrology.batch_window
+    pending: asyncio.Queue = asyncio.Queue(maxsize=window)
+    max_items = setting.astrology.batch_max_items
+
+    async def produce():
+        index = 0
+        async for profile in profiles:
+            if index >= max_items:
+                await pending.put(_done({'index': index, 'error': f"Batch limit of {max_items} profiles reached"}))
+                break
+            await pending.put(asyncio.ensure_future(resolve(index, profile, mode)))
+            index += 1
+        await pending.put(None)
+
+    producer = asyncio.create_task(produce())
+    try:
+        while (task := await pending.get()) is not None:
+            yield await task
+        await producer
+    finally:
+        # Client went away: stop reading and drop the work still queued
+        producer.cancel()
+        while not pending.empty():
+            if (task := pending.get_nowait()) is not None:
+                task.cancel()
+
+def _done(result: dict) -> asyncio.Future:
+    future = asyncio.get_running_loop().create_future()
+    future.set_result(result)
+    return future
+
+async def iter_items(items: list) -> AsyncIterator:
+    """ Async view of an in-memory list (a parsed JSON array, or a request body as a single chunk). """
+    for item in items:
+        yield item
+
+async def iter_ndjson(chunks: AsyncIterable[bytes]) -> AsyncIterator:
+    """ Parses an NDJSON byte stream as it arrives; a malformed line is passed on as its error. """
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield _parse_line(line)
+    if buffer.strip():
+        yield _parse_line(buffer)
+
+def _parse_line(line: bytes):
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError as e:
+        return ValueError(f"Invalid JSON line: {e}")
@@ -0,0 +1,101 @@
+"""
+src/astrology/chart.py
+
+Natal chart computation with `immanuel`, memoized. A chart only depends on the birth instant and
+place, so results are cached on the UTC birth datetime and rounded coordinates (memory LRU plus an
+optional SQLite tier) and the ephemeris is computed once per distinct birth.
+"""
+
+import threading
+from datetime import datetime, timezone
+
+from immanuel import charts
+from immanuel import settings as immanuel_settings
+from immanuel.const import chart
+
+from utils.cache import TieredCache, make_key
+from utils.settings import resolve_path, setting
+
+# `UserInsights` fields filled from a chart
+CHART_FIELDS = (
+    'sun_sign',
+    'moon_sign',
+    'rising_sign',
+    'house_placements',
+    'elemental_distribution',
+    'modality_distribution',
+    'dominant_planets',
+)
+
+# Decimal places kept from coordinates in the cache key (~11 m)
+COORDINATE_PRECISION = 4
+
+_thread = threading.local()
+
+chart_cache = TieredCache(
+    'natal',
+    max_entries=setting.astrology.chart_cache_entries,
+    path=resolve_path(setting.astrology.chart_cache_path),
+)
+
+def chart_key(dt: datetime, latitude: float, longitude: float) -> str:
+    """ Same instant in any timezone and coordinates within the precision share a key. """
+    if dt.tzinfo is None:
+        raise ValueError("Natal charts need a timezone-aware birth datetime.")
+    return make_key(
+        'natal',
+        dt.astimezone(timezone.utc).replace(microsecond=0).isoformat(),
+        round(latitude, COORDINATE_PRECISION),
+        round(longitude, COORDINATE_PRECISION),
+    )
+
+def _ephemeris_ready() -> None:
+    """ Swiss Ephemeris keeps its file path per thread: point each computing thread at immanuel's files once. """
+    if not getattr(_thread, 'ready', False):
+        immanuel_settings.set_swe_filepath()
+        _thread.ready = True
+
+def compute_chart(dt: datetime, latitude: float, longitude: float) -> dict:
+    """ Computes the natal chart and returns the `UserInsights` fields. """
+    _ephemeris_ready()
+    # immanuel re-localizes wall-clock times in the zone it looks up from the coordinates; pin the instant in UTC
+    utc = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    native = charts.Subject(date_time=utc, latitude=latitude, longitude=longitude, timezone='UTC')
+    natal = charts.Natal(native)
+
+    elements: dict[str, int] = {}
+    modalities: dict[str, int] = {}
+    dominant_planets: dict[str, int] = {}
+
+    for obj in natal.objects.values():
+        if obj.type.name == 'Planet':
+            element = obj.sign.element
+            modality = obj.sign.modality
+            planet = obj.name
+
+            elements[element] = elements.get(element, 0) + 1
+            modalities[modality] = modalities.get(modality, 0) + 1
+            dominant_planets[planet] = dominant_planets.get(planet, 0) + 1
+
+    return {
+        'sun_sign': natal.objects[chart.SUN].sign.name,
+        'moon_sign': natal.objects[chart.MOON].sign.name,
+        'rising_sign': natal.objects[chart.ASC].sign.name,
+        'house_placements': {
+            f"{i}th House": natal.houses.get(str(i)).sign.name
+            if natal.houses.get(str(i)) and getattr(natal.houses.get(str(i)), "sign", None) is not None
+            else None
+            for i in range(1, 13)
+        },
+        'elemental_distribution': elements,
+        'modality_distribution': modalities,
+        'dominant_planets': dominant_planets,
+    }
+
+def natal_chart(dt: datetime, latitude: float, longitude: float) -> dict:
+    """ Cached `compute_chart`. Returns a copy callers may mutate. """
+    key = chart_key(dt, latitude, longitude)
+    if (fields := chart_cache.get(key)) is None:
+        fields = compute_chart(dt, latitude, longitude)
+        chart_cache.set(key, fields)
+    return {name: dict(value) if isinstance(value, dict) else value for name, value in fields.items()}
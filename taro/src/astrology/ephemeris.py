@@ -0,0 +1,164 @@
+"""
+src/astrology/ephemeris.py
+
+Signs-only astrology: sun, moon and rising sign without building a full `charts.Natal`.
+
+Sun and moon ecliptic longitudes are read from a precomputed table (Swiss Ephemeris, the engine behind
+`immanuel`, sampled every 6 hours over 1900-2100) by linear interpolation, and the ascendant is solved
+analytically from the local sidereal time and latitude. The math is numpy-vectorized, so a sign lookup
+costs microseconds.
+
+The table is built once (a few seconds) and saved to ASTROLOGY_EPHEMERIS_PATH; prebuild it with
+`python -m src.astrology.ephemeris`.
+"""
+
+import threading
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from utils.settings import ROOT_PATH, setting
+from utils.woodpecker import setup_logger
+
+logger = setup_logger(__name__)
+
+SIGNS = (
+    'Aries', 'Taurus', 'Gemini', 'Cancer', 'Leo', 'Virgo',
+    'Libra', 'Scorpio', 'Sagittarius', 'Capricorn', 'Aquarius', 'Pisces',
+)
+
+TABLE_YEARS = (1900, 2100)
+# Moon moves ~13 degrees a day; 6 hour steps keep linear interpolation within ~0.01 degree
+STEP_DAYS = 0.25
+
+UNIX_EPOCH_JD = 2440587.5
+J2000_JD = 2451545.0
+
+def julian_day(dt: datetime | np.ndarray) -> float | np.ndarray:
+    """ Julian day (UT) of a timezone-aware datetime, or of an array of POSIX timestamps. """
+    if isinstance(dt, datetime):
+        if dt.tzinfo is None:
+            raise ValueError("Sign lookups need a timezone-aware birth datetime.")
+        return dt.timestamp() / 86400.0 + UNIX_EPOCH_JD
+    return np.asarray(dt, dtype=np.float64) / 86400.0 + UNIX_EPOCH_JD
+
+def ascendant(jd, latitude, longitude):
+    """ Ecliptic longitude (degrees) of the ascendant from mean sidereal time and mean obliquity. """
+    d = np.asarray(jd, dtype=np.float64) - J2000_JD
+    t = d / 36525.0
+    gmst = 280.46061837 + 360.98564736629 * d + 0.000387933 * t**2 - t**3 / 38710000.0
+    ramc = np.radians((gmst + np.asarray(longitude)) % 360.0)
+    eps = np.radians(23.439291111 - 0.013004167 * t - 1.64e-7 * t**2 + 5.04e-7 * t**3)
+    phi = np.radians(np.asarray(latitude))
+    asc = np.arctan2(np.cos(ramc), -(np.sin(ramc) * np.cos(eps) + np.tan(phi) * np.sin(eps)))
+    return np.degrees(asc) % 360.0
+
+def sign_index(longitude):
+    return (np.asarray(longitude) // 30.0).astype(np.int64) % 12
+
+
+class EphemerisTable:
+    """ Sun and moon apparent geocentric longitudes (degrees, wrapped to [0, 360)) on a fixed UT grid. """
+
+    def __init__(self, start: float, step: float, sun: np.ndarray, moon: np.ndarray):
+        self.start = start
+        self.step = step
+        self.sun = sun
+        self.moon = moon
+        self.end = start + step * (len(sun) - 1)
+
+    def covers(self, jd) -> np.ndarray:
+        jd = np.asarray(jd)
+        return (jd >= self.start) & (jd < self.end)
+
+    def longitudes(self, jd) -> tuple[np.ndarray, np.ndarray]:
+        """ Interpolated (sun, moon) longitudes; `jd` must be covered by the table. """
+        x = (np.asarray(jd, dtype=np.float64) - self.start) / self.step
+        if not np.all((x >= 0) & (x < len(self.sun) - 1)):
+            raise ValueError("Date outside the ephemeris table range.")
+        i = x.astype(np.int64)
+        f = x - i
+        return self._interpolate(self.sun, i, f), self._interpolate(self.moon, i, f)
+
+    @staticmethod
+    def _interpolate(values: np.ndarray, i: np.ndarray, f: np.ndarray) -> np.ndarray:
+        a = values[i].astype(np.float64)
+        # Shortest signed arc between samples, so the 360 -> 0 wrap interpolates correctly
+        delta = (values[i + 1] - a + 180.0) % 360.0 - 180.0
+        return (a + f * delta) % 360.0
+
+    @classmethod
+    def build(cls, start_year: int = TABLE_YEARS[0], end_year: int = TABLE_YEARS[1], step: float = STEP_DAYS) -> 'EphemerisTable':
+        """ Samples Swiss Ephemeris with immanuel's ephemeris files. """
+        import swisseph as swe
+        from immanuel import settings as immanuel_settings
+
+        immanuel_settings.set_swe_filepath()
+        start = swe.julday(start_year, 1, 1, 0.0)
+        end = swe.julday(end_year + 1, 1, 1, 0.0)
+        jds = start + np.arange(int((end - start) / step) + 1) * step
+
+        sun = np.fromiter((swe.calc_ut(jd, swe.SUN)[0][0] for jd in jds), dtype=np.float32, count=len(jds))
+        moon = np.fromiter((swe.calc_ut(jd, swe.MOON)[0][0] for jd in jds), dtype=np.float32, count=len(jds))
+        return cls(start, step, sun, moon)
+
+    def save(self, path: str | Path) -> None:
+        np.savez(path, start=self.start, step=self.step, sun=self.sun, moon=self.moon)
+
+    @classmethod
+    def load(cls, path: str | Path) -> 'EphemerisTable':
+        with np.load(path) as data:
+            return cls(float(data['start']), float(data['step']), data['sun'], data['moon'])
+
+
+_table: EphemerisTable | None = None
+_lock = threading.Lock()
+
+def table_loaded() -> bool:
+    return _table is not None
+
+def ephemeris_table() -> EphemerisTable:
+    """ Process-wide table: loaded from ASTROLOGY_EPHEMERIS_PATH, or built (and saved there) on first use. """
+    global _table
+    if _table is None:
+        with _lock:
+            if _table is None:
+                _table = _load_or_build(table_path())
+    return _table
+
+def table_path() -> Path | None:
+    path = setting.astrology.ephemeris_path
+    return ROOT_PATH / path if path else None
+
+def _load_or_build(path: Path | None) -> EphemerisTable:
+    if path and path.is_file():
+        return EphemerisTable.load(path)
+
+    logger.info("Building the %d-%d sun/moon ephemeris table...", *TABLE_YEARS)
+    table = EphemerisTable.build()
+    if path:
+        try:
+            table.save(path)
+        except OSError:
+            logger.warning("Could not save the ephemeris table to %s", path, exc_info=True)
+    return table
+
+def fast_signs(dt: datetime, latitude: float, longitude: float, table: EphemerisTable | None = None) -> dict:
+    """ `sun_sign`, `moon_sign` and `rising_sign` for one birth. Raises ValueError outside the table's years. """
+    table = table or ephemeris_table()
+    jd = julian_day(dt)
+    sun, moon = table.longitudes(jd)
+    return {
+        'sun_sign': SIGNS[int(sun // 30.0)],
+        'moon_sign': SIGNS[int(moon // 30.0)],
+        'rising_sign': SIGNS[int(ascendant(jd, latitude, longitude) // 30.0)],
+    }
+
+
+if __name__ == "__main__":
+    path = table_path()
+    if path is None:
+        raise SystemExit("Set ASTROLOGY_EPHEMERIS_PATH to the file the table should be written to.")
+    EphemerisTable.build().save(path)
+    print(f"Saved ephemeris table to {path}")
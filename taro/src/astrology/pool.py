@@ -0,0 +1,129 @@
+"""
+src/astrology/pool.py
+
+Chart computation off the event loop. `immanuel` ephemeris math is pure CPU and holds the GIL, so charts
+run in a warm `ProcessPoolExecutor`: workers import `immanuel` and load its ephemeris files when they
+start, and handlers await the result. Results still go through the chart cache in the API process, and
+identical births computed concurrently share one job. A pool broken by a dead worker is replaced once
+per failed call, after which the chart is computed in a thread.
+"""
+
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from src.astrology.chart import chart_cache, chart_key, compute_chart, natal_chart
+from utils.flight import SingleFlight
+from utils.settings import setting
+from utils.woodpecker import setup_logger
+
+logger = setup_logger(__name__)
+
+# Throwaway chart each worker computes at start so the ephemeris files are read before real requests
+WARM_BIRTH = (datetime(2000, 1, 1, 12, 0, tzinfo=ZoneInfo('UTC')), 0.0, 0.0)
+
+def _warm_worker() -> None:
+    compute_chart(*WARM_BIRTH)
+
+def _ping() -> bool:
+    return True
+
+
+class ChartPool:
+    """ Process pool for natal charts. With `workers=0` (or before `start`), charts run in a thread instead. """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executor: ProcessPoolExecutor | None = None
+        self._flight = SingleFlight()
+        self.computed = 0
+        self.in_flight = 0
+        self.compute_time = 0.0
+        self.restarts = 0
+
+    @property
+    def started(self) -> bool:
+        return self._executor is not None
+
+    async def start(self) -> None:
+        """ Spawns the workers and waits until every one of them is warm. """
+        if self.started or self.workers <= 0:
+            return
+        start = time.perf_counter()
+        self._executor = self._new_executor()
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self._executor, _ping) for _ in range(self.workers)))
+        logger.info("Chart pool ready: %d warm workers in %.2fs", self.workers, time.perf_counter() - start)
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        # `spawn`: forking a process that already runs threads (event loop, client pools) is unsafe
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_warm_worker,
+        )
+
+    def _restart(self, broken: ProcessPoolExecutor) -> None:
+        """ Replaces a broken executor; calls that failed on the same one share its replacement. """
+        if self._executor is not broken:
+            return
+        broken.shutdown(wait=False, cancel_futures=True)
+        self._executor = self._new_executor()
+        self.restarts += 1
+        logger.warning("Chart pool broken (a worker died); restarted it (%d restarts)", self.restarts)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def chart(self, dt: datetime, latitude: float, longitude: float) -> dict:
+        """ Cached natal chart fields, computed in a worker on a miss. """
+        if not self.started:
+            return await asyncio.to_thread(natal_chart, dt, latitude, longitude)
+
+        key = chart_key(dt, latitude, longitude)
+        if (fields := await chart_cache.aget(key)) is None:
+            fields = await self._flight.do(key, lambda: self._compute(key, dt, latitude, longitude))
+        return {name: dict(value) if isinstance(value, dict) else value for name, value in fields.items()}
+
+    async def _compute(self, key: str, dt: datetime, latitude: float, longitude: float) -> dict:
+        start = time.perf_counter()
+        self.in_flight += 1
+        try:
+            fields = await self._run(dt, latitude, longitude)
+        finally:
+            self.in_flight -= 1
+        self.computed += 1
+        self.compute_time += time.perf_counter() - start
+        await chart_cache.aset(key, fields)
+        return fields
+
+    async def _run(self, dt: datetime, latitude: float, longitude: float) -> dict:
+        loop = asyncio.get_running_loop()
+        for retry in (True, False):
+            if (executor := self._executor) is None:
+                break
+            try:
+                return await loop.run_in_executor(executor, compute_chart, dt, latitude, longitude)
+            except BrokenProcessPool:
+                if retry:
+                    self._restart(executor)
+        logger.warning("Chart pool unavailable; computing the chart in a thread")
+        return await asyncio.to_thread(compute_chart, dt, latitude, longitude)
+
+    def stats(self) -> dict:
+        return {
+            'workers': self.workers if self.started else 0,
+            'in_flight': self.in_flight,
+            'computed': self.computed,
+            'restarts': self.restarts,
+            'avg_compute_time': round(self.compute_time / self.computed, 3) if self.computed else 0.0,
+        }
+
+
+chart_pool = ChartPool(workers=setting.astrology.workers)
@@ -0,0 +1,149 @@
+"""
+src/astrology/transits.py
+
+Daily transits shared by every user: the planets' positions at local noon of one calendar day, and their
+whole-sign aspects to each of the twelve sun signs. A day only depends on the date and the UTC offset
+(rounded to the hour, the "timezone bucket"), so it is computed once per (day, bucket) with Swiss Ephemeris
+and kept in a memory LRU backed by SQLite. Cost is O(signs) per day instead of a chart per user and request.
+"""
+
+import asyncio
+from datetime import date, datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+import swisseph as swe
+
+from src.astrology.chart import _ephemeris_ready
+from src.astrology.ephemeris import SIGNS
+from utils.cache import TieredCache, make_key
+from utils.flight import SingleFlight
+from utils.settings import resolve_path, setting
+
+PLANETS = {
+    'Sun': swe.SUN,
+    'Moon': swe.MOON,
+    'Mercury': swe.MERCURY,
+    'Venus': swe.VENUS,
+    'Mars': swe.MARS,
+    'Jupiter': swe.JUPITER,
+    'Saturn': swe.SATURN,
+    'Uranus': swe.URANUS,
+    'Neptune': swe.NEPTUNE,
+    'Pluto': swe.PLUTO,
+}
+
+# Whole-sign aspects by the number of signs between the planet and the sun sign
+ASPECTS = {0: 'conjunction', 2: 'sextile', 3: 'square', 4: 'trine', 6: 'opposition'}
+
+MOON_PHASES = (
+    'New Moon', 'Waxing Crescent', 'First Quarter', 'Waxing Gibbous',
+    'Full Moon', 'Waning Gibbous', 'Last Quarter', 'Waning Crescent',
+)
+
+# Offsets in use world-wide, rounded to the hour
+MIN_OFFSET, MAX_OFFSET = -12, 14
+
+transit_cache = TieredCache(
+    'transits',
+    max_entries=setting.astrology.transit_cache_entries,
+    path=resolve_path(setting.astrology.transit_cache_path),
+)
+
+_flight = SingleFlight()
+
+def tz_bucket(tz: str | None = None, at: datetime | None = None) -> int:
+    """
+    UTC offset in whole hours of an IANA zone at `at` (now by default); 0 for UTC or an unknown zone.
+    A naive `at` is a wall-clock time in that zone.
+    """
+    if not tz:
+        return 0
+    try:
+        zone = ZoneInfo(tz)
+    except (ZoneInfoNotFoundError, ValueError):
+        return 0
+    if at is None:
+        at = datetime.now(timezone.utc)
+    elif at.tzinfo is None:
+        at = at.replace(tzinfo=zone)
+    offset = at.astimezone(zone).utcoffset() or timedelta(0)
+    return max(MIN_OFFSET, min(MAX_OFFSET, round(offset.total_seconds() / 3600)))
+
+def local_day(offset: int = 0, now: datetime | None = None) -> date:
+    """ The current calendar day in a timezone bucket. """
+    return ((now or datetime.now(timezone.utc)) + timedelta(hours=offset)).date()
+
+def day_bucket(tz: str | None = None, day: date | None = None, now: datetime | None = None) -> tuple[date, int]:
+    """ `day` (today in `tz` by default) and the zone's offset bucket on that day, taken at its local noon. """
+    if day is None:
+        day = local_day(tz_bucket(tz, now), now)
+    # The offset of the requested day, so DST is that of the day and not of today
+    return day, tz_bucket(tz, datetime.combine(day, time(12)))
+
+def transit_key(day: date, offset: int) -> str:
+    return make_key('transits', day.isoformat(), offset)
+
+def transit_instant(day: date, offset: int = 0) -> datetime:
+    """ Local noon of `day` in the bucket, as a UTC datetime. """
+    return datetime.combine(day, time(12), tzinfo=timezone.utc) - timedelta(hours=offset)
+
+def compute_transits(day: date, offset: int = 0) -> dict:
+    """ Positions, moon phase and per-sign aspects for one day and timezone bucket. """
+    _ephemeris_ready()
+    instant = transit_instant(day, offset)
+    jd = swe.julday(instant.year, instant.month, instant.day, instant.hour + instant.minute / 60.0)
+
+    positions, longitudes = {}, {}
+    for name, planet in PLANETS.items():
+        values = swe.calc_ut(jd, planet, swe.FLG_SWIEPH | swe.FLG_SPEED)[0]
+        longitudes[name] = longitude = values[0] % 360.0
+        positions[name] = {
+            'sign': SIGNS[int(longitude // 30.0)],
+            'degree': round(longitude % 30.0, 2),
+            'retrograde': values[3] < 0,
+        }
+
+    elongation = (longitudes['Moon'] - longitudes['Sun']) % 360.0
+    aspects = {}
+    for index, sign in enumerate(SIGNS):
+        aspects[sign] = []
+        for name, position in positions.items():
+            distance = (SIGNS.index(position['sign']) - index) % 12
+            if (aspect := ASPECTS.get(min(distance, 12 - distance))) is not None:
+                aspects[sign].append({'planet': name, 'sign': position['sign'], 'aspect': aspect})
+
+    return {
+        'date': day.isoformat(),
+        'utc_offset': offset,
+        'instant': instant.isoformat(),
+        'moon_phase': MOON_PHASES[int(((elongation + 22.5) % 360.0) // 45.0)],
+        'positions': positions,
+        'aspects': aspects,
+    }
+
+def daily_transits(day: date, offset: int = 0) -> dict:
+    """ Cached `compute_transits`. Returns a copy callers may mutate. """
+    key = transit_key(day, offset)
+    if (transits := transit_cache.get(key)) is None:
+        transits = compute_transits(day, offset)
+        transit_cache.set(key, transits)
+    return _copy(transits)
+
+async def adaily_transits(day: date, offset: int = 0) -> dict:
+    """ Awaitable `daily_transits`; a miss is computed once in a thread however many requests wait on it. """
+    key = transit_key(day, offset)
+    if (transits := await transit_cache.aget(key)) is None:
+        transits = await _flight.do(key, lambda: asyncio.to_thread(_compute_and_store, key, day, offset))
+    return _copy(transits)
+
+def _compute_and_store(key: str, day: date, offset: int) -> dict:
+    transits = compute_transits(day, offset)
+    transit_cache.set(key, transits)
+    return transits
+
+def _copy(transits: dict) -> dict:
+    return {
+        **transits,
+        'positions': {name: dict(position) for name, position in transits['positions'].items()},
+        'aspects': {sign: [dict(aspect) for aspect in aspects] for sign, aspects in transits['aspects'].items()},
+    }
@@ -0,0 +1,62 @@
+"""
+src/jobs/actions.py
+
+What a job can run. Each action validates its payload with the same model as the matching endpoint
+(so bad requests are rejected at submit time, not by a worker) and runs the agent on the batch lane.
+"""
+
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from pydantic import BaseModel
+
+from src.agent.agents import CombinationAnalyst, NumerologyAnalyst, StoryTell, TarotReader
+from src.agent.scheduler import Ticket
+from src.schemas import StoryRequest, TarotReading
+from utils.woodpecker import UnknownJobAction
+
+
+@dataclass(frozen=True, slots=True)
+class JobAction:
+    model: type[BaseModel]
+    run: Callable[..., Awaitable]
+    # The user a request is for; submitters without one are told apart by address
+    user_id: Callable[[BaseModel], str | None] = lambda request: None
+
+    def validate(self, payload: dict) -> BaseModel:
+        return self.model.model_validate(payload)
+
+    def ticket(self, request: BaseModel, address: str | None = None) -> Ticket:
+        """ Who the job is for: the owner of its quota bucket and Idempotency-Key scope. """
+        return Ticket(user_id=self.user_id(request), client=address)
+
+
+async def _story_tell(request: StoryRequest, address: str | None = None, **clients) -> str | None:
+    ticket = Ticket.for_reading(request.user.id, request.tarot.reading_mode.drawn_num, batch=True, client=address)
+    return await StoryTell(ticket=ticket, **clients).arun(inputs={'user': request.user, 'tarot': request.tarot})
+
+async def _reading(request: StoryRequest, address: str | None = None, **clients) -> dict:
+    ticket = Ticket.for_reading(request.user.id, request.tarot.reading_mode.drawn_num, batch=True, client=address)
+    prediction = await TarotReader(ticket=ticket, **clients).apredict(inputs={'user': request.user, 'tarot': request.tarot})
+    return prediction.model_dump()
+
+async def _combination(reading: TarotReading, address: str | None = None, **clients) -> str | None:
+    ticket = Ticket.for_reading(reading.user_id, reading.reading_mode.drawn_num, batch=True, client=address)
+    return await CombinationAnalyst(ticket=ticket, **clients).arun(inputs=reading)
+
+async def _numerology(reading: TarotReading, address: str | None = None, **clients) -> str | None:
+    ticket = Ticket.for_reading(reading.user_id, reading.reading_mode.drawn_num, batch=True, client=address)
+    return await NumerologyAnalyst(ticket=ticket, **clients).arun(inputs=reading)
+
+
+JOB_ACTIONS: dict[str, JobAction] = {
+    'story_tell': JobAction(StoryRequest, _story_tell, lambda request: request.user.id),
+    'reading': JobAction(StoryRequest, _reading, lambda request: request.user.id),
+    'insight_combination': JobAction(TarotReading, _combination, lambda reading: reading.user_id),
+    'insight_numerology': JobAction(TarotReading, _numerology, lambda reading: reading.user_id),
+}
+
+def get_action(name: str) -> JobAction:
+    if (action := JOB_ACTIONS.get(name)) is None:
+        raise UnknownJobAction(name, JOB_ACTIONS)
+    return action
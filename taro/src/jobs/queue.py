@@ -0,0 +1,250 @@
+"""
+src/jobs/queue.py
+
+Persistent job queue on SQLite. Jobs survive restarts, and several processes (API workers and
+`python -m src.jobs.worker`) can drain the same file: a claim is one atomic `UPDATE ... RETURNING`
+that leases the job to a worker. A job whose lease runs out (its worker crashed) is claimed again.
+Failed attempts are retried with exponential backoff, and finished jobs are kept for the result TTL.
+
+Job ids are random, so knowing a job id is what grants access to its result. An `Idempotency-Key` is
+matched through its own column, scoped to the submitter, and never determines the id.
+
+SQLite calls block (up to the busy timeout when another process holds the write lock), so async code
+uses the `a*` methods, which run them on the queue's own thread instead of the event loop.
+"""
+
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from uuid import uuid4
+
+from utils.cache import make_key
+from utils.woodpecker import IdempotencyKeyMismatch, setup_logger
+
+logger = setup_logger(__name__)
+
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+FINISHED = (DONE, FAILED)
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS jobs ("
+    "id TEXT PRIMARY KEY, action TEXT NOT NULL, payload TEXT NOT NULL, status TEXT NOT NULL, "
+    "attempts INTEGER NOT NULL DEFAULT 0, max_attempts INTEGER NOT NULL, result TEXT, error TEXT, "
+    "created_at REAL NOT NULL, updated_at REAL NOT NULL, available_at REAL NOT NULL, "
+    "lease_until REAL, expires_at REAL, worker TEXT)",
+    "CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, available_at)",
+)
+
+# Columns added since the first schema; queue files created before them are migrated on open
+COLUMNS = (
+    ('fingerprint', 'TEXT'),   # hash of the payload, to reject a reused Idempotency-Key with another body
+    ('idempotency', 'TEXT'),   # hash of (action, submitter, Idempotency-Key)
+    ('address', 'TEXT'),       # submitter's address: quota owner of jobs without a user id
+)
+INDEXES = ("CREATE UNIQUE INDEX IF NOT EXISTS jobs_idempotency ON jobs (idempotency)",)
+
+
+@dataclass(frozen=True, slots=True)
+class Job:
+    id: str
+    action: str
+    payload: dict
+    status: str
+    attempts: int
+    max_attempts: int
+    result: object
+    error: str | None
+    created_at: float
+    updated_at: float
+    available_at: float
+    lease_until: float | None
+    expires_at: float | None
+    worker: str | None
+    fingerprint: str | None
+    idempotency: str | None
+    address: str | None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED
+
+    @classmethod
+    def from_row(cls, row: sqlite3.Row) -> 'Job':
+        fields = dict(row)
+        fields['payload'] = json.loads(fields['payload'])
+        fields['result'] = json.loads(fields['result']) if fields['result'] is not None else None
+        return cls(**fields)
+
+    def as_dict(self) -> dict:
+        """ What clients see: status, attempts and the result or last error (not the payload). """
+        return {
+            'id': self.id,
+            'action': self.action,
+            'status': self.status,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
+            'expires_at': self.expires_at,
+        }
+
+
+class JobQueue:
+    def __init__(self, path: str, max_attempts: int = 3, retry_backoff: float = 5.0, result_ttl: float = 86400.0, lease: float = 600.0):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.result_ttl = result_ttl
+        self.lease = lease
+
+        self._lock = threading.Lock()
+        # Autocommit: every statement is its own transaction
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._db.row_factory = sqlite3.Row
+        # Readers (status polls) do not block the writer, across processes too
+        self._db.execute("PRAGMA journal_mode=WAL")
+        for statement in SCHEMA:
+            self._db.execute(statement)
+        existing = {row['name'] for row in self._db.execute("PRAGMA table_info(jobs)")}
+        for name, kind in COLUMNS:
+            if name not in existing:
+                self._db.execute(f"ALTER TABLE jobs ADD COLUMN {name} {kind}")
+        for statement in INDEXES:
+            self._db.execute(statement)
+        # One thread owns the blocking calls of the async methods (the connection is serialized anyway)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='job-queue')
+
+    def _execute(self, sql: str, params: tuple = ()) -> list[sqlite3.Row]:
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def submit(
+        self, action: str, payload: dict, idempotency_key: str | None = None, owner: str | None = None, address: str | None = None,
+    ) -> Job:
+        """
+        Queues a job. A repeated `idempotency_key` (per action and `owner`) returns the existing job instead, or
+        raises `IdempotencyKeyMismatch` when that job was submitted with a different payload.
+        """
+        now = time.time()
+        fingerprint = make_key(payload)
+        idempotency = make_key('job', action, owner, idempotency_key) if idempotency_key else None
+        if idempotency:
+            # An expired job with the same key is replaced by a fresh one
+            self._execute("DELETE FROM jobs WHERE idempotency = ? AND expires_at <= ?", (idempotency, now))
+        job_id = uuid4().hex
+        self._execute(
+            "INSERT OR IGNORE INTO jobs (id, action, payload, status, max_attempts, created_at, updated_at, available_at, "
+            "fingerprint, idempotency, address) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (job_id, action, json.dumps(payload), QUEUED, self.max_attempts, now, now, now, fingerprint, idempotency, address),
+        )
+        if idempotency is None:
+            return self.get(job_id)
+        rows = self._execute("SELECT * FROM jobs WHERE idempotency = ?", (idempotency,))
+        if not rows or rows[0]['fingerprint'] != fingerprint:
+            raise IdempotencyKeyMismatch()
+        return Job.from_row(rows[0])
+
+    def get(self, job_id: str) -> Job | None:
+        """ The job, or None when unknown or expired. """
+        rows = self._execute("SELECT * FROM jobs WHERE id = ? AND (expires_at IS NULL OR expires_at > ?)", (job_id, time.time()))
+        return Job.from_row(rows[0]) if rows else None
+
+    def claim(self, worker: str) -> Job | None:
+        """ Leases the oldest ready job (or one whose worker's lease ran out) to `worker`. """
+        now = time.time()
+        rows = self._execute(
+            "UPDATE jobs SET status = ?, attempts = attempts + 1, worker = ?, lease_until = ?, updated_at = ? "
+            "WHERE id = (SELECT id FROM jobs WHERE (status = ? AND available_at <= ?) "
+            "OR (status = ? AND lease_until <= ? AND attempts < max_attempts) ORDER BY available_at LIMIT 1) "
+            "RETURNING *",
+            (RUNNING, worker, now + self.lease, now, QUEUED, now, RUNNING, now),
+        )
+        return Job.from_row(rows[0]) if rows else None
+
+    def complete(self, job: Job, result) -> None:
+        now = time.time()
+        self._execute(
+            "UPDATE jobs SET status = ?, result = ?, error = NULL, lease_until = NULL, updated_at = ?, expires_at = ? "
+            "WHERE id = ? AND worker = ? AND status = ?",
+            (DONE, json.dumps(result), now, now + self.result_ttl, job.id, job.worker, RUNNING),
+        )
+
+    def fail(self, job: Job, error: str, retry_after: float | None = None, permanent: bool = False) -> str:
+        """ Records a failed attempt: requeued after a backoff, or failed for good. Returns the new status. """
+        now = time.time()
+        if permanent or job.attempts >= job.max_attempts:
+            status, available_at, expires_at = FAILED, job.available_at, now + self.result_ttl
+        else:
+            delay = retry_after if retry_after is not None else self.retry_backoff * 2 ** (job.attempts - 1)
+            status, available_at, expires_at = QUEUED, now + delay, None
+        self._execute(
+            "UPDATE jobs SET status = ?, error = ?, available_at = ?, expires_at = ?, lease_until = NULL, updated_at = ? "
+            "WHERE id = ? AND worker = ? AND status = ?",
+            (status, error, available_at, expires_at, now, job.id, job.worker, RUNNING),
+        )
+        return status
+
+    def release(self, job: Job) -> None:
+        """ Puts back a job interrupted by a shutdown, without counting the attempt. """
+        self._execute(
+            "UPDATE jobs SET status = ?, attempts = attempts - 1, lease_until = NULL, updated_at = ? "
+            "WHERE id = ? AND worker = ? AND status = ?",
+            (QUEUED, time.time(), job.id, job.worker, RUNNING),
+        )
+
+    def sweep(self) -> int:
+        """ Fails jobs whose last attempt's lease ran out and deletes expired ones; returns the rows deleted. """
+        now = time.time()
+        self._execute(
+            "UPDATE jobs SET status = ?, error = COALESCE(error, 'Worker lost'), lease_until = NULL, updated_at = ?, expires_at = ? "
+            "WHERE status = ? AND lease_until <= ? AND attempts >= max_attempts",
+            (FAILED, now, now + self.result_ttl, RUNNING, now),
+        )
+        deleted = self._execute("DELETE FROM jobs WHERE expires_at <= ? RETURNING id", (now,))
+        if deleted:
+            logger.info("Removed %d expired jobs", len(deleted))
+        return len(deleted)
+
+    def stats(self) -> dict:
+        counts = {status: 0 for status in (QUEUED, RUNNING, DONE, FAILED)}
+        for row in self._execute("SELECT status, COUNT(*) AS count FROM jobs GROUP BY status"):
+            counts[row['status']] = row['count']
+        return counts
+
+    async def _off_loop(self, method, *args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, partial(method, *args, **kwargs))
+
+    async def asubmit(
+        self, action: str, payload: dict, idempotency_key: str | None = None, owner: str | None = None, address: str | None = None,
+    ) -> Job:
+        return await self._off_loop(self.submit, action, payload, idempotency_key, owner, address)
+
+    async def aget(self, job_id: str) -> Job | None:
+        return await self._off_loop(self.get, job_id)
+
+    async def aclaim(self, worker: str) -> Job | None:
+        return await self._off_loop(self.claim, worker)
+
+    async def acomplete(self, job: Job, result) -> None:
+        await self._off_loop(self.complete, job, result)
+
+    async def afail(self, job: Job, error: str, retry_after: float | None = None, permanent: bool = False) -> str:
+        return await self._off_loop(self.fail, job, error, retry_after, permanent)
+
+    async def arelease(self, job: Job) -> None:
+        await self._off_loop(self.release, job)
+
+    async def asweep(self) -> int:
+        return await self._off_loop(self.sweep)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            self._db.close()
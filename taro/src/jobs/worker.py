@@ -0,0 +1,148 @@
+"""
+src/jobs/worker.py
+
+Worker tasks draining the job queue. The API process runs `JOB_WORKERS` of them; LLM workers can also
+be sized separately by setting `JOB_WORKERS=0` and running, from the service root:
+
+    python -m src.jobs.worker --workers 4
+
+Every process shares the SQLite queue file. Jobs submitted in-process wake the local workers at once;
+otherwise workers poll every `JOB_POLL_INTERVAL` seconds.
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+from src.jobs.actions import get_action
+from src.jobs.queue import Job, JobQueue
+from utils.settings import resolve_path, setting
+from utils.woodpecker import GatewayRejected, WoodPecker, setup_logger
+
+logger = setup_logger(__name__)
+
+# Seconds between sweeps of expired jobs and lost leases
+SWEEP_INTERVAL = 60.0
+
+def is_permanent(error: Exception) -> bool:
+    """ Errors that would fail again on retry: invalid inputs and other client errors. """
+    if isinstance(error, GatewayRejected):
+        return False
+    return isinstance(error, ValueError) or (isinstance(error, WoodPecker) and error.status_code < 500)
+
+
+class WorkerPool:
+    def __init__(self, queue: JobQueue, workers: int, poll_interval: float = 0.5, **clients):
+        self.queue = queue
+        self.workers = workers
+        self.poll_interval = poll_interval
+        # Ollama clients handed to the agents (the process-wide ones when omitted)
+        self.clients = clients
+        self._tasks: list[asyncio.Task] = []
+        self._wake = asyncio.Event()
+        self._swept = 0.0
+        self.completed = 0
+        self.failed = 0
+        self.retried = 0
+
+    async def start(self) -> None:
+        self._wake = asyncio.Event()
+        # Worker names record who holds a job's lease
+        self._tasks = [asyncio.create_task(self._work(f"{os.getpid()}-{i}")) for i in range(self.workers)]
+        if self._tasks:
+            logger.info("Job workers started: %d", self.workers)
+
+    async def join(self) -> None:
+        """ Runs until the workers are cancelled. """
+        await asyncio.gather(*self._tasks)
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self) -> None:
+        """ A job was just queued: wake the idle workers instead of waiting for the next poll. """
+        self._wake.set()
+
+    async def _work(self, name: str) -> None:
+        while True:
+            try:
+                if time.monotonic() - self._swept > SWEEP_INTERVAL:
+                    self._swept = time.monotonic()
+                    await self.queue.asweep()
+                job = await self.queue.aclaim(name)
+            except Exception:
+                # e.g. the queue file locked by another process for longer than the busy timeout
+                logger.exception("Job worker %s could not reach the queue", name)
+                job = None
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+                continue
+            await self.execute(job)
+
+    async def execute(self, job: Job) -> None:
+        start = time.perf_counter()
+        try:
+            action = get_action(job.action)
+            result = await action.run(action.validate(job.payload), address=job.address, **self.clients)
+        except asyncio.CancelledError:
+            await self.queue.arelease(job)
+            raise
+        except Exception as e:
+            retry_after = e.retry_after if isinstance(e, GatewayRejected) else None
+            message = e.message if isinstance(e, WoodPecker) else str(e) or repr(e)
+            status = await self.queue.afail(job, message, retry_after, permanent=is_permanent(e))
+            if status == 'failed':
+                self.failed += 1
+                logger.warning("Job %s (%s) failed after %d attempts: %r", job.id, job.action, job.attempts, e)
+            else:
+                self.retried += 1
+                logger.info("Job %s (%s) attempt %d failed, retrying: %r", job.id, job.action, job.attempts, e)
+        else:
+            await self.queue.acomplete(job, result)
+            self.completed += 1
+            logger.info("Job %s (%s) done in %.2fs", job.id, job.action, time.perf_counter() - start)
+
+    def stats(self) -> dict:
+        return {
+            'workers': len(self._tasks),
+            'completed': self.completed,
+            'failed': self.failed,
+            'retried': self.retried,
+            'queue': self.queue.stats(),
+        }
+
+
+def job_queue() -> JobQueue:
+    """ The queue configured by the `JOB_*` settings. """
+    return JobQueue(
+        path=resolve_path(setting.jobs.path),
+        max_attempts=setting.jobs.max_attempts,
+        retry_backoff=setting.jobs.retry_backoff,
+        result_ttl=setting.jobs.result_ttl,
+        lease=setting.jobs.lease,
+    )
+
+async def serve(workers: int) -> None:
+    pool = WorkerPool(job_queue(), workers, setting.jobs.poll_interval)
+    await pool.start()
+    try:
+        await pool.join()
+    finally:
+        await pool.stop()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Drains Taro's job queue.")
+    parser.add_argument('--workers', type=int, default=setting.gateway.max_parallel)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.workers))
+    except KeyboardInterrupt:
+        pass
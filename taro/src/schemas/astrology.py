@@ -1,14 +1,20 @@
 # src/schemas/astrology.py
-from datetime import datetime
+import asyncio
+from datetime import date, datetime
 from typing import Optional
 from pydantic import BaseModel, field_validator
 from zoneinfo import ZoneInfo
 
-from immanuel import charts
-from immanuel.const import chart
-from utils.handler import get_lat_lon
+from src.astrology.chart import natal_chart
+from src.astrology.ephemeris import ephemeris_table, fast_signs, table_loaded
+from src.astrology.pool import chart_pool
+from src.astrology.transits import adaily_transits, daily_transits, day_bucket
+from utils.geocode import aget_lat_lon, get_lat_lon
 
 
+# Fields filled by the signs-only mode
+SIGN_FIELDS = ('sun_sign', 'moon_sign', 'rising_sign')
+
 class UserInsights(BaseModel):
     """ Astrology & Natal House Placements of the user. """
     
@@ -32,40 +38,79 @@ class UserInsights(BaseModel):
         Populate astrology fields given a timezone-aware datetime and a birth_place string.
         This method mutates self and returns None.
         """
-        if dt.tzinfo is None:
-            # If dt is naive, attach explicit zoneinfo from birth_place
-            tz = ZoneInfo(birth_place)
-            dt = dt.replace(tzinfo=tz)
-
-        latitude, longitude = get_lat_lon(place=birth_place)
-        native = charts.Subject(date_time=dt, latitude=latitude, longitude=longitude)
-        natal = charts.Natal(native)
-
-        self.sun_sign = natal.objects[chart.SUN].sign.name
-        self.moon_sign = natal.objects[chart.MOON].sign.name
-        self.rising_sign = natal.objects[chart.ASC].sign.name
-
-        self.house_placements = {
-            f"{i}th House": natal.houses.get(str(i)).sign.name
-            if natal.houses.get(str(i)) and getattr(natal.houses.get(str(i)), "sign", None) is not None
-            else None
-            for i in range(1, 13)
-        }
-
-        elements: dict[str, int] = {}
-        modalities: dict[str, int] = {}
-        dominant_planets: dict[str, int] = {}
-
-        for obj in natal.objects.values():
-            if obj.type.name == 'Planet':
-                element = obj.sign.element
-                modality = obj.sign.modality
-                planet = obj.name
-
-                elements[element] = elements.get(element, 0) + 1
-                modalities[modality] = modalities.get(modality, 0) + 1
-                dominant_planets[planet] = dominant_planets.get(planet, 0) + 1
-
-        self.elemental_distribution = elements
-        self.modality_distribution = modalities
-        self.dominant_planets = dominant_planets
\ No newline at end of file
+        self.apply_chart(natal_chart(*chart_inputs(dt, birth_place)))
+
+    async def acompute_from_datetime(self, dt: datetime, birth_place: str | None = "Australia/Sydney"):
+        """ Awaitable `compute_from_datetime`; the chart is computed in the chart process pool. """
+        self.apply_chart(await chart_pool.chart(*await achart_inputs(dt, birth_place)))
+
+    async def acompute_signs(self, dt: datetime, birth_place: str | None = "Australia/Sydney"):
+        """
+        Only sun, moon and rising sign, from the precomputed ephemeris table (microseconds, no `charts.Natal`).
+        Births outside the table's years fall back to the full chart.
+        """
+        dt, latitude, longitude = await achart_inputs(dt, birth_place)
+        if not table_loaded():
+            await asyncio.to_thread(ephemeris_table)
+        try:
+            fields = fast_signs(dt, latitude, longitude)
+        except ValueError:
+            fields = {name: value for name, value in (await chart_pool.chart(dt, latitude, longitude)).items() if name in SIGN_FIELDS}
+        self.apply_chart(fields)
+
+    def apply_chart(self, fields: dict):
+        for name, value in fields.items():
+            setattr(self, name, value)
+
+
+class DailyTransits(BaseModel):
+    """ The day's planetary positions (local noon of the timezone bucket) and their aspects to each sun sign. """
+
+    date: date
+    utc_offset: int = 0
+    instant: datetime
+    moon_phase: str
+    positions: dict[str, dict]
+    aspects: dict[str, list[dict]]
+
+    @classmethod
+    def for_day(cls, day: date | None = None, tz: str | None = None) -> 'DailyTransits':
+        """ Shared transits of `day` (today in `tz` by default); computed once per day and bucket, then cached. """
+        day, offset = day_bucket(tz, day)
+        return cls(**daily_transits(day, offset))
+
+    @classmethod
+    async def afor_day(cls, day: date | None = None, tz: str | None = None) -> 'DailyTransits':
+        day, offset = day_bucket(tz, day)
+        return cls(**await adaily_transits(day, offset))
+
+    def for_sign(self, sign: str) -> 'DailyTransits':
+        """ Same day with only the aspects to `sign`. """
+        sign = sign.strip().title()
+        return self.model_copy(update={'aspects': {sign: self.aspects.get(sign, [])}})
+
+    def horoscope(self, sign: str) -> str:
+        """ One prompt line for a sun sign, e.g. `Moon in Leo (trine), Saturn in Aries (conjunction)`. """
+        aspects = self.aspects.get(sign.strip().title(), [])
+        transits = ", ".join(f"{a['planet']} in {a['sign']} ({a['aspect']})" for a in aspects)
+        return f"{self.moon_phase}; {transits or 'no major transits'}"
+
+
+def chart_inputs(dt: datetime, birth_place: str | None) -> tuple[datetime, float, float]:
+    """ Timezone-aware birth datetime and the birth place's coordinates. """
+    dt = aware_birth(dt, birth_place)
+    latitude, longitude = get_lat_lon(place=birth_place)
+    return dt, latitude, longitude
+
+async def achart_inputs(dt: datetime, birth_place: str | None) -> tuple[datetime, float, float]:
+    """ Awaitable `chart_inputs`; a network geocoding fallback does not block the event loop. """
+    dt = aware_birth(dt, birth_place)
+    latitude, longitude = await aget_lat_lon(birth_place)
+    return dt, latitude, longitude
+
+def aware_birth(dt: datetime, birth_place: str | None) -> datetime:
+    if dt.tzinfo is None:
+        # If dt is naive, attach explicit zoneinfo from birth_place
+        tz = ZoneInfo(birth_place)
+        dt = dt.replace(tzinfo=tz)
+    return dt
@@ -1,17 +1,26 @@
 # src/schemas/tarot.py
-from typing import List
+from collections import Counter
+from typing import List, Literal
 from uuid import uuid4
 from datetime import datetime
 from pydantic import BaseModel, Field, model_validator, field_serializer, ConfigDict
 
+from src.tarot.cards import CardName, DrawnCard, parse_card
+from src.tarot.rarity import rarity_facts, spread_rarity
+from src.tarot.stats import SpreadArrays
 from utils.handler import ReadingMode
+from .user import User
 from utils.woodpecker import InvalidTarotInsightsCalculation, MismatchedDrawnCards
 
 DEFAULT_DATETIME_FORMAT = "%d-%m-%Y %H:%M"
 
+# `TarotInsights` counter of each suit
+SUIT_FIELDS = {'wands': 'wand_count', 'cups': 'cup_count', 'swords': 'sword_count', 'pentacles': 'coin_count'}
+
 class StatsRequest(BaseModel):
     reading_mode: ReadingMode
-    drawn_cards: List[str]
+    drawn_cards: List[CardName]
+    user_id: str | None = None
 
     @model_validator(mode="after")
     def ensure_non_empty(cls, model):
@@ -20,6 +29,31 @@ class StatsRequest(BaseModel):
         return model
 
 
+class SpreadRecord(BaseModel):
+    """ One past reading of a user's history. """
+    timestamp: datetime
+    reading_mode: ReadingMode
+    drawn_cards: List[CardName]
+
+    @model_validator(mode='after')
+    def validate_drawn_num(self):
+        if len(self.drawn_cards) != self.reading_mode.drawn_num:
+            raise MismatchedDrawnCards(self.reading_mode.drawn_num, len(self.drawn_cards), self.reading_mode.drawn_num)
+        return self
+
+
+class HistoryStatsRequest(BaseModel):
+    readings: List[SpreadRecord]
+    window: Literal['day', 'week', 'month', 'year'] = 'month'
+    top: int = Field(default=3, ge=0, le=78)
+    user_id: str | None = None
+
+    def encode(self) -> SpreadArrays:
+        return SpreadArrays.encode(
+            (reading.timestamp, reading.drawn_cards, reading.reading_mode.position) for reading in self.readings
+        )
+
+
 class DecodeMeter(BaseModel):
     num_keep: int = 5
     seed: int = 42
@@ -48,9 +82,11 @@ class TarotInsights(BaseModel):
     total_courts: int = 0
     # Elements Ratio of drawn spread
     wand_count: int = 0
-    coin_count: int = 0
+    coin_count: int = 0  # Pentacles (a.k.a. Coins)
     sword_count: int = 0
     cup_count: int = 0
+    # How unusual the spread is (see `src.tarot.rarity.spread_rarity`)
+    rarity: dict | None = None
 
     model_config = ConfigDict(extra="ignore", populate_by_name=True)
 
@@ -87,35 +123,41 @@ class TarotInsights(BaseModel):
         return base
 
     @staticmethod
-    def insight(num_cards: int, drawn_cards: List[str]):
-        element = ('wand', 'sword', 'coin', 'cup')
-        court = ('king', 'queen', 'page', 'knight')
-
-        insight = TarotInsights(num_cards=num_cards)
-
-        for input_card in drawn_cards:
-            card = input_card.strip().lower()
-            for el, co in zip(element, court):
-                if el in card:
-                    setattr(insight, f"{el}_count", getattr(insight, f"{el}_count") + 1)
-                if co in card:
-                    setattr(insight, f"{co}_count", getattr(insight, f"{co}_count") + 1)
-
-        insight.total_courts = insight.king_count + insight.knight_count + insight.queen_count + insight.page_count
-        return insight
+    def insight(num_cards: int, drawn_cards: List[str | DrawnCard]):
+        """ Court and suit counts of a spread, read from the card registry. """
+        counts = Counter()
+        for drawn in drawn_cards:
+            card = parse_card(drawn).card
+            if card.suit is not None:
+                counts[SUIT_FIELDS[card.suit]] += 1
+            if card.is_court:
+                counts[f"{card.rank}_count"] += 1
+        return TarotInsights(num_cards=num_cards, rarity=spread_rarity(drawn_cards), **counts)
 
 
 class TarotPrediction(BaseModel):
-    combination: str | None = None
-    numerology: str | None = None
-    story_tell: str | None = None
+    combination: str | None = Field(default=None, description="Key card pairings and what the combination says about the question.")
+    numerology: str | None = Field(default=None, description="Interpretation of the spread's numerology facts.")
+    story_tell: str | None = Field(default=None, description="The final, personal prediction for the user.")
+
+    @classmethod
+    def response_schema(cls) -> dict:
+        """ JSON schema for Ollama's `format` parameter: every section required, as a string. """
+        return {
+            'type': 'object',
+            'properties': {
+                name: {'type': 'string', 'description': field.description} for name, field in cls.model_fields.items()
+            },
+            'required': list(cls.model_fields),
+        }
 
 
 class TarotReading(BaseModel):
     timestamp: str = Field(default=datetime.now().isoformat())
     question: str
     reading_mode: ReadingMode
-    drawn_cards: list
+    drawn_cards: List[CardName]
+    user_id: str | None = None  # requesting user, for fair scheduling of LLM work
 
     def get_tarot_insights(self):
         return TarotInsights.insight(self.reading_mode.drawn_num, self.drawn_cards)  # type: ignore
@@ -126,6 +168,18 @@ class TarotReading(BaseModel):
             raise MismatchedDrawnCards(self.reading_mode.drawn_num, len(self.drawn_cards), self.reading_mode.drawn_num)
         return self
 
+    @property
+    def card_ids(self) -> tuple[int, ...]:
+        """ Registry IDs of the drawn cards, in draw order. """
+        return tuple(card.id for card in self.drawn_cards)
+
+    @property
+    def spread_facts(self) -> str:
+        """ Prompt lines for the spread's rare patterns (exact odds), empty when nothing stands out. """
+        if facts := rarity_facts(spread_rarity(self.drawn_cards)):
+            return "\nSpread rarity:\n" + "\n".join(f"- {fact}" for fact in facts)
+        return ""
+
     @property
     def pos_draw(self) -> str:
         return "\n".join(
@@ -133,6 +187,12 @@ class TarotReading(BaseModel):
         )
 
 
+class StoryRequest(BaseModel):
+    """ StoryTell request: the user's profile plus their tarot reading. """
+    user: User
+    tarot: TarotReading
+
+
 def save_session(
     reading: TarotReading,
     insights: TarotInsights,
@@ -2,13 +2,20 @@
 from uuid import uuid4
 from datetime import datetime, time
 from zoneinfo import ZoneInfo
-from pydantic import BaseModel, field_serializer, model_validator, ConfigDict
+from pydantic import BaseModel, Field, PrivateAttr, field_serializer, model_serializer, model_validator, ConfigDict
 
 from utils.handler import IncommingDate, IncommingTimestamp, DisplayName
-from src.schemas.astrology import UserInsights  # relative import into the new package
+from src.astrology.chart import CHART_FIELDS
+from src.schemas.astrology import SIGN_FIELDS, UserInsights  # relative import into the new package
 
 class User(UserInsights):
-    """User profile that includes astrology (inherits UserInsights)."""
+    """
+    User profile that includes astrology (inherits UserInsights).
+
+    The astrology fields are computed lazily: validation only normalizes the profile, and the natal chart
+    (geocoding + ephemeris) is computed on first access to one of them, or by `(a)load_astrology`.
+    Serialization only emits the fields already computed.
+    """
 
     id: str
     username: str
@@ -18,6 +25,10 @@ class User(UserInsights):
     birth_time: IncommingTimestamp = None
     birth_place: str | None = 'Australia/Sydney'
     gender: str | None = 'UNKNOWN'
+    # Add the natal chart fields to prompts; off for endpoints that only need the profile
+    include_astrology: bool = Field(default=False, exclude=True)
+
+    _astrology_loaded: bool = PrivateAttr(default=False)
 
     model_config = ConfigDict(
         json_encoders={ datetime: lambda dt: dt.isoformat() }
@@ -38,7 +49,7 @@ class User(UserInsights):
     def validate_user_profile(self):
         """
         Ensure birth_date & birth_place exist and coerce/normalize birth_date + birth_time
-        into timezone-aware datetimes. Then delegate astrology computation to UserInsights.
+        into timezone-aware datetimes. The astrology fields are left for `load_astrology`.
         """
         if not self.birth_date or not self.birth_place:
             raise ValueError(f"Expected 'birth_date' and 'birth_place' to be non-null; got birth_date={self.birth_date}, birth_place={self.birth_place}")
@@ -60,10 +71,53 @@ class User(UserInsights):
         self.birth_time = dt
         self.birth_date = dt
 
-        # Compute astrology fields using the dedicated method on UserInsights
-        self.compute_from_datetime(dt, self.birth_place or "Australia/Sydney")
+        # Astrology fields stay unset until first needed (see `__getattr__`)
+        for name in CHART_FIELDS:
+            self.__dict__.pop(name, None)
         return self
 
+    def __getattr__(self, name: str):
+        # Only reached for attributes missing from the instance, i.e. chart fields not computed yet
+        if name in CHART_FIELDS:
+            self.load_astrology()
+            return self.__dict__[name]
+        return super().__getattr__(name)
+
+    @model_serializer(mode='wrap')
+    def _serialize(self, handler):
+        # Chart fields not computed are left out of the output: serializing never runs a chart on the caller's thread
+        return handler(self)
+
+    def load_astrology(self) -> None:
+        """ Computes the natal chart fields once (cached across users born at the same instant and place). """
+        if not self._astrology_loaded:
+            self.compute_from_datetime(self.birth_date, self.birth_place or "Australia/Sydney")  # type: ignore
+            self._astrology_loaded = True
+
+    async def aload_astrology(self) -> None:
+        """ Awaitable `load_astrology` computing the chart in the chart process pool. """
+        if not self._astrology_loaded:
+            await self.acompute_from_datetime(self.birth_date, self.birth_place or "Australia/Sydney")  # type: ignore
+            self._astrology_loaded = True
+
+    def get_astrology(self) -> UserInsights:
+        """ Computes the chart, includes it when the user is serialized and returns it on its own. """
+        self.include_astrology = True
+        self.load_astrology()
+        return UserInsights(**{name: getattr(self, name) for name in CHART_FIELDS})
+
+    async def aget_astrology(self) -> UserInsights:
+        """ Awaitable `get_astrology` for async handlers; keeps the event loop free while the chart computes. """
+        self.include_astrology = True
+        await self.aload_astrology()
+        return UserInsights(**{name: getattr(self, name) for name in CHART_FIELDS})
+
+    async def aget_signs(self) -> dict:
+        """ Signs-only astrology (`mode=signs`): sets and returns sun, moon and rising sign without a full chart. """
+        if not self._astrology_loaded:
+            await self.acompute_signs(self.birth_date, self.birth_place or "Australia/Sydney")  # type: ignore
+        return {name: getattr(self, name) for name in SIGN_FIELDS}
+
     @property
     def birth(self) -> datetime:
         """Return the full timezone-aware datetime for the user's birth."""
@@ -0,0 +1,146 @@
+"""
+src/tarot/cards.py
+
+The 78-card deck as a registry with compact integer IDs, and a parser from the free-text names clients send.
+
+IDs: 0-21 Major Arcana (The Fool ... The World), then 14 cards per suit in the order Wands, Cups, Swords,
+Pentacles, each Ace ... Ten, Page, Knight, Queen, King. Every accepted spelling of every card (suit and rank
+synonyms, digits, with or without "The", "(Reversed)") is expanded once at import into one alias index,
+so parsing a name is a whitespace/case normalization and a single dict lookup.
+"""
+
+from dataclasses import dataclass
+from itertools import product
+from typing import Annotated, NamedTuple
+
+from pydantic import BeforeValidator, PlainSerializer
+
+from utils.woodpecker import UnknownTarotCard
+
+MAJOR_ARCANA = (
+    ('The Fool', 'Air'), ('The Magician', 'Air'), ('The High Priestess', 'Water'), ('The Empress', 'Earth'),
+    ('The Emperor', 'Fire'), ('The Hierophant', 'Earth'), ('The Lovers', 'Air'), ('The Chariot', 'Water'),
+    ('Strength', 'Fire'), ('The Hermit', 'Earth'), ('Wheel of Fortune', 'Fire'), ('Justice', 'Air'),
+    ('The Hanged Man', 'Water'), ('Death', 'Water'), ('Temperance', 'Fire'), ('The Devil', 'Earth'),
+    ('The Tower', 'Fire'), ('The Star', 'Air'), ('The Moon', 'Water'), ('The Sun', 'Fire'),
+    ('Judgement', 'Fire'), ('The World', 'Earth'),
+)
+
+SUITS = ('wands', 'cups', 'swords', 'pentacles')
+SUIT_ELEMENTS = {'wands': 'Fire', 'cups': 'Water', 'swords': 'Air', 'pentacles': 'Earth'}
+RANKS = ('ace', 'two', 'three', 'four', 'five', 'six', 'seven', 'eight', 'nine', 'ten', 'page', 'knight', 'queen', 'king')
+COURT_RANKS = frozenset(('page', 'knight', 'queen', 'king'))
+
+SUIT_ALIASES = {
+    'wands': ('wand', 'rods', 'rod', 'staves', 'staff', 'batons', 'baton', 'clubs'),
+    'cups': ('cup', 'chalices', 'chalice', 'hearts'),
+    'swords': ('sword', 'blades', 'spades'),
+    'pentacles': ('pentacle', 'coins', 'coin', 'disks', 'disk', 'discs', 'disc', 'diamonds'),
+}
+RANK_ALIASES = {rank: (str(number),) for number, rank in enumerate(RANKS[:10], start=1)} | {
+    'ace': ('1', 'one'),
+    'page': ('princess',),
+    'knight': ('prince',),
+}
+MAJOR_ALIASES = {
+    'The High Priestess': ('priestess',),
+    'Wheel of Fortune': ('the wheel of fortune', 'wheel', 'the wheel'),
+    'Strength': ('the strength',),
+    'Justice': ('the justice',),
+    'The Hanged Man': ('hanged one',),
+    'Death': ('the death',),
+    'Temperance': ('the temperance',),
+    'Judgement': ('judgment', 'the judgement', 'the judgment'),
+}
+REVERSED_FORMS = ('{} (reversed)', '{} reversed', '{} (r)', 'reversed {}')
+
+
+@dataclass(frozen=True, slots=True)
+class Card:
+    """ One card of the deck. `number` is 0-21 for the Major Arcana, and 1-14 (Ace ... King) within a suit. """
+    id: int
+    name: str
+    arcana: str
+    suit: str | None
+    rank: str | None
+    number: int
+    element: str
+
+    @property
+    def is_major(self) -> bool:
+        return self.arcana == 'major'
+
+    @property
+    def is_court(self) -> bool:
+        return self.rank in COURT_RANKS
+
+
+class DrawnCard(NamedTuple):
+    """ A card as drawn: its registry ID and orientation. Renders as the canonical name. """
+    id: int
+    reversed: bool = False
+
+    @property
+    def card(self) -> Card:
+        return DECK[self.id]
+
+    def __str__(self) -> str:
+        return f"{DECK[self.id].name} (Reversed)" if self.reversed else DECK[self.id].name
+
+
+def _build_deck() -> tuple[Card, ...]:
+    deck = [
+        Card(id=number, name=name, arcana='major', suit=None, rank=None, number=number, element=element)
+        for number, (name, element) in enumerate(MAJOR_ARCANA)
+    ]
+    for suit, (number, rank) in product(SUITS, enumerate(RANKS, start=1)):
+        deck.append(Card(
+            id=len(deck), name=f"{rank.title()} of {suit.title()}", arcana='minor',
+            suit=suit, rank=rank, number=number, element=SUIT_ELEMENTS[suit],
+        ))
+    return tuple(deck)
+
+def normalize(name: str) -> str:
+    return " ".join(name.lower().split())
+
+def _names(card: Card) -> set[str]:
+    if card.is_major:
+        names = {normalize(card.name), *MAJOR_ALIASES.get(card.name, ())}
+        if card.name.startswith('The '):
+            names.add(normalize(card.name[4:]))
+        return names
+    ranks = (card.rank, *RANK_ALIASES.get(card.rank, ()))
+    suits = (card.suit, *SUIT_ALIASES[card.suit])
+    return {f"{rank} of {suit}" for rank, suit in product(ranks, suits)}
+
+def _build_index(deck: tuple[Card, ...]) -> dict[str, DrawnCard]:
+    index: dict[str, DrawnCard] = {}
+    for card in deck:
+        for name in _names(card):
+            index[name] = DrawnCard(card.id)
+            for form in REVERSED_FORMS:
+                index[form.format(name)] = DrawnCard(card.id, True)
+        # Canonical names (what this API serializes) as sent back, without normalizing
+        for drawn in (DrawnCard(card.id), DrawnCard(card.id, True)):
+            index[str(drawn)] = drawn
+    return index
+
+
+DECK = _build_deck()
+ALIASES = _build_index(DECK)
+
+def parse_card(value) -> DrawnCard:
+    """ Registry card for a drawn card name (or an ID, or an already parsed card); raises UnknownTarotCard. """
+    if isinstance(value, DrawnCard):
+        return value
+    if isinstance(value, int) and not isinstance(value, bool) and 0 <= value < len(DECK):
+        return DrawnCard(value)
+    if isinstance(value, str) and (drawn := ALIASES.get(value) or ALIASES.get(normalize(value))) is not None:
+        return drawn
+    raise UnknownTarotCard(str(value))
+
+def card_ids(cards) -> tuple[int, ...]:
+    return tuple(parse_card(card).id for card in cards)
+
+# Field type for drawn cards: accepts any known spelling, serializes to the canonical name
+CardName = Annotated[DrawnCard, BeforeValidator(parse_card), PlainSerializer(str, return_type=str)]
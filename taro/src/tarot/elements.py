@@ -0,0 +1,111 @@
+"""
+src/tarot/elements.py
+
+Elemental reading of a spread without a model call: counts per element (suits, and the Major Arcana through
+their astrological attribution in the registry), the dominant and missing elements, how the present ones
+interact, and what each position's element brings, rendered from a phrase bank. Phrase variants are chosen
+from the card IDs, so the same spread always reads the same.
+"""
+
+from collections import Counter
+
+from src.tarot.cards import parse_card
+from src.tarot.stats import ELEMENTS
+
+SUIT_OF_ELEMENT = {'Fire': 'Wands', 'Water': 'Cups', 'Air': 'Swords', 'Earth': 'Pentacles'}
+
+THEMES = {
+    'Fire': ('passion and drive', 'ambition and courage', 'creative spark and willpower'),
+    'Water': ('feelings and intuition', 'emotional connection', 'love, dreams and sensitivity'),
+    'Air': ('thoughts and communication', 'decisions and clarity', 'ideas, truth and conflict'),
+    'Earth': ('practical matters and stability', 'work, money and the body', 'grounding and commitment'),
+}
+REVERSED = ('held back', 'turned inward', 'blocked or delayed')
+
+DOMINANT = {
+    'Fire': "{element} leads this spread: energy, desire and the urge to act are driving the situation",
+    'Water': "{element} leads this spread: emotions and intuition carry more weight here than logic",
+    'Air': "{element} leads this spread: the situation is shaped by thoughts, words and decisions",
+    'Earth': "{element} leads this spread: the answer lies in practical, tangible steps",
+}
+MISSING = {
+    'Fire': "Without Fire, motivation or passion may be lacking; momentum has to be created deliberately",
+    'Water': "Without Water, feelings may be unspoken or set aside; emotional needs deserve attention",
+    'Air': "Without Air, clarity and honest communication are missing; talk things through before deciding",
+    'Earth': "Without Earth, grounding or commitment is absent; plans risk staying ideas until made concrete",
+}
+INTERPLAY = {
+    frozenset(('Fire', 'Air')): "Fire and Air feed each other, so ideas quickly turn into action",
+    frozenset(('Water', 'Earth')): "Water and Earth nourish each other, favouring steady emotional security",
+    frozenset(('Fire', 'Water')): "Fire and Water pull against each other, a tension between what you want and what you feel",
+    frozenset(('Air', 'Earth')): "Air and Earth rub against each other, a gap between plans and what is practical",
+    frozenset(('Fire', 'Earth')): "Fire and Earth together can turn passion into lasting results if patience keeps up",
+    frozenset(('Water', 'Air')): "Water and Air together ask you to balance heart and head",
+}
+BALANCED = "All four elements are present, a well-rounded situation in which no single force dominates"
+
+
+def _join(words: list[str]) -> str:
+    return " and ".join(words) if len(words) < 3 else f"{', '.join(words[:-1])} and {words[-1]}"
+
+def element_counts(drawn_cards) -> dict[str, int]:
+    counts = Counter(parse_card(card).card.element for card in drawn_cards)
+    return {element: counts.get(element, 0) for element in ELEMENTS}
+
+def elemental_balance(drawn_cards) -> dict:
+    """ Element counts with the dominant (strictly most frequent) and missing elements. """
+    counts = element_counts(drawn_cards)
+    top = max(counts.values())
+    leaders = [element for element, count in counts.items() if count == top]
+    return {
+        'counts': counts,
+        'dominant': leaders[0] if len(leaders) == 1 and top > 1 else None,
+        'missing': [element for element, count in counts.items() if not count],
+    }
+
+def elemental_summary(drawn_cards) -> str:
+    """ One compact line, e.g. for other agents' prompts. """
+    balance = elemental_balance(drawn_cards)
+    counts = ", ".join(f"{element} {count}" for element, count in balance['counts'].items())
+    parts = [f"Elements: {counts}"]
+    if balance['dominant']:
+        parts.append(f"{balance['dominant']} dominant")
+    if balance['missing']:
+        parts.append(f"{_join(balance['missing'])} missing")
+    return "; ".join(parts)
+
+def elemental_reading(drawn_cards, positions=None, question: str | None = None) -> str:
+    """ A few sentences on the elemental balance of a spread, rendered from the phrase bank. """
+    drawn = [parse_card(card) for card in drawn_cards]
+    positions = positions or [None] * len(drawn)
+    balance = elemental_balance(drawn)
+    seed = sum(card.id for card in drawn)
+
+    present = [element for element, count in balance['counts'].items() if count]
+    named = _join([f"{element} ({SUIT_OF_ELEMENT[element]})" for element in present])
+    sentences = [f"{named} {'is' if len(present) == 1 else 'are'} present in this spread"]
+
+    if balance['dominant']:
+        sentences.append(DOMINANT[balance['dominant']].format(element=balance['dominant']))
+    if len(balance['missing']) == 0:
+        sentences.append(BALANCED)
+
+    for i, (position, card) in enumerate(zip(positions, drawn)):
+        element = card.card.element
+        theme = THEMES[element][(seed + i) % len(THEMES[element])]
+        where = f"in the {position} position" if position else "here"
+        state = f", {REVERSED[(seed + i) % len(REVERSED)]}" if card.reversed else ""
+        sentences.append(f"{card.card.name} {where} brings {element}: {theme}{state}")
+
+    if 1 < len(present) < 4:
+        # The pair involving the dominant element says the most about the spread
+        pairs = [pair for pair in INTERPLAY if pair <= set(present)]
+        pairs.sort(key=lambda pair: balance['dominant'] not in pair)
+        sentences.append(INTERPLAY[pairs[0]])
+
+    for element in balance['missing']:
+        sentences.append(MISSING[element])
+
+    if question and (focus := balance['dominant'] or (present[0] if len(present) == 1 else None)):
+        sentences.append(f"For your question, lean on {THEMES[focus][seed % len(THEMES[focus])]}")
+    return ". ".join(sentences) + "."
@@ -0,0 +1,80 @@
+"""
+src/tarot/numerology.py
+
+The numerology patterns of a spread, computed from the card registry instead of by the model: card numbers
+and their digit roots, repeated numbers, consecutive runs, palindromes, the spread's sum and quintessence,
+and Major/Minor/court counts. `NumerologyAnalyst` receives them as facts and only writes the interpretation.
+
+Numbers: Major Arcana 0-21, pips Ace (1) ... Ten (10), and courts Page 11, Knight 12, Queen 13, King 14.
+"""
+
+from collections import Counter
+
+from src.tarot.cards import DECK, parse_card
+
+# Runs shorter than this are too common to call a sequence
+MIN_SEQUENCE = 3
+
+def digit_root(number: int) -> int:
+    """ Repeated digit sum down to one digit (0 stays 0). """
+    return 0 if number == 0 else 1 + (number - 1) % 9
+
+def quintessence(total: int) -> int:
+    """ Spread sum reduced by digit sums until it names a Major Arcana card (0-21). """
+    while total > 21:
+        total = sum(int(digit) for digit in str(total))
+    return total
+
+def _runs(numbers: list[int]) -> list[list[int]]:
+    """ Maximal runs of consecutive values among the distinct numbers. """
+    runs: list[list[int]] = []
+    for number in sorted(set(numbers)):
+        if runs and number == runs[-1][-1] + 1:
+            runs[-1].append(number)
+        else:
+            runs.append([number])
+    return [run for run in runs if len(run) >= MIN_SEQUENCE]
+
+def numerology(drawn_cards, positions=None) -> dict:
+    """ Exact numerology facts of a spread (cards as names, IDs or parsed). """
+    drawn = [parse_card(card) for card in drawn_cards]
+    positions = positions or [None] * len(drawn)
+    numbers = [card.card.number for card in drawn]
+    digits = "".join(str(number) for number in numbers)
+    total = sum(numbers)
+
+    return {
+        'cards': [
+            {'position': position, 'card': str(card), 'number': card.card.number, 'root': digit_root(card.card.number)}
+            for position, card in zip(positions, drawn)
+        ],
+        'repeats': {number: count for number, count in Counter(numbers).items() if count > 1},
+        'root_repeats': {root: count for root, count in Counter(map(digit_root, numbers)).items() if count > 1},
+        'sequences': _runs(numbers),
+        'palindrome': len(numbers) > 1 and len(digits) > 1 and digits == digits[::-1],
+        'total': total,
+        'root': digit_root(total),
+        'quintessence': {'number': quintessence(total), 'card': DECK[quintessence(total)].name},
+        'major': sum(card.card.is_major for card in drawn),
+        'minor': sum(not card.card.is_major for card in drawn),
+        'courts': sum(card.card.is_court for card in drawn),
+        'reversed': sum(card.reversed for card in drawn),
+    }
+
+def numerology_facts(facts: dict) -> str:
+    """ Compact prompt lines for `numerology` facts. """
+    def counts(repeats: dict) -> str:
+        return ", ".join(f"{number} x{count}" for number, count in repeats.items()) or "none"
+
+    cards = ", ".join(
+        f"{card['position'] + ': ' if card['position'] else ''}{card['card']} = {card['number']}" for card in facts['cards']
+    )
+    sequences = ", ".join("-".join(map(str, run)) for run in facts['sequences']) or "none"
+    quintessence = facts['quintessence']
+    return "\n".join((
+        f"Card numbers: {cards}",
+        f"Repeated numbers: {counts(facts['repeats'])}; repeated digit roots: {counts(facts['root_repeats'])}",
+        f"Sequences: {sequences}; palindrome: {'yes' if facts['palindrome'] else 'no'}",
+        f"Sum: {facts['total']} (digit root {facts['root']}); quintessence: {quintessence['number']} {quintessence['card']}",
+        f"Arcana: {facts['major']} Major, {facts['minor']} Minor ({facts['courts']} court); {facts['reversed']} reversed",
+    ))
@@ -0,0 +1,142 @@
+"""
+src/tarot/rarity.py
+
+How unusual a spread is, exactly: probabilities of drawing (without replacement from the 78-card deck) at
+least as many court cards, Major Arcana, cards of the dominant suit, or copies of the most repeated number.
+
+Court and Major Arcana counts are hypergeometric. The dominant suit and the most repeated number are
+maxima over card groups, so their distributions come from multivariate counts: the number of spreads whose
+largest group has at most `m` cards is the `x^n` coefficient of a product of truncated group polynomials.
+All counting is done in exact integers once per spread size; tables for every reading mode size are built at
+import, so a lookup is a tuple index and nothing is simulated per request.
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+from math import comb
+
+from src.tarot.cards import DECK, SUITS, Card, parse_card
+from utils.handler import TAROT_READING_MODE
+
+PATTERNS = ('courts', 'major_arcana', 'dominant_suit', 'repeated_number')
+
+# Facts below this chance of "at least as many" are worth mentioning in prompts
+RARE_THRESHOLD = 0.25
+
+def _group_sizes(key) -> list[int]:
+    sizes: dict = {}
+    for card in DECK:
+        if (group := key(card)) is not None:
+            sizes[group] = sizes.get(group, 0) + 1
+    return list(sizes.values())
+
+# Majors belong to no suit: they are drawn freely when counting the dominant suit
+SUIT_GROUPS = _group_sizes(lambda card: card.suit)
+NUMBER_GROUPS = _group_sizes(lambda card: card.number)
+
+def _multiply(a: list[int], b: list[int], degree: int) -> list[int]:
+    out = [0] * (degree + 1)
+    for i, x in enumerate(a):
+        if x:
+            for j, y in enumerate(b[:degree + 1 - i]):
+                out[i + j] += x * y
+    return out
+
+def _spreads_with_max(groups: list[int], size: int, limit: int) -> int:
+    """ Spreads of `size` cards with at most `limit` cards from any one group; cards outside the groups are free. """
+    free = len(DECK) - sum(groups)
+    poly = [comb(free, j) for j in range(min(free, size) + 1)]
+    for group in groups:
+        poly = _multiply(poly, [comb(group, j) for j in range(min(group, limit) + 1)], size)
+    return poly[size] if size < len(poly) else 0
+
+def _max_distribution(groups: list[int], size: int) -> list[int]:
+    cumulative = [_spreads_with_max(groups, size, limit) for limit in range(size + 1)]
+    return [cumulative[0]] + [cumulative[m] - cumulative[m - 1] for m in range(1, size + 1)]
+
+def _hypergeometric(successes: int, size: int) -> list[int]:
+    return [comb(successes, k) * comb(len(DECK) - successes, size - k) for k in range(size + 1)]
+
+
+@dataclass(frozen=True, slots=True)
+class Distribution:
+    """ Exact distribution of one pattern's count for one spread size. """
+    pmf: tuple[float, ...]
+    at_least: tuple[float, ...]
+    below: tuple[float, ...]
+
+    @classmethod
+    def from_counts(cls, counts: list[int]) -> 'Distribution':
+        total = sum(counts)
+        at_least = [sum(counts[k:]) / total for k in range(len(counts))]
+        return cls(
+            pmf=tuple(count / total for count in counts),
+            at_least=tuple(at_least),
+            below=tuple(1.0 - tail for tail in at_least),
+        )
+
+    def describe(self, count: int) -> dict:
+        return {
+            'count': count,
+            'probability': round(self.pmf[count], 6),
+            'at_least': round(self.at_least[count], 6),
+            'percentile': round(100 * self.below[count], 2),
+        }
+
+
+@lru_cache(maxsize=None)
+def rarity_table(size: int) -> dict[str, Distribution]:
+    """ Distributions of every pattern for spreads of `size` cards. """
+    if not 0 < size <= len(DECK):
+        raise ValueError(f"Spread size must be between 1 and {len(DECK)}, got {size}.")
+    return {
+        'courts': Distribution.from_counts(_hypergeometric(sum(card.is_court for card in DECK), size)),
+        'major_arcana': Distribution.from_counts(_hypergeometric(sum(card.is_major for card in DECK), size)),
+        'dominant_suit': Distribution.from_counts(_max_distribution(SUIT_GROUPS, size)),
+        'repeated_number': Distribution.from_counts(_max_distribution(NUMBER_GROUPS, size)),
+    }
+
+# Every reading mode size is ready before the first request
+for _size in sorted({mode['num'] for mode in TAROT_READING_MODE.values()}):
+    rarity_table(_size)
+
+def spread_rarity(drawn_cards) -> dict:
+    """ Count, exact probability, chance of at least as many and percentile of each pattern in a spread. """
+    cards = [parse_card(drawn).card for drawn in drawn_cards]
+    table = rarity_table(len(cards))
+
+    suits = {suit: 0 for suit in SUITS}
+    numbers: dict[int, int] = {}
+    for card in cards:
+        if card.suit:
+            suits[card.suit] += 1
+        numbers[card.number] = numbers.get(card.number, 0) + 1
+    suit = max(suits, key=suits.get)
+    number = max(numbers, key=numbers.get)
+
+    return {
+        'size': len(cards),
+        'courts': table['courts'].describe(sum(card.is_court for card in cards)),
+        'major_arcana': table['major_arcana'].describe(sum(card.is_major for card in cards)),
+        'dominant_suit': table['dominant_suit'].describe(suits[suit]) | {'suit': suit if suits[suit] else None},
+        'repeated_number': table['repeated_number'].describe(numbers[number]) | {'number': number if numbers[number] > 1 else None},
+    }
+
+def rarity_facts(rarity: dict, threshold: float = RARE_THRESHOLD) -> list[str]:
+    """ One short line per pattern rare enough to mention, rarest first. """
+    size = rarity['size']
+    facts = []
+    for pattern in PATTERNS:
+        fact = rarity[pattern]
+        if fact['count'] < 2 or fact['at_least'] > threshold:
+            continue
+        if pattern == 'courts':
+            what = f"{fact['count']} court cards"
+        elif pattern == 'major_arcana':
+            what = f"{fact['count']} Major Arcana"
+        elif pattern == 'dominant_suit':
+            what = f"{fact['count']} {fact['suit'].title()}"
+        else:
+            what = f"{fact['count']} cards of number {fact['number']}"
+        facts.append((fact['at_least'], f"{what} (only {100 * fact['at_least']:.1f}% of {size}-card spreads have as many)"))
+    return [text for _, text in sorted(facts)]
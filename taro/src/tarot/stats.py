@@ -0,0 +1,150 @@
+"""
+src/tarot/stats.py
+
+Spread statistics over a reading history in one vectorized pass.
+
+Readings are encoded once into flat NumPy arrays with one row per drawn card: registry ID, orientation, the
+reading it belongs to, its spread position, and that reading's time window. Card attributes (suit, court
+rank, arcana, element) are lookup tables indexed by card ID. Every distribution, trend and per-position
+frequency is then a `bincount` over a combined key instead of a Python loop per spread.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Iterable, Literal
+
+import numpy as np
+
+from src.tarot.cards import DECK, RANKS, SUITS, parse_card
+
+Window = Literal['day', 'week', 'month', 'year']
+
+ELEMENTS = ('Fire', 'Water', 'Air', 'Earth')
+COURTS = RANKS[10:]
+# Suit index 4 is the Major Arcana
+SUIT_LABELS = (*SUITS, 'major')
+
+# Card attribute tables, indexed by card ID
+SUIT_OF = np.array([SUITS.index(card.suit) if card.suit else len(SUITS) for card in DECK], dtype=np.int64)
+COURT_OF = np.array([COURTS.index(card.rank) if card.is_court else len(COURTS) for card in DECK], dtype=np.int64)
+ELEMENT_OF = np.array([ELEMENTS.index(card.element) for card in DECK], dtype=np.int64)
+MAJOR = SUIT_OF == len(SUITS)
+
+
+@dataclass(frozen=True, slots=True)
+class SpreadArrays:
+    """ A reading history, one entry per drawn card. `positions` indexes `position_labels`. """
+    cards: np.ndarray
+    reversed: np.ndarray
+    readings: np.ndarray
+    positions: np.ndarray
+    position_labels: tuple[str, ...]
+    timestamps: np.ndarray  # datetime64[s] UTC, one per reading
+
+    @property
+    def num_readings(self) -> int:
+        return len(self.timestamps)
+
+    @classmethod
+    def encode(cls, spreads: Iterable[tuple[datetime, list, list[str]]]) -> 'SpreadArrays':
+        """ Encodes `(timestamp, drawn cards, position labels)` per reading; cards may be names, IDs or parsed. """
+        cards, flipped, readings, positions, timestamps = [], [], [], [], []
+        labels: dict[str, int] = {}
+        for index, (timestamp, drawn_cards, position_labels) in enumerate(spreads):
+            timestamps.append(_utc(timestamp))
+            for card, label in zip(drawn_cards, position_labels):
+                drawn = parse_card(card)
+                cards.append(drawn.id)
+                flipped.append(drawn.reversed)
+                readings.append(index)
+                positions.append(labels.setdefault(label, len(labels)))
+        return cls(
+            cards=np.array(cards, dtype=np.int64),
+            reversed=np.array(flipped, dtype=bool),
+            readings=np.array(readings, dtype=np.int64),
+            positions=np.array(positions, dtype=np.int64),
+            position_labels=tuple(labels),
+            timestamps=np.array(timestamps, dtype='datetime64[s]'),
+        )
+
+
+def _utc(timestamp: datetime) -> datetime:
+    # numpy only takes naive datetimes; aware ones are compared as UTC
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+def window_index(timestamps: np.ndarray, window: Window) -> tuple[np.ndarray, list[str]]:
+    """ Window of each timestamp as an index into the sorted window labels (weeks start on Monday). """
+    days = timestamps.astype('datetime64[D]')
+    if window == 'week':
+        # Day 0 (1970-01-01) is a Thursday: shift so weeks are counted from Mondays
+        start = ((days.astype(np.int64) + 3) // 7) * 7 - 3
+        periods = start.astype('datetime64[D]')
+    else:
+        periods = days.astype({'day': 'datetime64[D]', 'month': 'datetime64[M]', 'year': 'datetime64[Y]'}[window])
+    unique, inverse = np.unique(periods, return_inverse=True)
+    return inverse, [str(period) for period in unique]
+
+def _shares(counts: np.ndarray, labels: Iterable[str], total: int) -> dict[str, float]:
+    return {label: round(float(count) / total, 4) if total else 0.0 for label, count in zip(labels, counts)}
+
+def _grouped(groups: np.ndarray, values: np.ndarray, num_groups: int, num_values: int) -> np.ndarray:
+    """ Counts of each value per group, shape (num_groups, num_values). """
+    return np.bincount(groups * num_values + values, minlength=num_groups * num_values).reshape(num_groups, num_values)
+
+def history_stats(spreads: SpreadArrays, window: Window = 'month', top: int = 3) -> dict:
+    """ Suit, court, arcana, element and reversal distributions, their trend per time window, and the most
+    frequent cards overall and per spread position. """
+    total = len(spreads.cards)
+    suits = SUIT_OF[spreads.cards]
+    courts = COURT_OF[spreads.cards]
+    elements = ELEMENT_OF[spreads.cards]
+    major = int(MAJOR[spreads.cards].sum())
+
+    stats = {
+        'readings': spreads.num_readings,
+        'cards': total,
+        'suits': _shares(np.bincount(suits, minlength=len(SUIT_LABELS)), SUIT_LABELS, total),
+        'courts': _shares(np.bincount(courts, minlength=len(COURTS) + 1)[:len(COURTS)], COURTS, total),
+        'arcana': _shares((major, total - major), ('major', 'minor'), total),
+        'elements': _shares(np.bincount(elements, minlength=len(ELEMENTS)), ELEMENTS, total),
+        'reversed': round(float(spreads.reversed.sum()) / total, 4) if total else 0.0,
+        'top_cards': _top(np.bincount(spreads.cards, minlength=len(DECK)), top),
+        'positions': {},
+        'trends': [],
+    }
+    if not total:
+        return stats
+
+    card_counts = _grouped(spreads.positions, spreads.cards, len(spreads.position_labels), len(DECK))
+    stats['positions'] = {label: _top(counts, top) for label, counts in zip(spreads.position_labels, card_counts)}
+
+    reading_windows, labels = window_index(spreads.timestamps, window)
+    windows = reading_windows[spreads.readings]
+    num_windows = len(labels)
+    window_cards = np.bincount(windows, minlength=num_windows)
+    window_readings = np.bincount(reading_windows, minlength=num_windows)
+    window_suits = _grouped(windows, suits, num_windows, len(SUIT_LABELS))
+    window_elements = _grouped(windows, elements, num_windows, len(ELEMENTS))
+    window_courts = np.bincount(windows, weights=courts < len(COURTS), minlength=num_windows)
+    window_reversed = np.bincount(windows, weights=spreads.reversed, minlength=num_windows)
+
+    for i, label in enumerate(labels):
+        cards = int(window_cards[i])
+        stats['trends'].append({
+            'window': label,
+            'readings': int(window_readings[i]),
+            'cards': cards,
+            'suits': _shares(window_suits[i], SUIT_LABELS, cards),
+            'elements': _shares(window_elements[i], ELEMENTS, cards),
+            'courts': round(float(window_courts[i]) / cards, 4) if cards else 0.0,
+            'reversed': round(float(window_reversed[i]) / cards, 4) if cards else 0.0,
+        })
+    return stats
+
+def _top(counts: np.ndarray, top: int) -> list[dict]:
+    if top <= 0:
+        return []
+    ids = np.argsort(-counts, kind='stable')[:top]
+    return [{'id': int(i), 'card': DECK[i].name, 'count': int(counts[i])} for i in ids if counts[i]]
@@ -0,0 +1,227 @@
+"""
+utils/cache.py
+
+Two-tier (memory LRU + optional SQLite) key/value cache for deterministic, JSON-serializable results.
+"""
+
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from utils.woodpecker import setup_logger
+
+logger = setup_logger(__name__)
+
+def make_key(*parts) -> str:
+    """ Stable digest of any JSON-serializable parts (dict keys sorted). """
+    payload = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class TieredCache:
+    """
+    In-memory LRU bounded by entry count, total bytes and TTL, backed by an optional on-disk SQLite tier
+    that survives restarts. Disk hits are promoted back into memory.
+
+    The disk tier is bounded too: expired rows are purged when the cache opens and every `PRUNE_EVERY`
+    writes, along with the oldest rows beyond `max_disk_entries` / `max_disk_bytes`. Async code uses
+    `aget` / `aset`, which only leave the event loop for the SQLite tier.
+    """
+
+    # Disk writes between two purges of expired and over-cap rows
+    PRUNE_EVERY = 256
+
+    def __init__(
+        self,
+        namespace: str,
+        max_entries: int = 1024,
+        max_bytes: int = 16 * 1024 * 1024,
+        ttl: float | None = None,
+        path: str | None = None,
+        max_disk_entries: int = 100_000,
+        max_disk_bytes: int = 256 * 1024 * 1024,
+    ):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl or None
+        self.max_disk_entries = max_disk_entries
+        self.max_disk_bytes = max_disk_bytes
+
+        self._lock = threading.Lock()
+        self._memory: OrderedDict[str, tuple[float | None, int, object]] = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._db: sqlite3.Connection | None = None
+        # Serializes the connection; held by the disk tier only, so memory hits never wait on SQLite
+        self._db_lock = threading.Lock()
+        self._executor: ThreadPoolExecutor | None = None
+        self._writes = 0
+        self.pruned = 0
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, expires_at REAL, "
+                "PRIMARY KEY (namespace, key))"
+            )
+            # Added after the first schema: files created before them are migrated on open
+            columns = {row[1] for row in self._db.execute("PRAGMA table_info(cache)")}
+            for name in ('stored_at', 'size'):
+                if name not in columns:
+                    self._db.execute(f"ALTER TABLE cache ADD COLUMN {name} {'REAL' if name == 'stored_at' else 'INTEGER'}")
+            self._db.execute("CREATE INDEX IF NOT EXISTS cache_age ON cache (namespace, stored_at)")
+            self._db.commit()
+            self.prune()
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f'cache-{namespace}')
+
+    def get(self, key: str):
+        """ Returns the cached value or None. """
+        if (value := self._memory_get(key)) is not None:
+            return value
+        return self._disk_get(key)
+
+    async def aget(self, key: str):
+        """ Awaitable `get`: memory hits are answered on the event loop, disk lookups in the cache's thread. """
+        if (value := self._memory_get(key)) is not None:
+            return value
+        if self._db is None:
+            return self._disk_get(key)  # counts the miss
+        return await self._off_loop(self._disk_get, key)
+
+    def set(self, key: str, value) -> None:
+        """ Stores a JSON-serializable value in both tiers. """
+        encoded, expires_at = self._store(key, value)
+        self._persist(key, encoded, expires_at)
+
+    async def aset(self, key: str, value) -> None:
+        """ Awaitable `set`: the SQLite write runs in the cache's thread. """
+        encoded, expires_at = self._store(key, value)
+        if self._db is not None:
+            await self._off_loop(self._persist, key, encoded, expires_at)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._bytes = 0
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute("DELETE FROM cache WHERE namespace = ?", (self.namespace,))
+                self._db.commit()
+
+    def prune(self) -> int:
+        """ Deletes this namespace's expired disk rows and the oldest ones beyond the disk caps; returns the rows deleted. """
+        if self._db is None:
+            return 0
+        with self._db_lock:
+            try:
+                deleted = self._db.execute(
+                    "DELETE FROM cache WHERE namespace = ? AND expires_at <= ?", (self.namespace, time.time())
+                ).rowcount
+                # Rows written before `stored_at` existed sort as the oldest
+                deleted += self._db.execute(
+                    "DELETE FROM cache WHERE rowid IN (SELECT rowid FROM ("
+                    "SELECT rowid, ROW_NUMBER() OVER newest AS n, SUM(COALESCE(size, LENGTH(value))) OVER newest AS total "
+                    "FROM cache WHERE namespace = ? WINDOW newest AS (ORDER BY stored_at DESC)"
+                    ") WHERE n > ? OR total > ?)",
+                    (self.namespace, self.max_disk_entries, self.max_disk_bytes),
+                ).rowcount
+                self._db.commit()
+            except sqlite3.Error:
+                logger.warning("Failed to prune the %s cache.", self.namespace, exc_info=True)
+                return 0
+        if deleted:
+            self.pruned += deleted
+            logger.info("Pruned %d %s cache rows.", deleted, self.namespace)
+        return deleted
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'entries': len(self._memory),
+                'bytes': self._bytes,
+                'pruned': self.pruned,
+            }
+
+    def _memory_get(self, key: str):
+        now = time.time()
+        with self._lock:
+            if entry := self._memory.get(key):
+                expires_at, _, value = entry
+                if expires_at is None or expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._evict(key)
+        return None
+
+    def _disk_get(self, key: str):
+        row = None
+        if self._db is not None:
+            with self._db_lock:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?",
+                    (self.namespace, key),
+                ).fetchone()
+        with self._lock:
+            if row and (row[1] is None or row[1] > time.time()):
+                value = json.loads(row[0])
+                self._remember(key, value, row[0], row[1])
+                self.disk_hits += 1
+                return value
+            self.misses += 1
+            return None
+
+    def _store(self, key: str, value) -> tuple[str, float | None]:
+        encoded = json.dumps(value, ensure_ascii=False)
+        expires_at = time.time() + self.ttl if self.ttl else None
+        with self._lock:
+            self._remember(key, value, encoded, expires_at)
+        return encoded, expires_at
+
+    def _persist(self, key: str, encoded: str, expires_at: float | None) -> None:
+        if self._db is None:
+            return
+        with self._db_lock:
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at, stored_at, size) VALUES (?, ?, ?, ?, ?, ?)",
+                    (self.namespace, key, encoded, expires_at, time.time(), len(encoded.encode('utf-8'))),
+                )
+                self._db.commit()
+            except sqlite3.Error:
+                logger.warning("Failed to persist %s cache entry.", self.namespace, exc_info=True)
+                return
+            self._writes += 1
+        if self._writes % self.PRUNE_EVERY == 0:
+            self.prune()
+
+    async def _off_loop(self, method, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, partial(method, *args))
+
+    def _remember(self, key: str, value, encoded: str, expires_at: float | None):
+        size = len(encoded.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        if key in self._memory:
+            self._evict(key)
+        self._memory[key] = (expires_at, size, value)
+        self._bytes += size
+        while len(self._memory) > self.max_entries or self._bytes > self.max_bytes:
+            self._evict(next(iter(self._memory)))
+
+    def _evict(self, key: str):
+        _, size, _ = self._memory.pop(key)
+        self._bytes -= size
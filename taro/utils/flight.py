@@ -0,0 +1,121 @@
+"""
+utils/flight.py
+
+Single-flight coalescing: concurrent calls sharing a key wait on one in-flight execution
+instead of each running it.
+"""
+
+import asyncio
+import threading
+
+from utils.cache import TieredCache
+from utils.woodpecker import IdempotencyKeyMismatch
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._calls: dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.shared = 0
+
+    async def do(self, key: str, factory):
+        """
+        Awaits `factory()` once per key. The work runs in its own task, so a cancelled caller
+        (e.g. a client disconnect) does not cancel it for the other waiters.
+        """
+        if task := self._tasks.get(key):
+            self.shared += 1
+        else:
+            self.leaders += 1
+            task = asyncio.ensure_future(factory())
+            self._tasks[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: asyncio.Task):
+        self._tasks.pop(key, None)
+        if not task.cancelled():
+            # Marks the exception as retrieved when every waiter has gone away
+            task.exception()
+
+    def do_sync(self, key: str, fn):
+        """ Thread-based `do` for the synchronous pipeline. """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def stats(self) -> dict:
+        return {
+            'in_flight': len(self._tasks) + len(self._calls),
+            'leaders': self.leaders,
+            'shared': self.shared,
+        }
+
+
+class IdempotencyStore:
+    """
+    Dedupes client retries carrying the same `Idempotency-Key`: in-flight retries share the call, later ones replay its
+    result. A key reused with a different request `fingerprint` raises `IdempotencyKeyMismatch` instead of replaying.
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 4096):
+        self._flight = SingleFlight()
+        self._results = TieredCache('idempotency', max_entries=max_entries, ttl=ttl)
+        self._pending: dict[str, str | None] = {}
+
+    async def run(self, key: str, factory, fingerprint: str | None = None):
+        if (entry := self._results.get(key)) is not None:
+            self._check(entry['fingerprint'], fingerprint)
+            return entry['result']
+        if key in self._pending:
+            self._check(self._pending[key], fingerprint)
+        else:
+            self._pending[key] = fingerprint
+
+        async def call():
+            try:
+                result = await factory()
+                self._results.set(key, {'fingerprint': fingerprint, 'result': result})
+                return result
+            finally:
+                self._pending.pop(key, None)
+
+        return await self._flight.do(key, call)
+
+    @staticmethod
+    def _check(stored: str | None, fingerprint: str | None):
+        if stored != fingerprint:
+            raise IdempotencyKeyMismatch()
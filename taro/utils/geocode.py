@@ -0,0 +1,231 @@
+"""
+utils/geocode.py
+
+Offline geocoding of birth places.
+
+Places resolve against an in-process gazetteer built once from the tz database's zone coordinates
+(`zone1970.tab` / `zone.tab`, plus the backward-compatible links in `tzdata.zi`) and the bundled
+`config/cities.csv`, so an IANA zone such as `Australia/Sydney`, its city (`Sydney`) or a listed
+`City, Country` never leaves the process. Network geocoding (Nominatim) is an opt-in fallback whose
+answers, found or not, are cached. Async code uses `aget_lat_lon`, which runs the network lookup in a
+thread and waits for its rate-limit slot without blocking the event loop.
+"""
+
+import asyncio
+import csv
+import threading
+import time
+import unicodedata
+import zoneinfo
+from functools import cache, lru_cache
+from importlib import resources
+from pathlib import Path
+
+from utils.cache import TieredCache
+from utils.flight import SingleFlight
+from utils.settings import resolve_path, setting
+from utils.woodpecker import setup_logger
+
+logger = setup_logger(__name__)
+
+CITIES_PATH = Path(__file__).resolve().parent.parent / 'config' / 'cities.csv'
+ZONE_TABLES = ('zone1970.tab', 'zone.tab')
+
+# Nominatim's usage policy: at most one request per second
+FALLBACK_INTERVAL = 1.0
+
+def normalize(place: str) -> str:
+    """ Case, accent, underscore and whitespace insensitive form used as the gazetteer key. """
+    text = unicodedata.normalize('NFKD', place).encode('ascii', 'ignore').decode('ascii')
+    return " ".join(text.replace('_', ' ').casefold().split())
+
+def parse_iso6709(coordinates: str) -> tuple[float, float]:
+    """ Parses the tz tables' `±DDMM[SS]±DDDMM[SS]` coordinates into decimal (lat, lon). """
+    split = max(coordinates.rfind('+'), coordinates.rfind('-'))
+    return _degrees(coordinates[:split], 2), _degrees(coordinates[split:], 3)
+
+def _degrees(value: str, width: int) -> float:
+    sign = -1.0 if value[0] == '-' else 1.0
+    digits = value[1:]
+    degrees = int(digits[:width])
+    minutes = int(digits[width:width + 2])
+    seconds = int(digits[width + 2:] or 0)
+    return sign * (degrees + minutes / 60 + seconds / 3600)
+
+def _tz_file(name: str) -> str | None:
+    """ Reads a tz database file from the system TZPATH, falling back to the `tzdata` package. """
+    for root in zoneinfo.TZPATH:
+        if (path := Path(root) / name).is_file():
+            return path.read_text(encoding='utf-8')
+    try:
+        return resources.files('tzdata').joinpath('zoneinfo', name).read_text(encoding='utf-8')
+    except (ModuleNotFoundError, FileNotFoundError):
+        return None
+
+
+class Gazetteer:
+    """ Normalized place name -> (latitude, longitude). """
+
+    def __init__(self, places: dict[str, tuple[float, float]] | None = None):
+        self.places: dict[str, tuple[float, float]] = places or {}
+
+    def __len__(self) -> int:
+        return len(self.places)
+
+    def add(self, name: str, coordinates: tuple[float, float]) -> None:
+        # First source wins: bundled cities are loaded before zone-derived city names
+        self.places.setdefault(normalize(name), coordinates)
+
+    def add_zone(self, zone: str, coordinates: tuple[float, float]) -> None:
+        self.add(zone, coordinates)
+        # `America/Argentina/Buenos_Aires` is also found as `Buenos Aires`
+        if '/' in zone and not zone.startswith('Etc/'):
+            self.add(zone.rsplit('/', 1)[1], coordinates)
+
+    def lookup(self, place: str) -> tuple[float, float] | None:
+        """ Exact key first, then the leading part of `City, Region, Country`. """
+        key = normalize(place)
+        if (found := self.places.get(key)) is not None:
+            return found
+        if ',' in key:
+            return self.places.get(key.split(',', 1)[0].strip())
+        return None
+
+    @classmethod
+    def load(cls, cities_path: Path = CITIES_PATH) -> 'Gazetteer':
+        gazetteer = cls()
+
+        if cities_path.is_file():
+            with open(cities_path, newline='', encoding='utf-8') as file:
+                for row in csv.DictReader(file):
+                    coordinates = (float(row['latitude']), float(row['longitude']))
+                    gazetteer.add(row['city'], coordinates)
+                    gazetteer.add(f"{row['city']}, {row['country']}", coordinates)
+                    gazetteer.add(f"{row['city']}, {row['country_code']}", coordinates)
+
+        for table in ZONE_TABLES:
+            for line in (_tz_file(table) or '').splitlines():
+                if line.startswith('#') or not line.strip():
+                    continue
+                fields = line.split('\t')
+                gazetteer.add_zone(fields[2], parse_iso6709(fields[1]))
+
+        # Backward-compatible names (`US/Eastern`, `Asia/Calcutta`, ...) share their target's coordinates
+        for line in (_tz_file('tzdata.zi') or '').splitlines():
+            if line.startswith('L '):
+                _, target, link = line.split()
+                if (coordinates := gazetteer.places.get(normalize(target))) is not None:
+                    gazetteer.add_zone(link, coordinates)
+
+        if not gazetteer:
+            logger.warning("Gazetteer is empty: no tz zone tables or city table found.")
+        return gazetteer
+
+
+class NominatimFallback:
+    """ Rate-limited Nominatim geocoding with positive and negative results cached. """
+
+    def __init__(self, user_agent: str, path: str | None = None, ttl: float | None = None):
+        self.user_agent = user_agent
+        self.cache = TieredCache('geocode', max_entries=4096, ttl=ttl, path=path)
+        self._geolocator = None
+        self._lock = threading.Lock()
+        self._next = 0.0
+        # Concurrent async lookups of the same place share one request
+        self._flight = SingleFlight()
+
+    def lookup(self, place: str) -> tuple[float, float] | None:
+        key = normalize(place)
+        if (cached := self.cache.get(key)) is not None:
+            return tuple(cached) or None
+        time.sleep(self._reserve())
+        return self._geocode(key, place)
+
+    async def alookup(self, place: str) -> tuple[float, float] | None:
+        """ Awaitable `lookup`: waits for its request slot on the event loop and geocodes in a thread. """
+        key = normalize(place)
+        if (cached := await self.cache.aget(key)) is not None:
+            return tuple(cached) or None
+
+        async def geocode():
+            await asyncio.sleep(self._reserve())
+            return await asyncio.to_thread(self._geocode, key, place)
+
+        return await self._flight.do(key, geocode)
+
+    def _reserve(self) -> float:
+        """ Books the next request slot, FALLBACK_INTERVAL after the previous one; returns the seconds to wait. """
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + FALLBACK_INTERVAL
+        return start - now
+
+    def _geocode(self, key: str, place: str) -> tuple[float, float] | None:
+        with self._lock:
+            if self._geolocator is None:
+                from geopy.geocoders import Nominatim
+                self._geolocator = Nominatim(user_agent=self.user_agent)
+        location = self._geolocator.geocode(place)
+        found = (location.latitude, location.longitude) if location else None
+        self.cache.set(key, list(found or ()))
+        return found
+
+
+@cache
+def gazetteer() -> Gazetteer:
+    """ Process-wide gazetteer, built on first use. """
+    return Gazetteer.load()
+
+@cache
+def fallback() -> NominatimFallback | None:
+    if not setting.geocode.fallback:
+        return None
+    return NominatimFallback(
+        user_agent=setting.geocode.user_agent,
+        path=resolve_path(setting.cache.path),
+        ttl=setting.geocode.fallback_ttl,
+    )
+
+@lru_cache(maxsize=4096)
+def get_lat_lon(place: str) -> tuple[float, float]:
+    """ Gets Latitude and Longitude """
+    if (found := gazetteer().lookup(place)) is not None:
+        return found
+
+    if (geocoder := fallback()) is not None:
+        try:
+            found = geocoder.lookup(place)
+        except Exception:
+            logger.warning("Geocoding fallback failed for a birth place.", exc_info=True)
+        if found is not None:
+            return found
+
+    raise ValueError(f"Could not geocode location: {place}")
+
+async def aget_lat_lon(place: str) -> tuple[float, float]:
+    """ Awaitable `get_lat_lon`; only the network fallback (and the gazetteer's first build) leave the event loop. """
+    if not gazetteer.cache_info().currsize:
+        await asyncio.to_thread(gazetteer)
+    if (found := gazetteer().lookup(place)) is not None:
+        return found
+
+    if (geocoder := fallback()) is not None:
+        try:
+            found = await geocoder.alookup(place)
+        except Exception:
+            logger.warning("Geocoding fallback failed for a birth place.", exc_info=True)
+        if found is not None:
+            return found
+
+    raise ValueError(f"Could not geocode location: {place}")
+
+def stats() -> dict:
+    info = get_lat_lon.cache_info()
+    return {
+        'places': len(gazetteer()),
+        'hits': info.hits,
+        'misses': info.misses,
+        'entries': info.currsize,
+        'fallback': fallback().cache.stats() if fallback() else None,
+    }
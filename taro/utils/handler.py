@@ -10,12 +10,11 @@ AfterValidator – Post-processing or fixing values: when you want to modify or
 
 
 from collections import namedtuple
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
 from typing import Annotated
 
-from geopy.geocoders import Nominatim
 from pydantic.functional_validators import BeforeValidator
 import yaml
 
@@ -51,6 +50,19 @@ Please ensure that your response align with given response format below:
 {example_output}
 """
 
+ACTION_PROMPT_V3 = """{action_prompt}
+
+Please ensure that your response align with given response format below:
+
+### Response Format
+{response_format}
+"""
+
+# Example shortening levels used by the prompt budgeter, from longest to shortest
+EXAMPLE_LEVELS = ('full', 'short', 'none')
+# Lines kept from the example response at the 'short' level
+SHORT_EXAMPLE_LINES = 6
+
 DEFAULT_DATE_FORMAT = "%d-%m-%Y"
 DEFAULT_TIME_FORMAT = "%H:%M"
 
@@ -136,15 +148,6 @@ def parse_timestamp(input_time: str | datetime) -> datetime | None:
     elif isinstance(input_time, datetime):
         return input_time
 
-def get_lat_lon(place: str):
-    """ Gets Latitude and Longitude"""
-    geolocator = Nominatim(user_agent="astro-app")
-    location = geolocator.geocode(place)
-    if location:
-        return location.latitude, location.longitude # type: ignore
-    else:
-        raise ValueError(f"Could not geocode location: {place}")
-
 def fetch_reading_mode(reading_mode: str) -> ReadingModeParser:
     reading_mode = reading_mode.strip().lower()
     if mode := TAROT_READING_MODE.get(reading_mode, None):
@@ -176,33 +179,60 @@ class TaroAction:
     example: dict
     input_template: str
     response_format: str | None = None
+    # System prompts rendered once at load, per example level
+    _rendered: dict[str, str] = field(default_factory=dict, init=False, repr=False)
+
+    def __post_init__(self):
+        self._rendered = {level: self._render(level) for level in EXAMPLE_LEVELS}
 
     @property
     def system_prompt(self):
         """ Returns prompt for this Action in System prompt WITHOUT users input """
+        return self._rendered['full']
+
+    def system_prompt_for(self, example: str = 'full') -> str:
+        """ System prompt with the full example, a shortened example response ('short') or no example ('none'). """
+        return self._rendered[example]
+
+    def _render(self, example: str) -> str:
+        if example == 'none':
+            if self.response_format:
+                return ACTION_PROMPT_V3.format(action_prompt=self.prompt, response_format=self.response_format)
+            return self.prompt
+
+        example_output = self.example.get('response', None)
+        if example == 'short' and example_output:
+            lines = [line for line in example_output.splitlines() if line.strip()]
+            if len(lines) > SHORT_EXAMPLE_LINES:
+                example_output = "\n".join(lines[:SHORT_EXAMPLE_LINES] + ["..."])
+
         if self.response_format:
             return ACTION_PROMPT_V1.format(
                 action_prompt=self.prompt,
                 response_format=self.response_format,
                 example_input=self.example.get('user_input', None),
-                example_output=self.example.get('response', None)
+                example_output=example_output
             )
         return ACTION_PROMPT_V2.format(
                 action_prompt=self.prompt,
                 example_input=self.example.get('user_input', None),
-                example_output=self.example.get('response', None)
+                example_output=example_output
             )
 
+    def user_prompt(self, **kwargs) -> str:
+        """ Renders the users inputs into the action's input template. """
+        if user_input := self.input_template.format(**kwargs) if self.input_template else None:
+            return user_input
+        logger.error("Too many args for action; keys: %s", list(kwargs.keys()))
+        raise InvalidModelInputs(kwargs)
+
     def prepare_prompt(self, **kwargs):
         """
         Returns System Message with users inputs in chat formatted message to invoke LLM. Defaults to Llama 3.1 models' chatting template.
         """
-        if user_input := self.input_template.format(**kwargs) if self.input_template else None:
-            yield {"role": "system", "content": self.system_prompt}
-            yield {"role": "user", "content": user_input}
-        else:
-            logger.error("Too many args for action; keys: %s", list(kwargs.keys()))
-            raise InvalidModelInputs(kwargs)
+        user_input = self.user_prompt(**kwargs)
+        yield {"role": "system", "content": self.system_prompt}
+        yield {"role": "user", "content": user_input}
 
 @dataclass(slots=True)
 class TaroProfile:
@@ -233,8 +263,8 @@ class TaroProfile:
     def load_agent():
         """ Loads agents config profile. """
 
-        root_path = Path('.').resolve()
-        profile_path = root_path / 'templates' / 'agent.yaml'
+        root_path = Path(__file__).resolve().parent.parent
+        profile_path = root_path / 'config' / 'agent.yaml'
 
         if not profile_path.exists():
             raise FileNotFoundError(f"Taro profile YAML not found: {profile_path}")
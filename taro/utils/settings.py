@@ -3,11 +3,111 @@ utils/settings.py
 
 """
 
+import os
 from dataclasses import dataclass, field
+from pathlib import Path
+
+# Relative paths in the settings are taken from the service root, wherever the process was started
+ROOT_PATH = Path(__file__).resolve().parent.parent
+
+def resolve_path(path: str) -> str | None:
+    """ A path setting made absolute against `ROOT_PATH`; None when empty, SQLite's `:memory:` unchanged. """
+    if not path:
+        return None
+    return path if path == ':memory:' else str(ROOT_PATH / path)
 
 @dataclass(frozen=True)
 class AgentServer:
-    ollama: str = field(init=False, default_factory=os.getenv("LLM_SERVER_URL", "localhost:11413"))
+    ollama: str = field(init=False, default_factory=lambda: os.getenv("LLM_SERVER_URL", "localhost:11413"))
+    # Connection pool shared by every agent call (httpx limits)
+    max_connections: int = field(init=False, default_factory=lambda: int(os.getenv("OLLAMA_MAX_CONNECTIONS", "10")))
+    max_keepalive: int = field(init=False, default_factory=lambda: int(os.getenv("OLLAMA_MAX_KEEPALIVE", "5")))
+    keepalive_expiry: float = field(init=False, default_factory=lambda: float(os.getenv("OLLAMA_KEEPALIVE_EXPIRY", "60")))
+    timeout: float = field(init=False, default_factory=lambda: float(os.getenv("OLLAMA_TIMEOUT", "120")))
+    # Seconds between background model-presence checks
+    health_interval: float = field(init=False, default_factory=lambda: float(os.getenv("OLLAMA_HEALTH_INTERVAL", "30")))
+    # How long Ollama keeps the model (and its prompt cache) loaded after a request
+    keep_alive: str = field(init=False, default_factory=lambda: os.getenv("OLLAMA_KEEP_ALIVE", "30m"))
+    # Pre-evaluate every action's system prompt at startup so requests reuse the cached prefix
+    warm_prefixes: bool = field(init=False, default_factory=lambda: os.getenv("OLLAMA_WARM_PREFIXES", "true").lower() == "true")
+
+@dataclass(frozen=True)
+class CacheConfig:
+    """ Agent response cache (deterministic outputs for identical prompts + decode options). """
+    enabled: bool = field(init=False, default_factory=lambda: os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true")
+    ttl: float = field(init=False, default_factory=lambda: float(os.getenv("RESPONSE_CACHE_TTL", "86400")))
+    max_entries: int = field(init=False, default_factory=lambda: int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "2048")))
+    max_bytes: int = field(init=False, default_factory=lambda: int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(32 * 1024 * 1024))))
+    # SQLite file for the persistent tier; disabled when empty
+    path: str = field(init=False, default_factory=lambda: os.getenv("RESPONSE_CACHE_PATH", ""))
+    # Caps of the persistent tier (oldest rows are deleted first)
+    disk_max_entries: int = field(init=False, default_factory=lambda: int(os.getenv("RESPONSE_CACHE_DISK_MAX_ENTRIES", "100000")))
+    disk_max_bytes: int = field(init=False, default_factory=lambda: int(os.getenv("RESPONSE_CACHE_DISK_MAX_BYTES", str(256 * 1024 * 1024))))
+    # Seconds a response is replayed for a repeated `Idempotency-Key`
+    idempotency_ttl: float = field(init=False, default_factory=lambda: float(os.getenv("IDEMPOTENCY_TTL", "600")))
+
+@dataclass(frozen=True)
+class GatewayConfig:
+    """ Concurrency limits for LLM calls going through the gateway. """
+    # Should match the Ollama server's OLLAMA_NUM_PARALLEL
+    max_parallel: int = field(init=False, default_factory=lambda: int(os.getenv("OLLAMA_NUM_PARALLEL", "4")))
+    max_queue: int = field(init=False, default_factory=lambda: int(os.getenv("GATEWAY_MAX_QUEUE", "32")))
+    # Default per-request deadline (seconds) to get a generation slot
+    timeout: float = field(init=False, default_factory=lambda: float(os.getenv("GATEWAY_TIMEOUT", "60")))
+    # Initial guess of a generation's duration (seconds) until real ones are measured
+    service_estimate: float = field(init=False, default_factory=lambda: float(os.getenv("GATEWAY_SERVICE_ESTIMATE", "10")))
+    # Per-user token bucket: generations (of default size) refilled per second, and the burst allowance
+    user_rate: float = field(init=False, default_factory=lambda: float(os.getenv("USER_QUOTA_RATE", "0.2")))
+    user_burst: float = field(init=False, default_factory=lambda: float(os.getenv("USER_QUOTA_BURST", "10")))
+
+@dataclass(frozen=True)
+class BudgetConfig:
+    """ Prompt token budget checked before each generation. """
+    # Max prompt tokens; 0 derives it from the model's `num_ctx` minus `num_predict`
+    tokens: int = field(init=False, default_factory=lambda: int(os.getenv("PROMPT_TOKEN_BUDGET", "0")))
+    # HF `tokenizer.json` of the served model for exact counts (estimated when empty)
+    tokenizer_path: str = field(init=False, default_factory=lambda: os.getenv("TOKENIZER_PATH", ""))
+
+@dataclass(frozen=True)
+class GeocodeConfig:
+    """ Birth place geocoding; the offline gazetteer is always tried first. """
+    # Ask Nominatim for places the gazetteer does not know (needs `geopy` and network access)
+    fallback: bool = field(init=False, default_factory=lambda: os.getenv("GEOCODER_FALLBACK", "false").lower() == "true")
+    user_agent: str = field(init=False, default_factory=lambda: os.getenv("GEOCODER_USER_AGENT", "astro-app"))
+    # Seconds a fallback answer is kept (stored alongside the response cache when RESPONSE_CACHE_PATH is set)
+    fallback_ttl: float = field(init=False, default_factory=lambda: float(os.getenv("GEOCODER_FALLBACK_TTL", str(30 * 86400))))
+
+@dataclass(frozen=True)
+class AstrologyConfig:
+    """ Natal chart computation. """
+    chart_cache_entries: int = field(init=False, default_factory=lambda: int(os.getenv("CHART_CACHE_MAX_ENTRIES", "10000")))
+    # SQLite file for the persistent chart tier; disabled when empty
+    chart_cache_path: str = field(init=False, default_factory=lambda: os.getenv("CHART_CACHE_PATH", ""))
+    # Chart worker processes; 0 computes charts in a thread of the API process
+    workers: int = field(init=False, default_factory=lambda: int(os.getenv("ASTROLOGY_WORKERS", "2")))
+    # Precomputed sun/moon table for the signs-only mode (built and saved here on first use)
+    ephemeris_path: str = field(init=False, default_factory=lambda: os.getenv("ASTROLOGY_EPHEMERIS_PATH", "config/ephemeris.npz"))
+    # Batch endpoint: profiles resolved concurrently ahead of the one being sent, and profiles per request
+    batch_window: int = field(init=False, default_factory=lambda: int(os.getenv("ASTROLOGY_BATCH_WINDOW", "256")))
+    batch_max_items: int = field(init=False, default_factory=lambda: int(os.getenv("ASTROLOGY_BATCH_MAX_ITEMS", "50000")))
+    # Daily transits, one entry per (day, timezone bucket); the SQLite tier keeps computed days across restarts
+    transit_cache_entries: int = field(init=False, default_factory=lambda: int(os.getenv("TRANSIT_CACHE_MAX_ENTRIES", "512")))
+    transit_cache_path: str = field(init=False, default_factory=lambda: os.getenv("TRANSIT_CACHE_PATH", "config/transits.sqlite"))
+
+@dataclass(frozen=True)
+class JobsConfig:
+    """ Asynchronous job API: a persistent SQLite queue drained by worker tasks. """
+    path: str = field(init=False, default_factory=lambda: os.getenv("JOBS_PATH", "config/jobs.sqlite"))
+    # Worker tasks in the API process; 0 leaves the queue to `python -m src.jobs.worker` processes
+    workers: int = field(init=False, default_factory=lambda: int(os.getenv("JOB_WORKERS", "2")))
+    max_attempts: int = field(init=False, default_factory=lambda: int(os.getenv("JOB_MAX_ATTEMPTS", "3")))
+    # First retry delay (seconds), doubled on each attempt
+    retry_backoff: float = field(init=False, default_factory=lambda: float(os.getenv("JOB_RETRY_BACKOFF", "5")))
+    # Seconds a finished job and its result are kept
+    result_ttl: float = field(init=False, default_factory=lambda: float(os.getenv("JOB_RESULT_TTL", "86400")))
+    # Seconds a claimed job is held before another worker may take it over (e.g. after a crash)
+    lease: float = field(init=False, default_factory=lambda: float(os.getenv("JOB_LEASE", "600")))
+    poll_interval: float = field(init=False, default_factory=lambda: float(os.getenv("JOB_POLL_INTERVAL", "0.5")))
 
 @dataclass(frozen=True)
 class DataBaseConfig:
@@ -16,8 +116,14 @@ class DataBaseConfig:
 
 @dataclass
 class Setting:
-    server: AgentServer = field(init=False)
+    server: AgentServer = field(init=False, default_factory=AgentServer)
     db: DataBaseConfig = field(init=False, default_factory=DataBaseConfig)
-    llm_id: str = field(init=False, default_factory=os.getenv('LLM_ID', "hf.co/bartowski/Llama-3.2-3B-Instruct-GGUF:Q5_K_S"))
+    cache: CacheConfig = field(init=False, default_factory=CacheConfig)
+    gateway: GatewayConfig = field(init=False, default_factory=GatewayConfig)
+    budget: BudgetConfig = field(init=False, default_factory=BudgetConfig)
+    geocode: GeocodeConfig = field(init=False, default_factory=GeocodeConfig)
+    astrology: AstrologyConfig = field(init=False, default_factory=AstrologyConfig)
+    jobs: JobsConfig = field(init=False, default_factory=JobsConfig)
+    llm_id: str = field(init=False, default_factory=lambda: os.getenv('LLM_ID', "hf.co/bartowski/Llama-3.2-3B-Instruct-GGUF:Q5_K_S"))
 
 setting = Setting()
@@ -92,6 +92,36 @@ class InactiveTaro(WoodPecker):
             message="❌ Taro's state is missing or failed to initialize. Please restart container.",
             status_code=503  # 🔵 503 Service Unavailable
         )
+class GatewayRejected(WoodPecker):
+    """ LLM work shed by the gateway before reaching Ollama; `retry_after` is the expected wait in seconds. """
+    def __init__(self, message: str, status_code: int, retry_after: float):
+        self.retry_after = retry_after
+        super().__init__(message=message, status_code=status_code)
+
+class GatewayQueueFull(GatewayRejected):
+    def __init__(self, retry_after: float):
+        super().__init__(
+            message="❌ Taro is busy with too many readings right now. Please retry shortly.",
+            status_code=429,  # 🟠 429 Too Many Requests
+            retry_after=retry_after
+        )
+
+class GatewayOverloaded(GatewayRejected):
+    def __init__(self, retry_after: float):
+        super().__init__(
+            message="❌ Taro can't start your reading before its deadline. Please retry shortly.",
+            status_code=503,  # 🔵 503 Service Unavailable
+            retry_after=retry_after
+        )
+
+class UserQuotaExceeded(GatewayRejected):
+    def __init__(self, retry_after: float):
+        super().__init__(
+            message="❌ You've asked Taro for a lot of readings in a short time. Please take a breath and retry shortly.",
+            status_code=429,  # 🟠 429 Too Many Requests
+            retry_after=retry_after
+        )
+
 class ErrorSettingUpModelChain(WoodPecker):
     def __init__(self, action):
         super().__init__(
@@ -110,6 +140,10 @@ class BadOllamaSetup(WoodPecker):
     def __init__(self):
         super().__init__('Ollama client connected but expected bartwoski\'s model pulled. Please Restart container or check backend :(', status_code=500)
 
+class MalformedPrediction(WoodPecker):
+    def __init__(self, error):
+        super().__init__(message=f"❌ The model's structured reading could not be parsed (possibly cut off by `num_predict`): {error}", status_code=502)  # 🔴 502 Bad Gateway
+
 class DataModelException(WoodPecker):
     def __init__(self, error):
         super().__init__(f'Unexpected Error Captured within Data Schema Models:\n\t{error}', status_code=500)
@@ -136,4 +170,20 @@ class InvalidTarotInsightsCalculation(WoodPecker):
             f"Invalid tarot insight calculation for '{insight_type}'. "
             f"Num cards provided: {count} which doesn't match with the total drawn cards: {expected_count}. This may indicate a misconfigured or logically impossible card count."
         )
-        super().__init__(message, status_code=422)
\ No newline at end of file
+        super().__init__(message, status_code=422)
+class UnknownTarotCard(WoodPecker, ValueError):
+    """ Also a ValueError, so pydantic reports it as a validation error of the field. """
+    def __init__(self, card: str):
+        super().__init__(message=f"❌ Unknown tarot card: {card!r}. Expected one of the 78 Rider-Waite-Smith cards, e.g. 'Ace of Pentacles' or 'The Tower (Reversed)'.", status_code=422)  # 🟠 422 Unprocessable Entity
+
+class IdempotencyKeyMismatch(WoodPecker):
+    def __init__(self):
+        super().__init__(message="❌ This Idempotency-Key was already used with a different request. Use a new key for a new request.", status_code=422)  # 🟠 422 Unprocessable Entity
+
+class UnknownJob(WoodPecker):
+    def __init__(self, job_id: str):
+        super().__init__(message=f"❌ No job {job_id!r}: it never existed or its result has expired.", status_code=404)  # 🔴 404 Not Found
+
+class UnknownJobAction(WoodPecker):
+    def __init__(self, action: str, actions):
+        super().__init__(message=f"❌ Unknown job action {action!r}. Available: {', '.join(actions)}.", status_code=404)  # 🔴 404 Not Found
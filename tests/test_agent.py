@@ -0,0 +1,96 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from src.agent import base
+from src.agent.agents import NumerologyAnalyst
+from src.agent.client import LLM_MODEL_ID
+from src.agent.gateway import LLMGateway
+from src.schemas import TarotReading
+from utils.flight import SingleFlight
+
+READING = TarotReading(
+    timestamp="2025-06-22T02:30:00",
+    question="How is my career?",
+    reading_mode="three_card",
+    drawn_cards=["The Empress", "The Sun", "The Star"],
+)
+
+
+class StubAsyncClient:
+    """ `ollama.AsyncClient` stand-in whose `chat` replies, raises or hangs until cancelled. """
+
+    def __init__(self, reply: str | None = "The numbers align.", error: Exception | None = None, hang: bool = False):
+        self.reply = reply
+        self.error = error
+        self.hang = hang
+        self.calls = []
+        self.started = asyncio.Event()
+
+    async def chat(self, **kwargs):
+        self.calls.append(kwargs)
+        self.started.set()
+        if self.hang:
+            await asyncio.Event().wait()
+        if self.error is not None:
+            raise self.error
+        return SimpleNamespace(message={'content': self.reply}, prompt_eval_count=12, eval_count=3)
+
+
+@pytest.fixture
+def gateway(monkeypatch):
+    gateway = LLMGateway(max_parallel=1, max_queue=10, timeout=5, service_estimate=0.01)
+    monkeypatch.setattr(base, "gateway", gateway)
+    monkeypatch.setattr(base, "inflight", SingleFlight())
+    monkeypatch.setattr(base, "is_cacheable", lambda options: False)
+    return gateway
+
+
+def test_arun_generates_on_the_async_client(gateway):
+    aclient = StubAsyncClient()
+    agent = NumerologyAnalyst(client=object(), aclient=aclient)
+
+    assert asyncio.run(agent.arun(inputs=READING)) == "The numbers align."
+    call = aclient.calls[0]
+    assert call["model"] == LLM_MODEL_ID and call["stream"] is False
+    assert [message["role"] for message in call["messages"]] == ["system", "user"]
+    assert call["options"].num_predict == 150
+    assert agent.metrics["prompt_eval_count"] == 12
+    assert gateway.stats()["in_flight"] == 0 and gateway.admitted == 1
+
+
+def test_arun_releases_the_slot_when_the_generation_fails(gateway):
+    agent = NumerologyAnalyst(client=object(), aclient=StubAsyncClient(error=ConnectionError("ollama went away")))
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(agent.arun(inputs=READING))
+    assert gateway.stats()["in_flight"] == 0
+
+    # The next generation gets the slot at once
+    agent = NumerologyAnalyst(client=object(), aclient=StubAsyncClient())
+    assert asyncio.run(agent.arun(inputs=READING)) == "The numbers align."
+
+
+def test_cancelled_generation_releases_the_slot(gateway):
+    aclient = StubAsyncClient(hang=True)
+
+    async def main():
+        agent = NumerologyAnalyst(client=object(), aclient=aclient)
+        caller = asyncio.create_task(agent.arun(inputs=READING))
+        await aclient.started.wait()
+        assert gateway.stats()["in_flight"] == 1
+
+        # A disconnected caller leaves the shared generation running for other waiters...
+        caller.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+        assert gateway.stats()["in_flight"] == 1
+
+        # ...and cancelling the generation itself (e.g. on shutdown) frees its slot
+        for task in list(base.inflight._tasks.values()):
+            task.cancel()
+        await asyncio.sleep(0)
+        assert gateway.stats()["in_flight"] == 0
+
+    asyncio.run(main())
@@ -0,0 +1,242 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from src.astrology import chart
+from src.astrology.chart import chart_key, natal_chart
+
+
+@pytest.fixture(scope="module")
+def small_table():
+    """ Sun/moon table for the 1990s only: built in memory, never read from or written to the repo. """
+    from src.astrology.ephemeris import EphemerisTable
+
+    return EphemerisTable.build(1990, 1999)
+
+
+def test_chart_key_normalizes_instant_and_coordinates():
+    sydney = datetime(1994, 12, 21, 3, 15, tzinfo=ZoneInfo("Australia/Sydney"))
+    utc = sydney.astimezone(timezone.utc)
+
+    assert chart_key(sydney, -33.86881, 151.20929) == chart_key(utc, -33.868812, 151.209288)
+    assert chart_key(sydney, -33.8688, 151.2093) != chart_key(sydney + timedelta(minutes=1), -33.8688, 151.2093)
+
+    with pytest.raises(ValueError):
+        chart_key(datetime(1994, 12, 21, 3, 15), -33.8688, 151.2093)
+
+
+def test_natal_chart_is_computed_once(monkeypatch):
+    calls = []
+
+    def compute(dt, latitude, longitude):
+        calls.append(dt)
+        return {'sun_sign': "Sagittarius", 'house_placements': {"1th House": "Leo"}}
+
+    monkeypatch.setattr(chart, "compute_chart", compute)
+    chart.chart_cache.clear()
+
+    birth = datetime(1994, 12, 21, 3, 15, tzinfo=ZoneInfo("Australia/Sydney"))
+    first = natal_chart(birth, -33.8688, 151.2093)
+    first['house_placements']["1th House"] = "changed"
+    second = natal_chart(birth.astimezone(timezone.utc), -33.8688, 151.2093)
+
+    assert len(calls) == 1
+    assert second == {'sun_sign': "Sagittarius", 'house_placements': {"1th House": "Leo"}}
+
+
+def test_chart_pool_matches_in_process_chart():
+    from src.astrology.pool import ChartPool
+
+    birth = datetime(1994, 2, 20, 3, 15, tzinfo=ZoneInfo("Australia/Sydney"))
+
+    async def compute():
+        pool = ChartPool(workers=1)
+        await pool.start()
+        try:
+            first, second = await asyncio.gather(
+                pool.chart(birth, -33.8688, 151.2093),
+                pool.chart(birth, -33.8688, 151.2093),
+            )
+            return pool, first, second
+        finally:
+            pool.shutdown()
+
+    chart.chart_cache.clear()
+    pool, first, second = asyncio.run(compute())
+
+    assert first == second == chart.compute_chart(birth, -33.8688, 151.2093)
+    assert pool.stats()['computed'] == 1
+
+
+def test_chart_pool_recovers_from_a_broken_pool(monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+    from concurrent.futures.process import BrokenProcessPool
+
+    from src.astrology import pool as pool_module
+    from utils.cache import TieredCache
+
+    class Broken(ThreadPoolExecutor):
+        def submit(self, *args, **kwargs):
+            raise BrokenProcessPool("a worker died")
+
+    calls = []
+    monkeypatch.setattr(pool_module, "chart_cache", TieredCache("natal"))
+    monkeypatch.setattr(pool_module, "compute_chart", lambda *birth: calls.append(birth) or {"sun_sign": "Pisces"})
+    birth = datetime(1994, 2, 20, 3, 15, tzinfo=ZoneInfo("Australia/Sydney"))
+
+    # Replaced once, the pool computes the chart
+    pool = pool_module.ChartPool(workers=1)
+    pool._executor = Broken(max_workers=1)
+    replacement = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(pool, "_new_executor", lambda: replacement)
+    assert asyncio.run(pool.chart(birth, -33.8688, 151.2093)) == {"sun_sign": "Pisces"}
+    assert pool._executor is replacement and pool.stats()['restarts'] == 1
+    pool.shutdown()
+
+    # Still broken after its restart: the chart is computed in a thread
+    pool = pool_module.ChartPool(workers=1)
+    pool._executor = Broken(max_workers=1)
+    monkeypatch.setattr(pool, "_new_executor", lambda: Broken(max_workers=1))
+    assert asyncio.run(pool.chart(birth, 0.0, 0.0)) == {"sun_sign": "Pisces"}
+    assert pool.stats()['restarts'] == 1 and pool.stats()['computed'] == 1
+    assert len(calls) == 2
+    pool.shutdown()
+
+
+def test_fast_signs_match_immanuel(small_table):
+    """ Table-interpolated sun/moon and analytic ascendant agree with full immanuel charts. """
+    import random
+
+    from immanuel import charts
+    from immanuel.const import chart as const
+
+    from src.astrology.ephemeris import ascendant, fast_signs, julian_day
+
+    table = small_table
+    rng = random.Random(7)
+
+    for _ in range(15):
+        birth = datetime(1990, 1, 1, tzinfo=timezone.utc) + timedelta(days=rng.uniform(0, 3600))
+        latitude, longitude = rng.uniform(-60, 60), rng.uniform(-180, 180)
+        natal = charts.Natal(charts.Subject(birth.replace(tzinfo=None), latitude, longitude, timezone='UTC'))
+
+        jd = julian_day(birth)
+        sun, moon = table.longitudes(jd)
+        ours = {const.SUN: sun, const.MOON: moon, const.ASC: ascendant(jd, latitude, longitude)}
+        for index, tolerance in ((const.SUN, 0.001), (const.MOON, 0.01), (const.ASC, 0.02)):
+            delta = (float(ours[index]) - natal.objects[index].longitude.raw + 180) % 360 - 180
+            assert abs(delta) < tolerance
+
+        signs = fast_signs(birth, latitude, longitude, table)
+        assert signs['sun_sign'] == natal.objects[const.SUN].sign.name
+        assert signs['moon_sign'] == natal.objects[const.MOON].sign.name
+        assert signs['rising_sign'] == natal.objects[const.ASC].sign.name
+
+    with pytest.raises(ValueError):
+        fast_signs(datetime(2005, 1, 1, tzinfo=timezone.utc), 0.0, 0.0, table)
+
+
+def test_interpolation_across_aries_point():
+    import numpy as np
+
+    from src.astrology.ephemeris import EphemerisTable
+
+    table = EphemerisTable(0.0, 1.0, np.array([359.0, 1.0], dtype=np.float32), np.array([350.0, 10.0], dtype=np.float32))
+    sun, moon = table.longitudes(0.75)
+    assert float(sun) == pytest.approx(0.5) and float(moon) == pytest.approx(5.0)
+
+
+def test_ephemeris_path_is_taken_from_the_service_root(monkeypatch, tmp_path):
+    from src.astrology import ephemeris
+    from utils.settings import ROOT_PATH
+
+    monkeypatch.chdir(tmp_path)
+    assert ephemeris.table_path() == ROOT_PATH / ephemeris.setting.astrology.ephemeris_path
+    assert ephemeris.table_path().is_absolute()
+
+
+def test_sqlite_paths_are_taken_from_the_service_root(monkeypatch, tmp_path):
+    from utils.settings import ROOT_PATH, resolve_path
+
+    monkeypatch.chdir(tmp_path)
+    assert resolve_path("config/cache.sqlite") == str(ROOT_PATH / "config" / "cache.sqlite")
+    assert resolve_path(str(tmp_path / "cache.sqlite")) == str(tmp_path / "cache.sqlite")
+    assert resolve_path(":memory:") == ":memory:"
+    assert resolve_path("") is None
+
+
+def test_batch_keeps_input_order_and_reports_errors(monkeypatch, small_table):
+    from src.astrology import ephemeris
+    from src.astrology.batch import iter_items, iter_ndjson, resolve_batch
+
+    monkeypatch.setattr(ephemeris, "_table", small_table)
+
+    profile = {
+        "id": "1", "username": "w", "first_name": "john", "last_name": "snow",
+        "birth_date": "20-02-1994", "birth_time": "03:15", "birth_place": "Australia/Sydney",
+    }
+    body = b"\n".join([
+        b'{"id": "1", "username": "w", "first_name": "john", "last_name": "snow",',
+        b'{bad json',
+        b"5",
+    ])
+
+    async def run():
+        lines = [line async for line in iter_ndjson(iter_items([body[:10], body[10:]]))]
+        results = [item async for item in resolve_batch(iter_items([profile, {"id": "2"}, 5, profile]), 'signs', window=2)]
+        return lines, results
+
+    lines, results = asyncio.run(run())
+
+    assert [type(line) for line in lines] == [ValueError, ValueError, int]
+    assert [item['index'] for item in results] == [0, 1, 2, 3]
+    assert results[0]['result']['sun_sign'] == "Pisces" and results[3] == dict(results[0], index=3)
+    assert isinstance(results[1]['error'], list) and isinstance(results[2]['error'], str)
+
+
+def test_daily_transits_computed_once_per_day_and_bucket(monkeypatch, tmp_path):
+    from datetime import date
+
+    from src.astrology import transits
+    from src.schemas.astrology import DailyTransits
+    from utils.cache import TieredCache
+
+    calls = []
+    compute = transits.compute_transits
+
+    def counted(day, offset=0):
+        calls.append((day, offset))
+        return compute(day, offset)
+
+    monkeypatch.setattr(transits, "compute_transits", counted)
+    monkeypatch.setattr(transits, "transit_cache", TieredCache("transits", path=str(tmp_path / "transits.sqlite")))
+
+    day = date(2026, 10, 17)
+    sydney = DailyTransits.for_day(day, "Australia/Sydney")
+    again = asyncio.run(DailyTransits.afor_day(day, "Australia/Melbourne"))
+    DailyTransits.for_day(day, "UTC")
+
+    assert calls == [(day, 11), (day, 0)]
+    assert again == sydney and sydney.instant == datetime(2026, 10, 17, 1, tzinfo=timezone.utc)
+    assert sydney.positions["Sun"]["sign"] == "Libra"
+    assert {"planet": "Sun", "sign": "Libra", "aspect": "opposition"} in sydney.aspects["Aries"]
+    assert list(sydney.for_sign("aries").aspects) == ["Aries"]
+    assert transits.tz_bucket("Asia/Kolkata") == 6 and transits.tz_bucket("Not/AZone") == 0
+
+
+def test_transit_bucket_uses_the_requested_days_offset():
+    from datetime import date
+
+    from src.astrology.transits import day_bucket, tz_bucket
+
+    # Sydney is on DST (UTC+11) in October and on standard time (UTC+10) in July, whatever today is
+    assert day_bucket("Australia/Sydney", date(2026, 10, 17)) == (date(2026, 10, 17), 11)
+    assert day_bucket("Australia/Sydney", date(2026, 7, 1)) == (date(2026, 7, 1), 10)
+    assert tz_bucket("Australia/Sydney", datetime(2026, 7, 1, 2, tzinfo=timezone.utc)) == 10
+
+    # Today in the zone: 2026-07-01 15:00Z is already the 2nd in Sydney
+    now = datetime(2026, 7, 1, 15, tzinfo=timezone.utc)
+    assert day_bucket("Australia/Sydney", now=now) == (date(2026, 7, 2), 10)
+    assert day_bucket(None, now=now) == (date(2026, 7, 1), 0)
@@ -0,0 +1,59 @@
+from types import SimpleNamespace
+
+from src.agent.budget import MESSAGE_OVERHEAD, count_tokens, fit_prompt, truncate_tokens
+
+
+def make_task(example_tokens: int = 200):
+    """ TaroAction-like task whose system prompt shrinks with the example level. """
+    examples = {'full': "word " * example_tokens, 'short': "word " * 10, 'none': ""}
+
+    return SimpleNamespace(
+        label="test",
+        system_prompt_for=lambda example: "You are a reader.\n" + examples[example],
+        user_prompt=lambda **kwargs: "\n".join(f"{k}: {v}" for k, v in kwargs.items()),
+    )
+
+
+def test_fits_without_reductions():
+    messages, report = fit_prompt(make_task(), {'question': "Will it rain?"}, budget=1000)
+
+    assert report.fits and report.steps == [] and report.example == 'full'
+    assert report.total == count_tokens(messages[0]['content']) + count_tokens(messages[1]['content']) + 2 * MESSAGE_OVERHEAD
+
+
+def test_example_is_shortened_then_dropped():
+    _, report = fit_prompt(make_task(), {'question': "Will it rain?"}, budget=60)
+    assert report.fits and report.steps == ['example:short']
+
+    _, report = fit_prompt(make_task(), {'question': "Will it rain?"}, budget=30)
+    assert report.fits and report.steps == ['example:short', 'example:none']
+
+
+def test_trimmable_inputs_are_cut_in_order():
+    inputs = {
+        'question': "Will it rain?",
+        'insight_numerology': "\n".join(f"numerology line {i}" for i in range(50)),
+        'insight_combination': "\n".join(f"combination line {i}" for i in range(50)),
+    }
+
+    messages, report = fit_prompt(make_task(), inputs, budget=300, trimmable=('insight_numerology', 'insight_combination'))
+
+    assert report.fits
+    assert report.steps == ['example:short', 'example:none', 'trim:insight_numerology']
+    assert "combination line 49" in messages[1]['content']
+    assert "numerology line 49" not in messages[1]['content']
+
+
+def test_over_budget_prompt_is_still_sent():
+    messages, report = fit_prompt(make_task(), {'question': "rain " * 500}, budget=50)
+
+    assert not report.fits
+    assert messages[1]['content'].startswith("question: rain")
+
+
+def test_truncate_keeps_whole_lines():
+    text = "first line here\nsecond line here\nthird line here"
+
+    assert truncate_tokens(text, 1000) == text
+    assert truncate_tokens(text, 0) == ""
+    assert truncate_tokens(text, 6) == "first line here\nsecond\n..."
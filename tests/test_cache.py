@@ -0,0 +1,236 @@
+import asyncio
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from src.agent.cache import PromptCacheStats
+from utils.cache import TieredCache, make_key
+from utils.flight import IdempotencyStore, SingleFlight
+
+
+def test_make_key_ignores_dict_order():
+    assert make_key("a", {"x": 1, "y": 2}) == make_key("a", {"y": 2, "x": 1})
+    assert make_key("a", {"x": 1}) != make_key("b", {"x": 1})
+
+
+def test_lru_evicts_least_recently_used():
+    cache = TieredCache("t", max_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    assert cache.get("a") == "1"  # refreshes `a`
+    cache.set("c", "3")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "1" and cache.get("c") == "3"
+
+
+def test_byte_bound_and_oversized_values():
+    cache = TieredCache("t", max_bytes=10)
+    cache.set("a", "x" * 20)  # larger than the whole cache; never stored
+    assert cache.get("a") is None
+
+    cache.set("b", "xxx")  # 5 bytes once JSON encoded
+    cache.set("c", "yyy")
+    cache.set("d", "zzz")
+    assert cache.stats()["bytes"] <= 10
+    assert cache.get("b") is None and cache.get("d") == "zzz"
+
+
+def test_ttl_expiry():
+    cache = TieredCache("t", ttl=0.05)
+    cache.set("a", "1")
+    assert cache.get("a") == "1"
+    time.sleep(0.1)
+    assert cache.get("a") is None
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    TieredCache("t", path=path).set("a", {"text": "hello"})
+
+    restarted = TieredCache("t", path=path)
+    assert restarted.get("a") == {"text": "hello"}
+    assert restarted.get("a") == {"text": "hello"}
+
+    stats = restarted.stats()
+    assert stats["disk_hits"] == 1 and stats["hits"] == 1 and stats["misses"] == 0
+    assert TieredCache("other", path=path).get("a") is None
+
+
+def test_disk_tier_purges_expired_rows_on_open(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = TieredCache("t", ttl=0.05, path=path)
+    cache.set("a", "1")
+    TieredCache("t", path=path).set("b", "2")  # never expires
+    time.sleep(0.1)
+
+    reopened = TieredCache("t", path=path)
+    assert reopened.stats()["pruned"] == 1
+    rows = reopened._db.execute("SELECT key FROM cache").fetchall()
+    assert rows == [("b",)]
+
+
+def test_disk_tier_caps_evict_the_oldest_rows(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = TieredCache("t", path=path, max_disk_entries=2)
+    for key in "abc":
+        cache.set(key, key)
+        time.sleep(0.01)
+    assert cache.prune() == 1
+    assert TieredCache("t", path=path).get("a") is None
+    assert TieredCache("t", path=path).get("c") == "c"
+
+    by_size = TieredCache("s", path=path, max_disk_bytes=10)
+    by_size.PRUNE_EVERY = 1
+    by_size.set("a", "xxx")  # 5 bytes once JSON encoded
+    time.sleep(0.01)
+    by_size.set("b", "yyy")
+    time.sleep(0.01)
+    by_size.set("c", "zzz")
+    keys = {row[0] for row in by_size._db.execute("SELECT key FROM cache WHERE namespace = 's'")}
+    assert keys == {"b", "c"}
+
+
+def test_disk_tier_from_an_older_schema_is_migrated(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    db = sqlite3.connect(path)
+    db.execute(
+        "CREATE TABLE cache (namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, expires_at REAL, "
+        "PRIMARY KEY (namespace, key))"
+    )
+    db.execute("INSERT INTO cache VALUES ('t', 'old', '\"1\"', NULL)")
+    db.commit()
+    db.close()
+
+    cache = TieredCache("t", path=path, max_disk_entries=1)
+    assert cache.get("old") == "1"
+    cache.set("new", "2")
+    cache.prune()  # the row without `stored_at` goes first
+    assert TieredCache("t", path=path).get("old") is None
+    assert TieredCache("t", path=path).get("new") == "2"
+
+
+def test_async_disk_tier_runs_off_the_event_loop(tmp_path):
+    cache = TieredCache("t", path=str(tmp_path / "cache.sqlite"))
+    threads = []
+    disk_get, persist = cache._disk_get, cache._persist
+    cache._disk_get = lambda *args: threads.append(threading.current_thread()) or disk_get(*args)
+    cache._persist = lambda *args: threads.append(threading.current_thread()) or persist(*args)
+
+    async def main():
+        await cache.aset("a", {"text": "hello"})
+        cache._memory.clear()
+        cache._bytes = 0
+        return await cache.aget("a"), await cache.aget("a"), await cache.aget("missing")
+
+    assert asyncio.run(main()) == ({"text": "hello"}, {"text": "hello"}, None)
+    # The set, the disk hit and the miss; the second read came from memory
+    assert len(threads) == 3 and threading.main_thread() not in threads
+    stats = cache.stats()
+    assert stats["disk_hits"] == 1 and stats["hits"] == 1 and stats["misses"] == 1
+
+
+def test_single_flight_coalesces_concurrent_calls():
+    flight = SingleFlight()
+    calls = []
+
+    async def generate():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "reading"
+
+    async def main():
+        return await asyncio.gather(*(flight.do("k", generate) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["reading"] * 5
+    assert len(calls) == 1
+    assert flight.stats() == {"in_flight": 0, "leaders": 1, "shared": 4}
+
+
+def test_single_flight_shares_errors_and_forgets_key():
+    flight = SingleFlight()
+
+    async def boom():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("ollama down")
+
+    async def main():
+        return await asyncio.gather(flight.do("k", boom), flight.do("k", boom), return_exceptions=True)
+
+    assert all(isinstance(r, RuntimeError) for r in asyncio.run(main()))
+    assert flight.stats() == {"in_flight": 0, "leaders": 1, "shared": 1}
+
+
+def test_single_flight_sync_threads():
+    flight = SingleFlight()
+    calls = []
+    gate = threading.Event()
+
+    def generate():
+        calls.append(1)
+        gate.wait(1)
+        return "reading"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do_sync("k", generate))) for _ in range(4)]
+    for t in threads:
+        t.start()
+    time.sleep(0.05)
+    gate.set()
+    for t in threads:
+        t.join()
+
+    assert results == ["reading"] * 4 and len(calls) == 1
+
+
+def test_idempotency_store_replays_result():
+    store = IdempotencyStore(ttl=60)
+    calls = []
+
+    async def generate():
+        calls.append(1)
+        return "reading"
+
+    async def main():
+        first = await store.run("retry-1", generate)
+        second = await store.run("retry-1", generate)
+        return first, second
+
+    assert asyncio.run(main()) == ("reading", "reading")
+    assert len(calls) == 1
+
+
+def test_idempotency_store_rejects_a_reused_key_with_another_request():
+    from utils.woodpecker import IdempotencyKeyMismatch
+
+    store = IdempotencyStore(ttl=60)
+
+    async def generate():
+        return "reading"
+
+    async def main():
+        await store.run("retry-2", generate, fingerprint="body-a")
+        assert await store.run("retry-2", generate, fingerprint="body-a") == "reading"
+        with pytest.raises(IdempotencyKeyMismatch):
+            await store.run("retry-2", generate, fingerprint="body-b")
+
+    asyncio.run(main())
+
+
+def test_prompt_cache_stats_reports_reused_prefix():
+    stats = PromptCacheStats()
+
+    assert stats.record(500, {'prompt_eval_count': 500, 'prompt_eval_duration': 2e9}) == 0  # cold
+    assert stats.record(500, {'prompt_eval_count': 120, 'prompt_eval_duration': 5e8}) == 380  # warm prefix
+    assert stats.record(500, {}) == 0  # cached response, nothing evaluated
+
+    assert stats.stats() == {
+        'requests': 2,
+        'evaluated': 620,
+        'eval_seconds': 2.5,
+        'prompt_tokens_estimate': 1000,
+        'reused_estimate': 380,
+        'reuse_ratio_estimate': 0.38,
+    }
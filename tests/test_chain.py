@@ -0,0 +1,139 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from src.agent.chain import ChainRunner, upstream_closure
+from src.agent.sections import Section
+
+
+def make_agent(label: str, upstream: tuple = (), delay: float = 0.0, fail: bool = False):
+    """ Builds a SandCrawler-like class whose output records the upstream outputs it received. """
+
+    class Agent:
+        task = SimpleNamespace(label=label)
+        excerpt = None
+
+        def __init__(self, **clients):
+            pass
+
+        def run(self, upstream=None, **kwargs):
+            if fail:
+                raise RuntimeError(label)
+            return f"{label}<{','.join(f'{k}={v}' for k, v in sorted((upstream or {}).items()))}>"
+
+        async def arun(self, upstream=None, **kwargs):
+            await asyncio.sleep(delay)
+            return self.run(upstream=upstream, **kwargs)
+
+    Agent.upstream = upstream
+    return Agent
+
+
+def root_with(*upstream):
+    return SimpleNamespace(upstream=upstream, client=None, aclient=None, ticket=None, remaining=lambda: 60.0)
+
+
+def test_upstream_closure_is_dependency_ordered():
+    a = make_agent("a")
+    b = make_agent("b", upstream=(a,))
+    c = make_agent("c")
+
+    order = [cls.task.label for cls in upstream_closure(root_with(b, c))]
+    assert order == ["a", "b", "c"]
+
+
+def test_independent_nodes_run_concurrently():
+    a = make_agent("a", delay=0.2)
+    b = make_agent("b", delay=0.2)
+
+    start = time.perf_counter()
+    results = asyncio.run(ChainRunner(root_with(a, b)).arun(inputs=None))
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 0.35
+    assert results["a"].ok and results["b"].ok
+    assert results["a"].elapsed >= 0.2
+
+
+def test_failed_node_is_isolated():
+    a = make_agent("a", fail=True)
+    b = make_agent("b")
+    c = make_agent("c", upstream=(a, b))
+
+    results = asyncio.run(ChainRunner(root_with(c)).arun(inputs=None))
+
+    assert not results["a"].ok and isinstance(results["a"].error, RuntimeError)
+    assert results["b"].output == "b<>"
+    assert results["c"].output == "c<a=None,b=b<>>"
+
+
+def test_sync_run_matches_async():
+    a = make_agent("a")
+    b = make_agent("b", upstream=(a,))
+
+    sync = ChainRunner(root_with(b)).run(inputs=None)
+    concurrent = asyncio.run(ChainRunner(root_with(b)).arun(inputs=None))
+
+    assert {k: r.output for k, r in sync.items()} == {k: r.output for k, r in concurrent.items()}
+
+
+COMBINATION = (
+    "**Combination Highlights**:\n- The Empress + The Sun: success.\n- The Sun + The Star: hope.\n\n"
+    "**Possible insights from the combination**:\nKeep going."
+)
+
+
+def test_section_parser_is_incremental():
+    section = Section("Combination Highlights", "Possible insights")
+    expected = "- The Empress + The Sun: success.\n- The Sun + The Star: hope."
+
+    for size in (1, 3, 7):
+        parser = section.parser()
+        chunks = [COMBINATION[i:i + size] for i in range(0, len(COMBINATION), size)]
+        fed = next(i for i, chunk in enumerate(chunks) if parser.feed(chunk))
+        # Done as soon as the end header is readable, before the rest of the output
+        assert "Keep going" not in "".join(chunks[:fed + 1])
+        assert parser.close() == expected
+
+    assert section.extract("**Combination Highlights:** only this") == "only this"
+    assert section.extract("no headers") is None
+
+
+def test_chain_node_stops_after_its_excerpt():
+    from src.agent.agents import CombinationAnalyst
+    from src.schemas import TarotReading
+
+    class Stream:
+        def __init__(self, text):
+            self.chunks = [text[i:i + 4] for i in range(0, len(text), 4)]
+            self.sent = 0
+            self.closed = False
+
+        def __aiter__(self):
+            return self
+
+        async def __anext__(self):
+            if self.sent == len(self.chunks):
+                raise StopAsyncIteration
+            self.sent += 1
+            return SimpleNamespace(message={'content': self.chunks[self.sent - 1]}, done=False)
+
+        async def aclose(self):
+            self.closed = True
+
+    stream = Stream(COMBINATION)
+
+    class Client:
+        async def chat(self, **kwargs):
+            assert kwargs['stream']
+            return stream
+
+    reading = TarotReading(
+        timestamp="2025-06-22T02:30:00", question="How is my career? (excerpt test)",
+        reading_mode="three_card", drawn_cards=["The Empress", "The Sun", "The Star"],
+    )
+    agent = CombinationAnalyst(client=object(), aclient=Client())
+    section = asyncio.run(agent.arun_section(inputs=reading))
+
+    assert section == "- The Empress + The Sun: success.\n- The Sun + The Star: hope."
+    assert stream.closed and stream.sent < len(stream.chunks)
@@ -0,0 +1,112 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from src.agent import budget, client
+from src.agent.budget import fit_prompt
+from utils.settings import setting
+from utils.woodpecker import BadOllamaSetup
+
+
+class StubAsyncClient:
+    """ Records the chat calls an `ollama.AsyncClient` would receive. """
+
+    def __init__(self, models=(client.LLM_MODEL_ID,)):
+        self.calls = []
+        # Successive `list()` answers: a tuple of model names, or an exception to raise
+        self.models = list(models) if isinstance(models, list) else [models]
+
+    async def chat(self, **kwargs):
+        self.calls.append(kwargs)
+        return SimpleNamespace(prompt_eval_count=42)
+
+    async def list(self):
+        models = self.models.pop(0) if len(self.models) > 1 else self.models[0]
+        if isinstance(models, Exception):
+            raise models
+        return SimpleNamespace(models=[SimpleNamespace(model=name) for name in models])
+
+
+def test_clients_share_a_keep_alive_pool():
+    sync_client = client.create_client("http://ollama.test:11434")
+    async_client = client.create_async_client("http://ollama.test:11434")
+    try:
+        for pooled in (sync_client, async_client):
+            pool = pooled._client._transport._pool
+            assert pool._max_connections == setting.server.max_connections
+            assert pool._max_keepalive_connections == setting.server.max_keepalive
+            assert pool._keepalive_expiry == setting.server.keepalive_expiry
+            assert pooled._client.timeout.read == setting.server.timeout
+    finally:
+        client.close_client(sync_client)
+        asyncio.run(client.aclose_client(async_client))
+    assert sync_client._client.is_closed and async_client._client.is_closed
+
+
+def test_process_wide_clients_are_created_once(monkeypatch):
+    monkeypatch.setattr(client, "_client", None)
+    monkeypatch.setattr(client, "_async_client", None)
+    assert client.get_client() is client.get_client()
+    assert client.get_async_client() is client.get_async_client()
+
+
+def test_verify_model_needs_the_model_pulled():
+    asyncio.run(client.averify_model(StubAsyncClient()))
+    with pytest.raises(BadOllamaSetup):
+        asyncio.run(client.averify_model(StubAsyncClient(models=("other:latest",))))
+
+
+def test_watch_health_flags_outages_and_rewarms_on_recovery(monkeypatch):
+    warmed = []
+
+    async def warm_prefixes(aclient, actions):
+        warmed.append(list(actions))
+
+    monkeypatch.setattr(client, "warm_prefixes", warm_prefixes)
+    ollama = StubAsyncClient(models=[ConnectionError("down"), ("other:latest",), (client.LLM_MODEL_ID,)])
+    state = SimpleNamespace(aollama=ollama, ollama_ready=True)
+    seen = []
+
+    async def main():
+        health = asyncio.create_task(client.watch_health(state, interval=0.01, actions=["story_tell"]))
+        for _ in range(100):
+            seen.append(state.ollama_ready)
+            if warmed and len(seen) > 10:
+                break
+            await asyncio.sleep(0.01)
+        health.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await health
+
+    asyncio.run(main())
+    # Unreachable, then reachable without the model, then back: flagged down, then up and re-warmed once
+    assert False in seen and state.ollama_ready is True
+    assert warmed == [["story_tell"]]
+
+
+def make_action(label: str, example_tokens: int):
+    examples = {'full': "word " * example_tokens, 'short': "word " * 10, 'none': ""}
+    return SimpleNamespace(
+        label=label,
+        system_prompt_for=lambda example: "You are a reader.\n" + examples[example],
+        user_prompt=lambda **kwargs: "\n".join(f"{k}: {v}" for k, v in kwargs.items()),
+    )
+
+
+def test_warm_prefixes_uses_the_level_the_budgeter_picks(monkeypatch):
+    monkeypatch.setattr(budget, "picked_levels", {})
+    small, large = make_action("small", 50), make_action("large", 5000)
+    stub = StubAsyncClient()
+
+    asyncio.run(client.warm_prefixes(stub, [small, large]))
+    assert [call["messages"][0]["content"] for call in stub.calls] == [
+        small.system_prompt_for('full'), large.system_prompt_for('short'),
+    ]
+
+    # Once requests have been budgeted, the level they settled on is the one kept warm
+    fit_prompt(small, {'question': "rain " * 2000}, budget=100)
+    stub.calls.clear()
+    asyncio.run(client.warm_prefixes(stub, [small]))
+    assert stub.calls[0]["messages"][0]["content"] == small.system_prompt_for('none')
+    assert stub.calls[0]["options"].num_predict == 1
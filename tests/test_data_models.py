@@ -1,6 +1,6 @@
 
 import pytest
-from src.schemas import TarotInsights, User
+from src.schemas import TarotInsights, TarotReading, User
 
 def test_user_profile_incorrect_datetime_format():
     """ Test create new user with incorrect datetime format. """
@@ -61,3 +61,174 @@ def test_zero_num_cards_raises():
     with pytest.raises(ZeroDivisionError):
         insights.get_stats()
 
+
+def test_user_astrology_is_lazy():
+    """ Plain validation skips the chart; it is computed on first access or when loaded, never by serialization. """
+    profile = dict(
+        id='abcde-12345',
+        username='astrofan',
+        first_name='mimi',
+        last_name='phan',
+        birth_date='21-12-1994',
+        birth_time='03:15',
+        birth_place='Australia/Sydney'
+    )
+
+    user = User(**profile)
+    assert 'sun_sign' not in user.__dict__
+    assert 'sun_sign' not in user.model_dump()
+
+    assert user.sun_sign == 'Sagittarius'
+    assert user.model_dump()['sun_sign'] == 'Sagittarius'
+
+    included = User(**profile, include_astrology=True)
+    assert 'sun_sign' not in included.model_dump()
+    included.load_astrology()
+    dumped = included.model_dump()
+    assert dumped['rising_sign'] == user.rising_sign and 'include_astrology' not in dumped
+
+
+def test_signs_mode_never_computes_the_full_chart(monkeypatch):
+    import asyncio
+
+    from datetime import datetime, timezone
+
+    import numpy as np
+
+    from src.astrology import ephemeris
+
+    def full_chart(self):
+        raise AssertionError("full chart computed in signs mode")
+
+    # Flat table: every birth is Aries sun and moon
+    start = ephemeris.julian_day(datetime(1990, 1, 1, tzinfo=timezone.utc))
+    monkeypatch.setattr(ephemeris, "_table", ephemeris.EphemerisTable(start, 1000.0, np.zeros(10), np.zeros(10)))
+    monkeypatch.setattr(User, "load_astrology", full_chart)
+
+    user = User(
+        id='1', username='w', first_name='john', last_name='snow', birth_date='20-02-1994',
+        birth_place='Australia/Sydney', include_astrology=True,
+    )
+    asyncio.run(user.aget_signs())
+    dumped = user.model_dump()
+    assert dumped['sun_sign'] == dumped['moon_sign'] == 'Aries' and 'house_placements' not in dumped
+
+
+def test_card_registry_and_aliases():
+    from src.tarot.cards import DECK, parse_card
+
+    assert len(DECK) == 78 and [card.id for card in DECK] == list(range(78))
+    assert DECK[0].name == "The Fool" and DECK[77].name == "King of Pentacles"
+    assert parse_card("  2 OF coins ") == parse_card("Two of Pentacles") == (65, False)
+    assert parse_card("Queen of Swords (Reversed)") == (62, True)
+    assert parse_card("tower") == parse_card("The Tower") and parse_card("judgment").card.name == "Judgement"
+
+    with pytest.raises(ValueError):
+        parse_card("Swordsman")
+
+
+def test_tarot_insights_counts_from_registry():
+    reading = TarotReading(
+        question="q",
+        reading_mode="three_card",
+        drawn_cards=["ace of coins", "Queen of Swords (reversed)", "the wheel"],
+    )
+    insights = reading.get_tarot_insights()
+
+    assert reading.card_ids == (64, 62, 10)
+    assert reading.model_dump()["drawn_cards"] == ["Ace of Pentacles", "Queen of Swords (Reversed)", "Wheel of Fortune"]
+    assert (insights.coin_count, insights.sword_count, insights.queen_count, insights.total_courts) == (1, 1, 1, 1)
+
+
+def test_history_stats_vectorized():
+    from src.schemas import HistoryStatsRequest
+    from src.tarot.stats import history_stats
+
+    request = HistoryStatsRequest(window="week", readings=[
+        {"timestamp": "2025-06-02T10:00:00", "reading_mode": "three_card", "drawn_cards": ["The Tower", "Queen of Cups (Reversed)", "2 of coins"]},
+        {"timestamp": "2025-06-08T23:00:00+00:00", "reading_mode": "three_card", "drawn_cards": ["the tower", "ace of wands", "king of swords"]},
+        {"timestamp": "2025-06-09T01:00:00", "reading_mode": "three_card", "drawn_cards": ["Death", "Ten of Cups", "Page of Wands (r)"]},
+    ])
+    stats = history_stats(request.encode(), request.window, top=1)
+
+    assert (stats["readings"], stats["cards"]) == (3, 9)
+    assert stats["arcana"]["major"] == round(3 / 9, 4) and stats["reversed"] == round(2 / 9, 4)
+    assert stats["suits"]["cups"] == stats["suits"]["wands"] == round(2 / 9, 4)
+    assert stats["courts"]["queen"] == stats["courts"]["king"] == stats["courts"]["page"] == round(1 / 9, 4)
+    assert stats["top_cards"] == [{"id": 16, "card": "The Tower", "count": 2}]
+    assert stats["positions"]["Past"][0]["card"] == "The Tower"
+    assert [(t["window"], t["readings"]) for t in stats["trends"]] == [("2025-06-02", 2), ("2025-06-09", 1)]
+
+
+def test_spread_rarity_is_exact():
+    from collections import Counter
+    from itertools import combinations
+    from math import comb
+
+    from src.tarot.cards import DECK
+    from src.tarot.rarity import rarity_table, spread_rarity
+
+    table = rarity_table(3)
+    assert table["courts"].pmf[3] == comb(16, 3) / comb(78, 3)
+    assert all(abs(sum(d.pmf) - 1) < 1e-12 for d in table.values())
+
+    # Multivariate tables against a full enumeration of 3-card spreads
+    repeated = Counter(max(Counter(card.number for card in spread).values()) for spread in combinations(DECK, 3))
+    total = comb(78, 3)
+    assert [round(repeated[m] / total, 12) for m in range(4)] == [round(p, 12) for p in table["repeated_number"].pmf]
+
+    rarity = spread_rarity(["Seven of Cups", "The Chariot", "Seven of Swords"])
+    assert rarity["repeated_number"]["number"] == 7 and rarity["repeated_number"]["count"] == 3
+    assert rarity["dominant_suit"]["count"] == 1 and rarity["major_arcana"]["count"] == 1
+
+    # Courts share numbers with the majors (Queen = 13 = Death), as in the numerology facts
+    assert spread_rarity(["Queen of Cups", "Death", "Two of Wands"])["repeated_number"]["number"] == 13
+    # No repeat, no number
+    rarity = spread_rarity(["Queen of Cups", "The Sun", "Two of Wands"])
+    assert rarity["repeated_number"]["count"] == 1 and rarity["repeated_number"]["number"] is None
+
+
+def test_numerology_facts():
+    from src.tarot.numerology import digit_root, numerology, numerology_facts, quintessence
+
+    assert (digit_root(0), digit_root(14), digit_root(21)) == (0, 5, 3)
+    assert (quintessence(12), quintessence(45), quintessence(99)) == (12, 9, 18)
+
+    facts = numerology(["Seven of Cups", "The Chariot", "Eight of Wands", "Six of Swords", "King of Cups (Reversed)"])
+    assert [card["number"] for card in facts["cards"]] == [7, 7, 8, 6, 14]
+    assert facts["repeats"] == facts["root_repeats"] == {7: 2}
+    assert facts["sequences"] == [[6, 7, 8]] and facts["palindrome"] is False
+    assert (facts["total"], facts["root"], facts["quintessence"]["card"]) == (42, 6, "The Lovers")
+    assert (facts["major"], facts["minor"], facts["courts"], facts["reversed"]) == (1, 4, 1, 1)
+    assert numerology(["Ace of Cups", "Two of Wands", "Ace of Swords"])["palindrome"] is True
+    assert "Sequences: 6-7-8" in numerology_facts(facts)
+
+
+def test_elemental_reading_fast_path():
+    from src.tarot.elements import elemental_balance, elemental_reading, elemental_summary
+
+    cards = ["Ace of Wands", "Nine of Cups (Reversed)", "The Sun"]
+    assert elemental_balance(cards) == {
+        'counts': {'Fire': 2, 'Water': 1, 'Air': 0, 'Earth': 0}, 'dominant': 'Fire', 'missing': ['Air', 'Earth'],
+    }
+    assert elemental_summary(cards) == "Elements: Fire 2, Water 1, Air 0, Earth 0; Fire dominant; Air and Earth missing"
+
+    reading = elemental_reading(cards, ["Past", "Present", "Future"], "How is my career?")
+    assert reading == elemental_reading(cards, ["Past", "Present", "Future"], "How is my career?")
+    assert "Fire leads this spread" in reading and "Without Earth" in reading and "Present position" in reading
+
+
+def test_prediction_schema_and_parsing():
+    from src.agent.agents import parse_prediction
+    from src.schemas.tarot import TarotPrediction
+    from utils.woodpecker import MalformedPrediction
+
+    schema = TarotPrediction.response_schema()
+    assert schema['required'] == ['combination', 'numerology', 'story_tell']
+    assert all(field['type'] == 'string' and field['description'] for field in schema['properties'].values())
+
+    prediction = parse_prediction('{"combination": "a", "numerology": "b", "story_tell": "c"}')
+    assert prediction.story_tell == "c"
+    with pytest.raises(MalformedPrediction):
+        # Cut off by num_predict
+        parse_prediction('{"combination": "a", "numer')
@@ -0,0 +1,165 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.agent.gateway import LLMGateway
+from src.agent.scheduler import FairQueue, Priority, QuotaBook, Ticket
+from utils.woodpecker import GatewayOverloaded, GatewayQueueFull, UserQuotaExceeded
+
+
+def test_limits_parallel_generations():
+    gateway = LLMGateway(max_parallel=2, max_queue=10, timeout=5, service_estimate=0.01)
+    active, peak = 0, 0
+
+    async def generate():
+        nonlocal active, peak
+        async with gateway.slot():
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.02)
+            active -= 1
+
+    async def main():
+        await asyncio.gather(*(generate() for _ in range(6)))
+
+    asyncio.run(main())
+    stats = gateway.stats()
+    assert peak == 2
+    assert stats["admitted"] == 6 and stats["in_flight"] == 0 and stats["queue_depth"] == 0
+
+
+def test_rejects_when_queue_is_full():
+    gateway = LLMGateway(max_parallel=1, max_queue=1, timeout=5, service_estimate=0.01)
+
+    async def main():
+        hold = asyncio.Event()
+
+        async def holder():
+            async with gateway.slot():
+                await hold.wait()
+
+        tasks = [asyncio.create_task(holder()) for _ in range(2)]  # one running, one queued
+        await asyncio.sleep(0.01)
+        with pytest.raises(GatewayQueueFull) as excinfo:
+            await gateway.acquire()
+        hold.set()
+        await asyncio.gather(*tasks)
+        return excinfo.value
+
+    exc = asyncio.run(main())
+    assert exc.status_code == 429 and exc.retry_after > 0
+    assert gateway.stats()["rejected_full"] == 1
+
+
+def test_sheds_when_expected_wait_exceeds_deadline():
+    gateway = LLMGateway(max_parallel=1, max_queue=10, timeout=5, service_estimate=30)
+    gateway.acquire_sync()
+
+    with pytest.raises(GatewayOverloaded) as excinfo:
+        gateway.acquire_sync(timeout=1)
+    assert excinfo.value.status_code == 503 and excinfo.value.retry_after == pytest.approx(30)
+
+    with pytest.raises(GatewayOverloaded):
+        gateway.check(timeout=1)
+
+
+def test_queued_request_expires_at_deadline():
+    gateway = LLMGateway(max_parallel=1, max_queue=10, timeout=5, service_estimate=0.01)
+    gateway.acquire_sync()
+
+    start = time.monotonic()
+    with pytest.raises(GatewayOverloaded):
+        gateway.acquire_sync(timeout=0.05)
+    assert time.monotonic() - start >= 0.05
+
+    stats = gateway.stats()
+    assert stats["expired"] == 1 and stats["queue_depth"] == 0
+
+
+def test_release_hands_slot_to_waiting_thread():
+    gateway = LLMGateway(max_parallel=1, max_queue=10, timeout=5, service_estimate=0.01)
+    gateway.acquire_sync()
+    acquired = threading.Event()
+
+    def waiter():
+        with gateway.slot_sync():
+            acquired.set()
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    time.sleep(0.02)
+    assert not acquired.is_set()
+
+    gateway.release(0.02)
+    thread.join(1)
+    assert acquired.is_set() and gateway.stats()["in_flight"] == 0
+
+
+class Item:
+    def __init__(self, name):
+        self.name = name
+
+
+def test_fair_queue_interleaves_users():
+    queue = FairQueue()
+    for i in range(4):
+        queue.push(Item(f"heavy-{i}"), Ticket(user_id="heavy"))
+    queue.push(Item("light-0"), Ticket(user_id="light"))
+
+    order = [queue.pop().name for _ in range(5)]
+    assert order.index("light-0") <= 1
+    assert [name for name in order if name.startswith("heavy")] == [f"heavy-{i}" for i in range(4)]
+    assert queue.pop() is None and len(queue) == 0
+
+
+def test_fair_queue_serves_priority_lanes_first():
+    queue = FairQueue()
+    batch, story, single = Item("batch"), Item("story"), Item("single")
+    queue.push(batch, Ticket(user_id="a", priority=Priority.BATCH))
+    queue.push(story, Ticket(user_id="b", priority=Priority.STANDARD))
+    queue.push(single, Ticket(user_id="c", priority=Priority.INTERACTIVE))
+
+    assert queue.ahead(Priority.INTERACTIVE) == 1 and queue.ahead(Priority.BATCH) == 3
+    queue.remove(story, Ticket(user_id="b", priority=Priority.STANDARD))
+    assert [queue.pop(), queue.pop(), queue.pop()] == [single, batch, None]
+
+
+def test_ticket_lanes_follow_spread_size():
+    assert Ticket.for_reading("u", 1).priority is Priority.INTERACTIVE
+    assert Ticket.for_reading("u", 10).priority is Priority.STANDARD
+    assert Ticket.for_reading("u", 1, batch=True).priority is Priority.BATCH
+
+
+def test_quota_book_limits_each_user():
+    quota = QuotaBook(rate=1.0, burst=2)
+    user = Ticket(user_id="u")
+    assert quota.take(user) == 0 and quota.take(user) == 0
+    assert quota.take(user) == pytest.approx(1.0, abs=0.05)
+    assert quota.take(Ticket(user_id="other")) == 0
+
+
+def test_quota_book_meters_anonymous_requests():
+    quota = QuotaBook(rate=1.0, burst=1)
+    # Without a user id, requests are charged per client address, or to one shared bucket
+    assert quota.take(Ticket(client="10.0.0.1")) == 0
+    assert quota.take(Ticket(client="10.0.0.1")) > 0
+    assert quota.take(Ticket(client="10.0.0.2")) == 0
+    assert quota.take(Ticket()) == 0
+    assert quota.take(Ticket()) > 0
+    # The service's own work is not metered
+    assert quota.take(Ticket(metered=False)) == 0
+
+
+def test_gateway_rejects_user_over_quota():
+    gateway = LLMGateway(max_parallel=4, max_queue=10, timeout=5, user_rate=0.01, user_burst=1)
+    ticket = Ticket(user_id="looper")
+
+    with gateway.slot_sync(ticket=ticket):
+        pass
+    with pytest.raises(UserQuotaExceeded) as excinfo:
+        gateway.acquire_sync(ticket=ticket)
+
+    assert excinfo.value.status_code == 429 and excinfo.value.retry_after > 0
+    assert gateway.stats()["rejected_quota"] == 1 and gateway.stats()["in_flight"] == 0
@@ -0,0 +1,83 @@
+import pytest
+
+from utils import geocode
+from utils.geocode import Gazetteer, get_lat_lon, normalize, parse_iso6709
+
+
+def test_parse_iso6709():
+    assert parse_iso6709("-3352+15113") == pytest.approx((-33 - 52 / 60, 151 + 13 / 60))
+    assert parse_iso6709("+404251-0740023") == pytest.approx((40 + 42 / 60 + 51 / 3600, -(74 + 0 / 60 + 23 / 3600)))
+
+
+def test_normalize():
+    assert normalize("  America/Sao_Paulo ") == "america/sao paulo"
+    assert normalize("São  Paulo") == "sao paulo"
+
+
+def test_lookup_forms():
+    gazetteer = Gazetteer()
+    gazetteer.add("Sydney", (-33.87, 151.21))
+    gazetteer.add_zone("Australia/Sydney", (-33.87, 151.22))
+    gazetteer.add_zone("America/Argentina/Buenos_Aires", (-34.6, -58.45))
+
+    assert gazetteer.lookup("australia/sydney") == (-33.87, 151.22)
+    assert gazetteer.lookup("Sydney") == (-33.87, 151.21)  # bundled city wins over the zone's city
+    assert gazetteer.lookup("Buenos Aires") == (-34.6, -58.45)
+    assert gazetteer.lookup("Sydney, NSW, Australia") == (-33.87, 151.21)
+    assert gazetteer.lookup("Atlantis") is None
+
+
+def test_get_lat_lon_offline():
+    lat, lon = get_lat_lon("Australia/Sydney")
+    assert lat == pytest.approx(-33.87, abs=0.1) and lon == pytest.approx(151.21, abs=0.1)
+    assert get_lat_lon("Paris, France") == pytest.approx((48.8566, 2.3522))
+
+
+def test_unknown_place_without_fallback(monkeypatch):
+    monkeypatch.setattr(geocode, "fallback", lambda: None)
+    with pytest.raises(ValueError):
+        get_lat_lon("Nowhere In Particular")
+
+
+def test_async_fallback_is_throttled_off_the_event_loop(monkeypatch):
+    import asyncio
+    import threading
+    import time
+    from types import SimpleNamespace
+
+    from utils.geocode import NominatimFallback, aget_lat_lon
+
+    threads, calls = [], []
+
+    class Geolocator:
+        def geocode(self, place):
+            threads.append(threading.current_thread())
+            calls.append(time.monotonic())
+            return SimpleNamespace(latitude=1.0, longitude=float(len(calls)))
+
+    monkeypatch.setattr(geocode, "FALLBACK_INTERVAL", 0.05)
+    geocoder = NominatimFallback("taro-tests")
+    geocoder._geolocator = Geolocator()
+    monkeypatch.setattr(geocode, "fallback", lambda: geocoder)
+
+    async def main():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.005)
+
+        ticker = asyncio.create_task(tick())
+        results = await asyncio.gather(aget_lat_lon("Atlantis"), aget_lat_lon("Atlantis"), aget_lat_lon("Lemuria"))
+        ticker.cancel()
+        return results, ticks
+
+    results, ticks = asyncio.run(main())
+    # Same place shares one request; the next one waits for its slot while the loop keeps running
+    assert results == [(1.0, 1.0), (1.0, 1.0), (1.0, 2.0)] and len(calls) == 2
+    assert calls[1] - calls[0] >= 0.04 and ticks >= 5  # asyncio timers may fire a little early
+    assert threading.main_thread() not in threads
+    # Answers are cached
+    assert asyncio.run(aget_lat_lon("Atlantis")) == (1.0, 1.0) and len(calls) == 2
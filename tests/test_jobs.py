@@ -0,0 +1,198 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.jobs import actions
+from src.jobs.actions import JobAction
+from src.jobs.queue import JobQueue
+from src.jobs.worker import WorkerPool
+from src.schemas import TarotReading
+from utils.cache import make_key
+from utils.woodpecker import GatewayQueueFull, IdempotencyKeyMismatch
+
+READING = {
+    "timestamp": "2025-06-22T02:30:00",
+    "question": "How is my career?",
+    "reading_mode": "three_card",
+    "drawn_cards": ["The Empress", "The Sun", "The Star"],
+}
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"), max_attempts=2, retry_backoff=0.0, result_ttl=60.0, lease=60.0)
+    yield queue
+    queue.close()
+
+
+def fake_action(monkeypatch, run):
+    monkeypatch.setitem(actions.JOB_ACTIONS, "fake", JobAction(TarotReading, run))
+
+
+def test_queue_persists_and_leases_one_worker(tmp_path, queue):
+    job = queue.submit("insight_combination", READING)
+    assert job.status == "queued" and job.attempts == 0
+
+    # Another connection (e.g. a worker process, or after a restart) sees the same job
+    other = JobQueue(str(tmp_path / "jobs.sqlite"))
+    claimed = other.claim("w1")
+    assert claimed.id == job.id and claimed.status == "running" and claimed.attempts == 1
+    assert queue.claim("w2") is None
+
+    other.complete(claimed, "the reading")
+    assert queue.get(job.id).result == "the reading" and queue.get(job.id).expires_at is not None
+    assert queue.stats()["done"] == 1
+    other.close()
+
+
+def test_queue_idempotency_retry_and_ttl(queue):
+    first = queue.submit("insight_combination", READING, idempotency_key="abc")
+    assert queue.submit("insight_combination", READING, idempotency_key="abc").id == first.id
+
+    job = queue.claim("w1")
+    assert queue.fail(job, "busy") == "queued"
+    job = queue.claim("w1")
+    assert job.attempts == 2
+    assert queue.fail(job, "busy again") == "failed"
+    assert queue.get(job.id).error == "busy again"
+    # Keys are scoped per action and per submitter, and bound to the payload
+    assert queue.submit("insight_numerology", READING, idempotency_key="abc").id != first.id
+    assert queue.submit("insight_combination", READING, idempotency_key="abc", owner="someone").id != first.id
+    with pytest.raises(IdempotencyKeyMismatch):
+        queue.submit("insight_combination", READING | {"question": "Another one?"}, idempotency_key="abc")
+    # Ids are random, not derived from the key
+    assert first.id != make_key("job", "insight_combination", None, "abc")[:32] and len(first.id) == 32
+
+    queue.result_ttl = 0.0
+    job = queue.claim("w1")
+    queue.complete(job, {"ok": True})
+    assert queue.get(job.id) is None
+    assert queue.sweep() >= 1
+
+
+def test_queue_file_from_an_older_schema_is_migrated(tmp_path):
+    import sqlite3
+
+    path = str(tmp_path / "old.sqlite")
+    db = sqlite3.connect(path)
+    db.execute(
+        "CREATE TABLE jobs (id TEXT PRIMARY KEY, action TEXT NOT NULL, payload TEXT NOT NULL, status TEXT NOT NULL, "
+        "attempts INTEGER NOT NULL DEFAULT 0, max_attempts INTEGER NOT NULL, result TEXT, error TEXT, "
+        "created_at REAL NOT NULL, updated_at REAL NOT NULL, available_at REAL NOT NULL, "
+        "lease_until REAL, expires_at REAL, worker TEXT)"
+    )
+    db.commit()
+    db.close()
+
+    queue = JobQueue(path)
+    job = queue.submit("insight_combination", READING, idempotency_key="abc", address="198.51.100.1")
+    assert queue.submit("insight_combination", READING, idempotency_key="abc").id == job.id
+    assert queue.claim("w1").address == "198.51.100.1"
+    queue.close()
+
+
+def test_expired_lease_is_claimed_again(queue):
+    queue.lease = 0.0
+    job = queue.submit("insight_combination", READING)
+    lost = queue.claim("crashed")
+    time.sleep(0.01)
+    taken = queue.claim("w2")
+    assert taken.id == job.id and taken.worker == "w2" and taken.attempts == 2
+
+    # The first worker's late result no longer applies
+    queue.complete(lost, "stale")
+    assert queue.get(job.id).status == "running"
+
+
+def test_worker_pool_runs_retries_and_fails(monkeypatch, queue):
+    calls = []
+
+    async def run(reading, **clients):
+        calls.append(reading.question)
+        if len(calls) == 1:
+            raise GatewayQueueFull(retry_after=0.0)
+        return reading.drawn_cards[0].card.name
+
+    fake_action(monkeypatch, run)
+    pool = WorkerPool(queue, workers=1, poll_interval=0.01)
+    job = queue.submit("fake", READING)
+    invalid = queue.submit("fake", READING | {"drawn_cards": ["The Empress", "Nine of Stars", "The Sun"]})
+
+    async def drain():
+        await pool.start()
+        for _ in range(200):
+            if queue.get(job.id).finished and queue.get(invalid.id).finished:
+                break
+            await asyncio.sleep(0.01)
+        await pool.stop()
+
+    asyncio.run(drain())
+
+    done = queue.get(job.id)
+    assert done.status == "done" and done.result == "The Empress" and done.attempts == 2
+    # Invalid inputs are not retried
+    failed = queue.get(invalid.id)
+    assert failed.status == "failed" and failed.attempts == 1 and "Nine of Stars" in failed.error
+
+
+def test_jobs_api(monkeypatch, queue):
+    from src.api.jobs import jobs_router
+
+    async def run(reading, **clients):
+        return f"{len(reading.drawn_cards)} cards"
+
+    fake_action(monkeypatch, run)
+    app = FastAPI()
+    app.include_router(jobs_router)
+    app.state.jobs = WorkerPool(queue, workers=0)
+    client = TestClient(app)
+
+    assert client.post("/jobs/unknown", json=READING).status_code == 404
+    assert client.post("/jobs/fake", json=READING | {"drawn_cards": ["Nine of Stars"]}).status_code == 422
+
+    response = client.post("/jobs/fake", json=READING)
+    assert response.status_code == 202
+    job_id = response.json()["id"]
+    assert client.get(f"/jobs/{job_id}").json()["status"] == "queued"
+    assert client.get("/jobs/missing").status_code == 404
+
+    asyncio.run(app.state.jobs.execute(queue.claim("w1")))
+    body = client.get(f"/jobs/{job_id}").json()
+    assert body["status"] == "done" and body["result"] == "3 cards"
+
+    events = client.get(f"/jobs/{job_id}/watch").text
+    assert events.startswith("event: done") and '"result": "3 cards"' in events
+
+    # A replayed Idempotency-Key returns the same job, unless the body changed
+    keyed = client.post("/jobs/fake", json=READING, headers={"Idempotency-Key": "k1"}).json()["id"]
+    assert client.post("/jobs/fake", json=READING, headers={"Idempotency-Key": "k1"}).json()["id"] == keyed
+    assert client.post("/jobs/fake", json=READING | {"question": "Else?"}, headers={"Idempotency-Key": "k1"}).status_code == 422
+    # Another anonymous caller using the same key gets a job of its own
+    other = TestClient(app, client=("203.0.113.7", 50000))
+    assert other.post("/jobs/fake", json=READING | {"question": "Else?"}, headers={"Idempotency-Key": "k1"}).json()["id"] != keyed
+    assert queue.get(keyed).address == "testclient"
+
+
+def test_async_queue_calls_run_off_the_event_loop(queue):
+    import threading
+
+    threads = []
+    execute = queue._execute
+
+    def recorded(*args):
+        threads.append(threading.current_thread())
+        return execute(*args)
+
+    queue._execute = recorded
+
+    async def main():
+        job = await queue.asubmit("insight_combination", READING)
+        claimed = await queue.aclaim("w1")
+        await queue.acomplete(claimed, "ok")
+        return await queue.aget(job.id)
+
+    assert asyncio.run(main()).result == "ok"
+    assert threads and threading.main_thread() not in threads
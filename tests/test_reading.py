@@ -0,0 +1,184 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import app as taro_app
+from src.schemas import TarotPrediction
+
+STORY_REQUEST = {
+    'user': {
+        'id': '12345',
+        'username': 'julie.lenova',
+        'first_name': 'Julie',
+        'last_name': 'Lenova',
+        'birth_date': '21-03-1999'
+    },
+    'tarot': {
+        'timestamp': "2025-06-22T02:30:00",
+        'question': 'When will I see Pookie?',
+        'reading_mode': 'three_card',
+        'drawn_cards': ['two of cups', 'wheel of fortune', 'Death']
+    }
+}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # No lifespan: the stubbed agents never reach Ollama
+    monkeypatch.setattr(taro_app.app.state, 'ollama', None, raising=False)
+    monkeypatch.setattr(taro_app.app.state, 'aollama', None, raising=False)
+    return TestClient(taro_app.app)
+
+
+def test_reading_with_idempotency_key_replays_the_result(monkeypatch, client):
+    calls = []
+
+    async def apredict(self, **kwargs):
+        calls.append(kwargs)
+        return TarotPrediction(combination="pairs", numerology="numbers", story_tell="story")
+
+    monkeypatch.setattr(taro_app.TarotReader, 'apredict', apredict)
+    headers = {'Idempotency-Key': 'reading-replay-test'}
+
+    first = client.post('/reading/', json=STORY_REQUEST, headers=headers)
+    second = client.post('/reading/', json=STORY_REQUEST, headers=headers)
+
+    assert first.status_code == 200, first.text
+    assert first.json() == {'combination': 'pairs', 'numerology': 'numbers', 'story_tell': 'story'}
+    assert second.json() == first.json()
+    assert len(calls) == 1
+
+
+def test_story_tell_loads_astrology_off_the_event_loop(monkeypatch):
+    import asyncio
+
+    from src.agent.agents import StoryTell, TarotReader
+    from src.schemas import TarotReading, User
+    from src.schemas.astrology import DailyTransits
+
+    def blocking(*args, **kwargs):
+        raise AssertionError("synchronous chart or transits on the event loop")
+
+    async def aload_astrology(self):
+        self.__dict__.update(sun_sign='Pisces', moon_sign='Leo', rising_sign='Virgo')
+        self._astrology_loaded = True
+
+    async def afor_day(cls, day=None, tz=None):
+        return DailyTransits(
+            date='2025-06-22', utc_offset=10, instant='2025-06-22T02:00:00+00:00',
+            moon_phase='Full Moon', positions={}, aspects={},
+        )
+
+    monkeypatch.setattr(User, 'load_astrology', blocking)
+    monkeypatch.setattr(DailyTransits, 'for_day', classmethod(blocking))
+    monkeypatch.setattr(User, 'aload_astrology', aload_astrology)
+    monkeypatch.setattr(DailyTransits, 'afor_day', classmethod(afor_day))
+
+    user = User(**STORY_REQUEST['user'], include_astrology=True)
+    tarot = TarotReading(**STORY_REQUEST['tarot'])
+    for agent in (StoryTell(), TarotReader()):
+        prompt = asyncio.run(agent.afeature_augment(inputs={'user': user, 'tarot': tarot}, upstream={}))
+        assert "Sun Sign: Pisces" in prompt['user_info'] and "Full Moon; no major transits" in prompt['user_info']
+
+
+def test_idempotency_key_is_bound_to_caller_and_body(monkeypatch, client):
+    calls = []
+
+    async def apredict(self, **kwargs):
+        calls.append(kwargs)
+        return TarotPrediction(combination="pairs", numerology="numbers", story_tell=kwargs['inputs']['user'].id)
+
+    monkeypatch.setattr(taro_app.TarotReader, 'apredict', apredict)
+    headers = {'Idempotency-Key': 'shared-key'}
+    other_user = {**STORY_REQUEST, 'user': {**STORY_REQUEST['user'], 'id': '67890'}}
+    other_question = {**STORY_REQUEST, 'tarot': {**STORY_REQUEST['tarot'], 'question': 'Will I move abroad?'}}
+
+    assert client.post('/reading/', json=STORY_REQUEST, headers=headers).json()['story_tell'] == '12345'
+    # Another caller's key is their own
+    assert client.post('/reading/', json=other_user, headers=headers).json()['story_tell'] == '67890'
+    # Same caller and key, different request: rejected, not replayed
+    response = client.post('/reading/', json=other_question, headers=headers)
+    assert response.status_code == 422 and 'Idempotency-Key' in response.json()['error']
+    assert len(calls) == 2
+
+
+def test_requests_without_user_id_are_metered(monkeypatch, client):
+    from src.agent.gateway import gateway
+    from src.agent.scheduler import QuotaBook
+
+    async def arun(self, **kwargs):
+        async with gateway.slot(self.remaining(), self.scheduled()):
+            return "pairs"
+
+    monkeypatch.setattr(taro_app.CombinationAnalyst, 'arun', arun)
+    monkeypatch.setattr(gateway, '_quota', QuotaBook(rate=0.01, burst=1))
+    reading = dict(STORY_REQUEST['tarot'])  # no user_id
+
+    assert client.post('/insight_combination/', json=reading).status_code == 200
+    rejected = client.post('/insight_combination/', json=reading)
+    assert rejected.status_code == 429 and 'Retry-After' in rejected.headers
+    # A different caller has its own bucket
+    assert client.post('/insight_combination/', json=reading | {'user_id': 'someone'}).status_code == 200
+
+
+class StreamingOllama:
+    """ `ollama.AsyncClient` stand-in: every chat replies `reply`, streamed in a few chunks when asked to. """
+
+    reply = "Combination Highlights\nThe cups pair up.\nPossible insights\nMore to come."
+
+    def __init__(self):
+        self.calls = []
+
+    async def chat(self, model, messages, stream=False, **kwargs):
+        from types import SimpleNamespace
+
+        self.calls.append(messages)
+        if not stream:
+            return SimpleNamespace(message={'content': self.reply}, done=True, prompt_eval_count=10)
+        words = self.reply.split(" ")
+        chunks = [word + " " for word in words[:-1]] + [words[-1]]
+
+        async def generate():
+            for chunk in chunks:
+                yield SimpleNamespace(message={'content': chunk}, done=False)
+            yield SimpleNamespace(message={'content': ''}, done=True, prompt_eval_count=10, eval_count=len(chunks))
+
+        return generate()
+
+
+def parse_sse(text: str) -> list[tuple[str, dict]]:
+    import json
+
+    events = []
+    for message in text.split("\n\n"):
+        if message:
+            event, data = message.split("\n")
+            assert event.startswith("event: ") and data.startswith("data: ")
+            events.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+def test_story_tell_stream_reports_upstream_progress_then_tokens(monkeypatch, client):
+    from src.agent import base
+
+    ollama = StreamingOllama()
+    monkeypatch.setattr(taro_app.app.state, 'aollama', ollama)
+    monkeypatch.setattr(base, 'is_cacheable', lambda options: False)
+
+    response = client.post('/story_tell/?stream=true', json=STORY_REQUEST)
+    assert response.status_code == 200 and response.headers['content-type'].startswith('text/event-stream')
+    assert response.text.endswith("\n\n")
+
+    events = parse_sse(response.text)
+    names = [name for name, _ in events]
+    # Progress while the upstream chain runs, then the story's tokens and one final done event
+    assert names[:3] == ['progress'] * 3 and names[-1] == 'done'
+    assert set(names[3:-1]) == {'token'}
+    assert events[0][1] == {'completed': 0, 'total': 2}
+    assert {data['node'] for _, data in events[1:3]} == {'insight_combination', 'insight_numerology'}
+    assert all(data['ok'] and data['total'] == 2 for _, data in events[1:3])
+
+    done = events[-1][1]
+    assert done['content'] == "".join(data['content'] for _, data in events[3:-1]) == StreamingOllama.reply
+    assert done['cached'] is False and done['metrics']['prompt_eval_count'] == 10
+    # Two upstream generations, then StoryTell with the combination highlights only
+    assert len(ollama.calls) == 3 and "The cups pair up." in ollama.calls[-1][1]['content']